@@ -34,11 +34,18 @@ def create_app():
     
     @app.route('/health')
     def health():
-        """Heroku health check"""
+        """Heroku health check + a worker által kiszolgált katalógus verziója"""
+        try:
+            from user_study.user_study import recommender
+            catalog = recommender.catalog_status()
+        except ImportError:
+            catalog = None
+        
         return jsonify({
             "status": "healthy",
             "service": "sustainable-recipe-recommender",
-            "version": "2.0"
+            "version": "2.0",
+            "catalog": catalog
         })
     
     @app.route('/debug/system')
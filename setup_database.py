@@ -1,24 +1,34 @@
 #!/usr/bin/env python3
 """
 Heroku-ra optimalizált setup_database.py
-Automatikusan létrehozza a processed_recipes.csv-t deploy közben
+Automatikusan létrehozza a processed_recipes.csv-t és a katalógus artifactot deploy közben
+(a közös, streamelt pipeline-nal: user_study.recipe_pipeline)
 """
 
 import os
 import sys
 import pandas as pd
-import numpy as np
 from pathlib import Path
 
+from user_study.catalog import full_catalog_mode, iter_csv_chunks
+from user_study.catalog_artifact import artifact_dir_for
+from user_study.recipe_pipeline import preprocess
+
+def processed_csv_path():
+    """Output CSV - RECIPE_CATALOG_MODE=full writes the full catalog to a separate file"""
+    if full_catalog_mode():
+        return Path("data/processed_recipes_full.csv")
+    return Path("data/processed_recipes.csv")
+
 def setup_csv_for_heroku():
-    """CSV setup Heroku-hoz optimalizálva"""
+    """CSV setup Heroku-hoz optimalizálva (közös streamelt pipeline: CSV + katalógus artifact)"""
     print("🚀 Heroku CSV Setup - Processing hungarian_recipes_github.csv")
     print("=" * 60)
     
+    output_csv = processed_csv_path()
     try:
         # Ellenőrizzük a fájlokat
         original_csv = Path("hungarian_recipes_github.csv")
-        output_csv = Path("data/processed_recipes.csv")
         
         print(f"📊 Original CSV: {original_csv.exists()} - {original_csv}")
         print(f"📁 Data directory: {Path('data').exists()}")
@@ -28,43 +38,10 @@ def setup_csv_for_heroku():
             print("❌ hungarian_recipes_github.csv not found!")
             return create_fallback_csv(output_csv)
         
-        # CSV betöltése
-        print("📋 Loading hungarian_recipes_github.csv...")
-        
-        # Encoding detection
-        encodings = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']
-        df = None
-        used_encoding = None
-        
-        for encoding in encodings:
-            try:
-                df = pd.read_csv(original_csv, encoding=encoding)
-                used_encoding = encoding
-                print(f"✅ Successfully loaded with {encoding} encoding")
-                break
-            except (UnicodeDecodeError, pd.errors.EmptyDataError):
-                continue
-        
-        if df is None:
-            print("❌ Failed to load CSV with any encoding")
-            return create_fallback_csv(output_csv)
-        
-        print(f"📊 Loaded {len(df)} recipes")
-        print(f"📋 Columns: {list(df.columns)}")
-        
-        # Process the CSV
-        processed_df = process_hungarian_csv(df)
-        
-        if processed_df is None:
-            print("❌ CSV processing failed")
-            return create_fallback_csv(output_csv)
-        
-        # Save processed CSV
-        os.makedirs('data', exist_ok=True)
-        processed_df.to_csv(output_csv, index=False, encoding='utf-8')
-        
+        # Darabonként feldolgozva, minden recept megmarad (a teljes CSV nincs a memóriában)
+        n_recipes = preprocess(original_csv, output_csv)
         print(f"✅ Processed CSV saved: {output_csv}")
-        print(f"📊 Recipes in output: {len(processed_df)}")
+        print(f"📊 Recipes in output: {n_recipes}")
         
         # Validate output
         validate_processed_csv(output_csv)
@@ -75,191 +52,6 @@ def setup_csv_for_heroku():
         print(f"❌ Setup error: {e}")
         return create_fallback_csv(output_csv)
 
-def process_hungarian_csv(df):
-    """Process the hungarian recipes CSV"""
-    try:
-        print("🔧 Processing Hungarian recipes...")
-        
-        # Column mapping
-        column_mapping = {
-            'name': 'title',
-            'ingredients': 'ingredients', 
-            'instructions': 'instructions',
-            'images': 'images'
-        }
-        
-        # Rename columns if they exist
-        for old_col, new_col in column_mapping.items():
-            if old_col in df.columns and old_col != new_col:
-                df = df.rename(columns={old_col: new_col})
-        
-        # Add recipe IDs
-        df['recipeid'] = range(1, len(df) + 1)
-        
-        # Ensure required columns exist
-        required_columns = ['title', 'ingredients', 'images']
-        for col in required_columns:
-            if col not in df.columns:
-                df[col] = f'Sample {col}'
-        
-        # Handle missing instructions
-        if 'instructions' not in df.columns:
-            df['instructions'] = 'Elkészítési útmutató hamarosan...'
-        
-        # Process scores if they exist
-        if 'env_score' in df.columns and 'nutri_score' in df.columns and 'meal_score' in df.columns:
-            df = normalize_scores(df)
-        else:
-            print("⚠️ Score columns not found, using defaults")
-            df['HSI'] = np.random.uniform(60, 90, len(df))  # Health Score
-            df['ESI'] = np.random.uniform(50, 85, len(df))  # Environmental Score  
-            df['PPI'] = np.random.uniform(70, 95, len(df))  # Popularity Score
-        
-        # Calculate composite score
-        df['composite_score'] = (df['ESI'] * 0.4 + df['HSI'] * 0.4 + df['PPI'] * 0.2)
-        
-        # Clean text data
-        df = clean_text_data(df)
-        
-        # Process images - JAVÍTVA!
-        df = process_image_urls(df)
-        
-        return df
-        
-    except Exception as e:
-        print(f"❌ Process error: {e}")
-        return None
-
-def process_image_urls(df):
-    """Process image URLs - JAVÍTOTT verzió idézőjelek és többszörös URL-ek kezelésével"""
-    print("🖼️ Processing image URLs...")
-    
-    def clean_image_url(img_string):
-        """Clean image URL - eltávolítja az idézőjeleket és veszi az első URL-t"""
-        
-        if pd.isna(img_string) or not img_string:
-            return get_fallback_image()
-        
-        # String-gé konvertálás
-        img_str = str(img_string).strip()
-        
-        # Üres ellenőrzés
-        if not img_str or img_str.lower() in ['nan', '', 'null']:
-            return get_fallback_image()
-        
-        # KULCS FIX: Idézőjelek eltávolítása
-        img_str = img_str.strip('"').strip("'")
-        
-        # Többszörös URL kezelése - vesszővel elválasztott
-        if ',' in img_str:
-            urls = img_str.split(',')
-            first_url = urls[0].strip().strip('"').strip("'")
-        else:
-            first_url = img_str
-        
-        # URL validálás és javítás
-        if first_url.startswith('http'):
-            # HTTPS biztosítása
-            if first_url.startswith('http://'):
-                first_url = first_url.replace('http://', 'https://')
-            
-            print(f"   ✅ Valid image URL: {first_url[:60]}...")
-            return first_url
-        
-        elif first_url.startswith('www.'):
-            clean_url = f"https://{first_url}"
-            print(f"   🔧 Fixed www URL: {clean_url[:60]}...")
-            return clean_url
-        
-        else:
-            print(f"   ⚠️ Invalid URL format: {first_url[:60]}...")
-            return get_fallback_image()
-    
-    # Apply image processing
-    print(f"🔍 Processing {len(df)} image URLs...")
-    df['images'] = df['images'].apply(clean_image_url)
-    
-    # Debug: első 5 kép ellenőrzése
-    print(f"🖼️ Processed image URLs (first 5):")
-    for i in range(min(5, len(df))):
-        recipe = df.iloc[i]
-        print(f"   {i+1}. {recipe['title'][:30]}...")
-        print(f"      Image: {recipe['images']}")
-    
-    # Statisztika
-    valid_images = sum(1 for img in df['images'] if img.startswith('http') and 'fallback' not in img)
-    fallback_images = len(df) - valid_images
-    
-    print(f"📊 Image processing results:")
-    print(f"   ✅ Valid external images: {valid_images}")
-    print(f"   🔄 Fallback images: {fallback_images}")
-    
-    return df
-
-def get_fallback_image():
-    """Get fallback image URL"""
-    # Garantáltan működő Unsplash képek
-    fallback_images = [
-        'https://images.unsplash.com/photo-1547592180-85f173990554?w=400&h=300&fit=crop&auto=format',
-        'https://images.unsplash.com/photo-1565299624946-b28f40a0ca4b?w=400&h=300&fit=crop&auto=format', 
-        'https://images.unsplash.com/photo-1544943910-4c1dc44aab44?w=400&h=300&fit=crop&auto=format',
-        'https://images.unsplash.com/photo-1558030006-450675393462?w=400&h=300&fit=crop&auto=format',
-        'https://images.unsplash.com/photo-1572441713132-51c75654db73?w=400&h=300&fit=crop&auto=format'
-    ]
-    return np.random.choice(fallback_images)
-
-def normalize_scores(df):
-    """Normalize score columns to 0-100 scale"""
-    print("📊 Normalizing scores...")
-    
-    # Environmental Score - invert (lower is better environmentally)
-    if 'env_score' in df.columns:
-        env_min, env_max = df['env_score'].min(), df['env_score'].max()
-        if env_max > env_min:
-            df['ESI'] = 100 - ((df['env_score'] - env_min) / (env_max - env_min) * 100)
-        else:
-            df['ESI'] = 70.0
-    
-    # Health Score - direct (higher is better)
-    if 'nutri_score' in df.columns:
-        nutri_max = df['nutri_score'].max()
-        if nutri_max > 100:
-            df['HSI'] = (df['nutri_score'] / nutri_max) * 100
-        else:
-            df['HSI'] = df['nutri_score']
-    
-    # Popularity Score - direct (higher is more popular)
-    if 'meal_score' in df.columns:
-        meal_max = df['meal_score'].max()
-        if meal_max > 100:
-            df['PPI'] = (df['meal_score'] / meal_max) * 100
-        else:
-            df['PPI'] = df['meal_score']
-    
-    print(f"   HSI range: {df['HSI'].min():.1f} - {df['HSI'].max():.1f}")
-    print(f"   ESI range: {df['ESI'].min():.1f} - {df['ESI'].max():.1f}")
-    print(f"   PPI range: {df['PPI'].min():.1f} - {df['PPI'].max():.1f}")
-    
-    return df
-
-def clean_text_data(df):
-    """Clean text columns"""
-    print("🧹 Cleaning text data...")
-    
-    # Fill missing values
-    df['title'] = df['title'].fillna('Névtelen Recept')
-    df['ingredients'] = df['ingredients'].fillna('Összetevők lista hamarosan...')
-    df['instructions'] = df['instructions'].fillna('Elkészítési útmutató hamarosan...')
-    df['images'] = df['images'].fillna('')
-    
-    # Clean strings
-    text_columns = ['title', 'ingredients', 'instructions']
-    for col in text_columns:
-        if col in df.columns:
-            df[col] = df[col].astype(str).str.strip()
-    
-    return df
-
 def create_fallback_csv(output_path):
     """Create fallback CSV if original processing fails"""
     print("🔧 Creating fallback CSV with sample Hungarian recipes...")
@@ -319,28 +111,50 @@ def create_fallback_csv(output_path):
     
     return True
 
+def build_catalog_artifact(csv_path):
+    """Build the content-hashed TF-IDF/ingredient index artifact so workers load instead of refit"""
+    print("📦 Building catalog artifact...")
+    
+    try:
+        from user_study.hybrid_recommender import HybridRecipeRecommender
+        
+        recommender = HybridRecipeRecommender(str(csv_path))
+        print(f"✅ Catalog artifact ready: {recommender.artifact_dir}")
+        return True
+        
+    except Exception as e:
+        # Not fatal: workers fit the model themselves if the artifact is missing
+        print(f"⚠️ Catalog artifact build failed: {e}")
+        return False
+
 def validate_processed_csv(csv_path):
-    """Validate the processed CSV"""
+    """Validate the processed CSV (streamed - only the image column is read in full)"""
     try:
-        df = pd.read_csv(csv_path)
+        head = pd.read_csv(csv_path, nrows=3)
         
         required_columns = ['recipeid', 'title', 'ingredients', 'images', 'HSI', 'ESI', 'PPI', 'composite_score']
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        missing_columns = [col for col in required_columns if col not in head.columns]
         
         if missing_columns:
             print(f"⚠️ Missing columns: {missing_columns}")
         else:
             print("✅ All required columns present")
         
+        n_recipes = 0
+        n_images = 0
+        for chunk in iter_csv_chunks(csv_path, usecols=['images']):
+            n_recipes += len(chunk)
+            n_images += int(chunk['images'].astype(str).str.startswith('http').sum())
+        
         print(f"📊 Final validation:")
-        print(f"   Recipes: {len(df)}")
-        print(f"   Columns: {len(df.columns)}")
-        print(f"   Images with URLs: {sum(1 for img in df['images'] if img.startswith('http'))}")
+        print(f"   Recipes: {n_recipes}")
+        print(f"   Columns: {len(head.columns)}")
+        print(f"   Images with URLs: {n_images}")
         
         # Sample recipes
         print(f"\n📋 Sample recipes:")
-        for i in range(min(3, len(df))):
-            recipe = df.iloc[i]
+        for i in range(len(head)):
+            recipe = head.iloc[i]
             print(f"   {i+1}. {recipe['title']}")
             print(f"      Image: {recipe['images'][:60]}...")
         
@@ -356,6 +170,10 @@ if __name__ == "__main__":
     
     success = setup_csv_for_heroku()
     
+    # A pipeline már megépítette; a fallback CSV-hez (vagy artifact hiba után) itt készül el
+    if processed_csv_path().exists() and not (artifact_dir_for(processed_csv_path()) / "manifest.json").exists():
+        build_catalog_artifact(processed_csv_path())
+    
     if success:
         print("\n🎉 CSV SETUP SUCCESSFUL!")
         print("✅ processed_recipes.csv is ready")
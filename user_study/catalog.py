@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Oszlopos, csak olvasható receptkatalógus
+A rangsorolás NumPy tömbökön fut, dict csak a kiválasztott néhány receptből készül.
+Lemezre mentve memory-mapped fájlokból nyitható meg, így a gunicorn workerek
+ugyanazokat a lapokat osztják (zero-copy), nem tart mindegyik saját DataFrame-et.
+"""
+
+import codecs
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+CATALOG_MODE_ENV = 'RECIPE_CATALOG_MODE'
+
+CSV_ENCODINGS = ('utf-8', 'utf-8-sig', 'latin-1', 'cp1252')
+
+
+def full_catalog_mode():
+    """Teljes katalógus mód (RECIPE_CATALOG_MODE=full) - alapból 50 receptes user study minta"""
+    return os.environ.get(CATALOG_MODE_ENV, 'study').strip().lower() == 'full'
+
+
+def downcast_numeric(df):
+    """Numerikus oszlopok kisebb típusra: float64 -> float32, int64 -> int32 (ha belefér)"""
+    for name in df.columns:
+        series = df[name]
+        if pd.api.types.is_float_dtype(series) and series.dtype != np.float32:
+            df[name] = series.astype(np.float32)
+        elif pd.api.types.is_integer_dtype(series) and series.dtype.itemsize > 4:
+            info = np.iinfo(np.int32)
+            if series.empty or (series.min() >= info.min and series.max() <= info.max):
+                df[name] = series.astype(np.int32)
+    return df
+
+
+def widen_floats(values):
+    """float16 / float32 tömb -> float64 a legrövidebb, az eredeti típusban azonos tizedes
+    alakkal (66.824455, nem 66.82445526123047) - a CSV / API határon; más típus változatlanul
+
+    A kis float típusok csak az artifact belső tárolási formái, kifelé nem látszanak.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind == 'f' and values.dtype.itemsize < 8:
+        return values.astype(str).astype(np.float64)
+    return values
+
+
+def detect_encoding(path, encodings=CSV_ENCODINGS, block_size=1 << 20):
+    """Az első encoding, amellyel a teljes fájl dekódolható (streamelve) - None, ha egyik sem"""
+    for encoding in encodings:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(block_size), b''):
+                    decoder.decode(block)
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError:
+            continue
+        return encoding
+    return None
+
+
+def iter_csv_chunks(path, chunksize=50_000, usecols=None, encoding=None):
+    """CSV darabok generátora (float64 / int64 oszlopokkal, ahogy a pandas olvassa)
+
+    encoding: None esetén detect_encoding (egy olcsó dekódoló menet a parse előtt).
+    Egyszerre csak egy darab van a memóriában; a lefelé castolás a katalógus íráskor történik.
+    """
+    encoding = encoding or detect_encoding(path)
+    if encoding is None:
+        raise ValueError(f"A CSV egyik encoding-gal sem olvasható: {path}")
+    for chunk in pd.read_csv(path, encoding=encoding, chunksize=chunksize, usecols=usecols):
+        yield chunk
+
+
+def save_sparse(directory, name, matrix):
+    """Ritka CSR/CSC mátrix mentése nyers .npy tömbökként (mmap-elhető, nem tömörített)"""
+    directory = Path(directory)
+    for part in ('data', 'indices', 'indptr'):
+        np.save(directory / f"{name}.{part}.npy", getattr(matrix, part))
+    with open(directory / f"{name}.json", 'w', encoding='utf-8') as f:
+        json.dump({'format': matrix.format, 'shape': list(matrix.shape)}, f)
+
+
+def open_sparse(directory, name):
+    """Ritka mátrix megnyitása memory-mapped tömbökre (a scipy mátrix nem másol)"""
+    directory = Path(directory)
+    with open(directory / f"{name}.json", encoding='utf-8') as f:
+        meta = json.load(f)
+    arrays = tuple(
+        np.load(directory / f"{name}.{part}.npy", mmap_mode='r')
+        for part in ('data', 'indices', 'indptr')
+    )
+    matrix_class = sparse.csc_matrix if meta['format'] == 'csc' else sparse.csr_matrix
+    return matrix_class(arrays, shape=tuple(meta['shape']), copy=False)
+
+
+def _is_numeric(series):
+    """Numerikus katalógus oszlop-e (a bool oszlop szövegként tárolódik)"""
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def _encode_strings(values):
+    """Python értékek -> (összefűzött UTF-8 bájtok, hosszak, hiányzó maszk), None/NaN -> hiányzó"""
+    missing = np.array([value is None or (isinstance(value, float) and np.isnan(value))
+                        for value in values], dtype=bool)
+    encoded = [b'' if is_missing else str(value).encode('utf-8')
+               for value, is_missing in zip(values, missing)]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    return b''.join(encoded), lengths, missing
+
+
+def _link_or_copy(source, target):
+    """Hard link (azonos fájlrendszeren nem másol), különben másolás"""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+class StringColumn:
+    """Szöveg oszlop: összefűzött UTF-8 bájtok + offset tömb (memory-mappelhető)"""
+
+    def __init__(self, buffer, offsets, missing):
+        self.buffer = buffer      # uint8, minden érték egymás után
+        self.offsets = offsets    # int64, n+1 elem
+        self.missing = missing    # bool, hiányzó (NaN) értékek
+
+    @classmethod
+    def from_values(cls, values):
+        """Oszlop építése Python értékekből (None/NaN -> hiányzó)"""
+        data, lengths, missing = _encode_strings(values)
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return cls(np.frombuffer(data, dtype=np.uint8), offsets, missing)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _value(self, i):
+        if self.missing[i]:
+            return None
+        return self.buffer[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+
+    def __getitem__(self, indices):
+        """Egy index -> str, index tömb -> object tömb (csak a kért elemeket dekódolja)"""
+        if np.isscalar(indices):
+            return self._value(int(indices))
+        indices = np.asarray(indices, dtype=np.intp)
+        values = np.empty(len(indices), dtype=object)
+        for pos, i in enumerate(indices):
+            values[pos] = self._value(i)
+        return values
+
+    def to_numpy(self):
+        return self[np.arange(len(self))]
+
+    def save(self, directory, name):
+        np.save(directory / f"{name}.bytes.npy", self.buffer)
+        np.save(directory / f"{name}.offsets.npy", self.offsets)
+        np.save(directory / f"{name}.missing.npy", self.missing)
+
+    @classmethod
+    def open(cls, directory, name):
+        return cls(*(
+            np.load(directory / f"{name}.{part}.npy", mmap_mode='r')
+            for part in ('bytes', 'offsets', 'missing')
+        ))
+
+
+class RecipeCatalog:
+    """Csak olvasható oszlopos katalógus: oszlopnév -> NumPy tömb vagy StringColumn"""
+
+    source = None  # a könyvtár, ha lemezről (memory-mapped) nyitott katalógus
+
+    def __init__(self, columns):
+        self.columns = {}
+        for name, values in columns.items():
+            if not isinstance(values, StringColumn):
+                values = np.asarray(values)
+                values.flags.writeable = False
+            self.columns[name] = values
+
+        self.column_names = list(self.columns)
+        self.n_recipes = len(next(iter(self.columns.values()))) if self.columns else 0
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """Katalógus DataFrame-ből: numerikus oszlopok natív dtype-pal, a többi StringColumn"""
+        columns = {}
+        for name in df.columns:
+            series = df[name]
+            if _is_numeric(series):
+                columns[name] = series.to_numpy()
+            else:
+                columns[name] = StringColumn.from_values(series.tolist())
+        return cls(columns)
+
+    def save(self, directory):
+        """Mentés .npy fájlokba (numerikus oszlop -> egy tömb, szöveg -> bájtok + offsetek)"""
+        directory = Path(directory)
+        if self.source is not None:
+            # Lemezen lévő katalógus (pl. CatalogWriter): a fájlok hard linkkel kerülnek át
+            shutil.copytree(self.source, directory, copy_function=_link_or_copy, dirs_exist_ok=True)
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+
+        schema = []
+        for name, values in self.columns.items():
+            if isinstance(values, StringColumn):
+                values.save(directory, name)
+                schema.append({'name': name, 'kind': 'string'})
+            else:
+                np.save(directory / f"{name}.npy", values)
+                schema.append({'name': name, 'kind': 'numeric'})
+
+        with open(directory / "schema.json", 'w', encoding='utf-8') as f:
+            json.dump(schema, f, ensure_ascii=False)
+
+    @classmethod
+    def open(cls, directory):
+        """Megnyitás memory-mapped módban - semmit nem másol a worker memóriájába"""
+        directory = Path(directory)
+        with open(directory / "schema.json", encoding='utf-8') as f:
+            schema = json.load(f)
+
+        columns = {}
+        for column in schema:
+            name = column['name']
+            if column['kind'] == 'string':
+                columns[name] = StringColumn.open(directory, name)
+            else:
+                columns[name] = np.load(directory / f"{name}.npy", mmap_mode='r')
+        catalog = cls(columns)
+        catalog.source = directory
+        return catalog
+
+    def __len__(self):
+        return self.n_recipes
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def values(self, name):
+        """Teljes oszlop NumPy tömbként (numerikus oszlopnál másolás nélkül)"""
+        column = self.columns[name]
+        return column.to_numpy() if isinstance(column, StringColumn) else column
+
+    def rows(self, indices, columns=None):
+        """A megadott pozíciójú receptek dict-ként (natív Python értékekkel), O(k) másolás"""
+        indices = np.asarray(indices, dtype=np.intp)
+        columns = self.column_names if columns is None else columns
+        values = [widen_floats(self.columns[name][indices]).tolist() for name in columns]
+        return [dict(zip(columns, row)) for row in zip(*values)]
+
+    def to_frame(self):
+        """Teljes DataFrame másolat (float64 számokkal) - debug/fallback és tömörítés (CSV) célra"""
+        return pd.DataFrame({
+            name: values.to_numpy() if isinstance(values, StringColumn) else widen_floats(values)
+            for name, values in self.columns.items()
+        })
+
+
+class CatalogWriter:
+    """Katalógus írása DataFrame darabonként, közvetlenül a lemezre
+
+    A szöveg oszlopok bájtjai azonnal fájlba kerülnek (memóriában csak a hosszak és a
+    hiányzó maszk marad), a numerikus oszlopok darabjai a close()-nál fűződnek össze.
+    Az eredmény ugyanaz, mint a from_dataframe(pd.concat(darabok)) katalógus: egy
+    darabban csupa üres (float) szöveg oszlop is szöveg oszlop marad.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.kinds = {}     # oszlop -> 'numeric' / 'string' (az első darab oszlop sorrendjében)
+        self.numeric = {}   # oszlop -> tömb darabok
+        self.strings = {}   # oszlop -> [bájt fájl, hossz darabok, hiányzó darabok]
+        self.n_recipes = 0
+
+    def append(self, frame):
+        """Egy darab hozzáfűzése (minden darabnak ugyanazok az oszlopai)
+
+        A numerikus oszlopok itt castolódnak float32 / int32-re (a hívó darabja nem változik).
+        """
+        frame = downcast_numeric(frame.copy(deep=False))
+        if self.kinds and list(frame.columns) != list(self.kinds):
+            raise ValueError("A darab oszlopai eltérnek a katalógusétól")
+        for name in frame.columns:
+            series = frame[name]
+            if _is_numeric(series) and self.kinds.get(name, 'numeric') == 'numeric':
+                self.kinds[name] = 'numeric'
+                self.numeric.setdefault(name, []).append(series.to_numpy())
+                continue
+            if self.kinds.get(name) == 'numeric':
+                # Eddig számként olvasott oszlop (pl. csupa üres darab): szövegként folytatódik
+                for values in self.numeric.pop(name):
+                    self._write_strings(name, values.tolist())
+            self.kinds[name] = 'string'
+            self._write_strings(name, series.tolist())
+        self.n_recipes += len(frame)
+
+    def _write_strings(self, name, values):
+        column = self.strings.get(name)
+        if column is None:
+            column = self.strings[name] = [open(self.directory / f"{name}.bytes.part", 'wb'), [], []]
+        data, lengths, missing = _encode_strings(values)
+        column[0].write(data)
+        column[1].append(lengths)
+        column[2].append(missing)
+
+    def column(self, name):
+        """Egy numerikus oszlop eddigi értékei (pl. a Pareto rétegekhez)"""
+        return np.concatenate(self.numeric[name])
+
+    def add_column(self, name, values):
+        """Numerikus oszlop hozzáadása / cseréje (a meglévő oszlop a helyén marad)"""
+        column = self.strings.pop(name, None)
+        if column is not None:
+            column[0].close()
+            os.remove(column[0].name)
+        self.kinds[name] = 'numeric'
+        self.numeric[name] = [np.asarray(values)]
+
+    def close(self):
+        """Oszlop fájlok és séma véglegesítése -> memory-mapped RecipeCatalog"""
+        schema = []
+        for name, kind in self.kinds.items():
+            if kind == 'numeric':
+                np.save(self.directory / f"{name}.npy", self.column(name))
+            else:
+                self._close_strings(name)
+            schema.append({'name': name, 'kind': kind})
+
+        with open(self.directory / "schema.json", 'w', encoding='utf-8') as f:
+            json.dump(schema, f, ensure_ascii=False)
+        return RecipeCatalog.open(self.directory)
+
+    def _close_strings(self, name, block_size=1 << 24):
+        """A bájt fájl .npy-vá (blokkonként másolva, nem töltődik be), offsetek + hiányzó maszk"""
+        part, lengths, missing = self.strings.pop(name)
+        part.close()
+        offsets = np.zeros(sum(map(len, lengths)) + 1, dtype=np.int64)
+        if lengths:
+            np.cumsum(np.concatenate(lengths), out=offsets[1:])
+
+        path = self.directory / f"{name}.bytes.npy"
+        if offsets[-1] == 0:
+            np.save(path, np.zeros(0, dtype=np.uint8))
+        else:
+            buffer = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(int(offsets[-1]),))
+            with open(part.name, 'rb') as f:
+                position = 0
+                for block in iter(lambda: f.read(block_size), b''):
+                    buffer[position:position + len(block)] = np.frombuffer(block, dtype=np.uint8)
+                    position += len(block)
+            buffer.flush()
+            del buffer
+        os.remove(part.name)
+
+        np.save(self.directory / f"{name}.offsets.npy", offsets)
+        np.save(self.directory / f"{name}.missing.npy",
+                np.concatenate(missing) if missing else np.zeros(0, dtype=bool))
+
+
+class LayeredColumn:
+    """Alap oszlop + delta oszlop közös index térben (alap: 0..n_base-1, utána a delta sorok)
+
+    override: az alap rész helyett használt tömb (pl. újranormalizált ESI)
+    """
+
+    def __init__(self, base, delta, override=None):
+        self.base = base
+        self.delta = delta
+        self.override = override
+        self.n_base = len(base)
+        self.is_string = isinstance(base, StringColumn)
+
+    def __len__(self):
+        return self.n_base + len(self.delta)
+
+    def _base_part(self, indices):
+        return self.override[indices] if self.override is not None else self.base[indices]
+
+    def __getitem__(self, indices):
+        if np.isscalar(indices):
+            i = int(indices)
+            return self._base_part(i) if i < self.n_base else self.delta[i - self.n_base]
+
+        indices = np.asarray(indices, dtype=np.intp)
+        in_base = indices < self.n_base
+        if self.is_string:
+            values = np.empty(len(indices), dtype=object)
+        else:
+            values = np.empty(len(indices), dtype=np.result_type(self.base.dtype, self.delta.dtype))
+        values[in_base] = self._base_part(indices[in_base])
+        values[~in_base] = self.delta[indices[~in_base] - self.n_base]
+        return values
+
+    def to_numpy(self):
+        return self[np.arange(len(self))]
+
+
+class LayeredCatalog(RecipeCatalog):
+    """Alap (memory-mapped) katalógus + kis, memóriában tartott delta katalógus
+
+    Az inkrementális szerkesztések (új/módosított receptek) a delta végére kerülnek,
+    a törölt alap sorokat a hívó maszkolja - az alap tömbök nem másolódnak.
+    """
+
+    def __init__(self, base, delta, overrides=None):
+        overrides = overrides or {}
+        self.base = base
+        self.delta = delta
+        self.columns = {
+            name: LayeredColumn(base[name], delta[name], overrides.get(name))
+            for name in base.column_names
+        }
+        self.column_names = list(base.column_names)
+        self.n_recipes = len(base) + len(delta)
+
+    def values(self, name):
+        return self.columns[name].to_numpy()
+
+    def to_frame(self):
+        return pd.DataFrame({
+            name: widen_floats(column.to_numpy()) for name, column in self.columns.items()
+        })
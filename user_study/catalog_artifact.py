@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Tartalom-hash alapú katalógus artifact
+A betanított TF-IDF vektorizáló, a ritka TF-IDF mátrix (és transzponált posting
+listái), az összetevő index (és auto-complete suffix tömbje), a kategória bitmapek, a recept-recept szomszéd listák,
+az összetevő csere jelöltek, a cím / útmutató BM25 index és az oszlopos receptkatalógus
+egyszer készül el (build lépés), a workerek csak betöltik -
+újratanítás csak ha a processed_recipes.csv tartalma megváltozik.
+
+A tömbök nyers .npy fájlok, amelyeket minden worker memory-mapped módban nyit meg:
+az operációs rendszer egyetlen példányt tart a page cache-ben, a workerek száma
+nem szorozza a memóriát.
+
+Használat:
+    python -m user_study.catalog_artifact [data/processed_recipes.csv]
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from user_study.catalog import RecipeCatalog, open_sparse, save_sparse
+from user_study.category_index import CategoryIndex
+from user_study.ingredient_index import IngredientIndex, SuggestionEngine
+from user_study.similarity_graph import SimilarityGraph
+from user_study.substitutions import SubstitutionIndex
+from user_study.text_index import TextIndex
+from user_study.tfidf_index import TfidfPostings
+
+ARTIFACT_FORMAT_VERSION = 11
+
+DEFAULT_ARTIFACT_ROOT = Path(__file__).parent.parent / "data" / "artifacts"
+
+
+def artifact_root():
+    """Artifact gyökérkönyvtár (CATALOG_ARTIFACT_DIR felülírhatja)"""
+    return Path(os.environ.get('CATALOG_ARTIFACT_DIR', DEFAULT_ARTIFACT_ROOT))
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """A fájl tartalmának SHA-256 hash-e (streamelve, nem tölti be egyben)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def artifact_dir_for(csv_path):
+    """Az adott CSV tartalmához tartozó artifact könyvtár"""
+    return artifact_root() / file_hash(csv_path)
+
+
+def file_signature(path):
+    """(mtime_ns, méret) - olcsó változásfigyeléshez (None, ha a fájl nem létezik)"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@contextmanager
+def build_lock(directory):
+    """Építési zár (flock) az artifact könyvtárra - egyszerre csak egy folyamat illeszt
+
+    A többi worker megvárja, majd a kész artifactot nyitja meg.
+    """
+    directory = Path(directory)
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    with open(directory.parent / f".{directory.name}.lock", 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def save_artifact(directory, vectorizer, tfidf_matrix, ingredient_index, catalog, csv_hash=None,
+                  similarity_graph=None, substitutions=None, category_index=None, text_index=None,
+                  suggestions=None):
+    """Artifact mentése atomikusan: ideiglenes könyvtárba ír, majd átnevezi
+
+    similarity_graph: előre számolt szomszéd listák (None: a TF-IDF mátrixból számolódik)
+    substitutions: összetevő csere index (None: az összetevő indexből és a katalógusból számolódik)
+    category_index: kategória bitmapek (None: a katalógus category oszlopából számolódik)
+    text_index: BM25 szöveges index (None: a katalógus title / instructions oszlopaiból számolódik)
+    suggestions: auto-complete motor (None: az összetevő index szótárából számolódik)
+    """
+    directory = Path(directory)
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f".{directory.name}-", dir=directory.parent))
+
+    try:
+        # A stop_words_ attribútum csak debugra kell és nagy lehet
+        vectorizer.stop_words_ = None
+        with open(tmp_dir / "vectorizer.pkl", 'wb') as f:
+            pickle.dump(vectorizer, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        save_sparse(tmp_dir, "tfidf", tfidf_matrix.tocsr())
+        TfidfPostings.from_matrix(tfidf_matrix).save(tmp_dir / "tfidf_postings")
+        ingredient_index.save(tmp_dir / "ingredient_index")
+        if suggestions is None:
+            suggestions = SuggestionEngine.build(ingredient_index.vocabulary, ingredient_index.doc_freq)
+        suggestions.save(tmp_dir / "suggestions")
+        catalog.save(tmp_dir / "catalog")
+        if category_index is None:
+            category_index = CategoryIndex.from_catalog(catalog)
+        category_index.save(tmp_dir / "category_index")
+        if similarity_graph is None:
+            similarity_graph = SimilarityGraph.from_matrix(tfidf_matrix)
+        similarity_graph.save(tmp_dir / "similarity")
+        if substitutions is None:
+            substitutions = SubstitutionIndex.build(ingredient_index, catalog)
+        substitutions.save(tmp_dir / "substitutions")
+        if text_index is None:
+            text_index = TextIndex.from_catalog(catalog)
+        text_index.save(tmp_dir / "text_index")
+
+        manifest = {
+            'format_version': ARTIFACT_FORMAT_VERSION,
+            'csv_hash': csv_hash or directory.name,
+            'n_recipes': len(catalog),
+            'n_features': int(tfidf_matrix.shape[1]),
+            'n_ingredients': len(ingredient_index),
+            'n_categories': len(category_index),
+            'n_text_terms': len(text_index),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+        }
+        with open(tmp_dir / "manifest.json", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        try:
+            os.rename(tmp_dir, directory)
+        except OSError:
+            # Egy másik worker/build közben már elkészítette ugyanezt
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        return directory
+
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def load_artifact(directory):
+    """Artifact megnyitása (memory-mapped) - None ha nem létezik vagy más formátumú"""
+    directory = Path(directory)
+    manifest_path = directory / "manifest.json"
+    if not manifest_path.exists():
+        return None
+
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != ARTIFACT_FORMAT_VERSION:
+        return None
+
+    with open(directory / "vectorizer.pkl", 'rb') as f:
+        vectorizer = pickle.load(f)
+
+    ingredient_index = IngredientIndex.open(directory / "ingredient_index")
+    return {
+        'manifest': manifest,
+        'vectorizer': vectorizer,
+        'tfidf_matrix': open_sparse(directory, "tfidf"),
+        'tfidf_postings': TfidfPostings.open(directory / "tfidf_postings"),
+        'ingredient_index': ingredient_index,
+        'suggestions': SuggestionEngine.open(
+            directory / "suggestions", ingredient_index.vocabulary, ingredient_index.doc_freq
+        ),
+        'catalog': RecipeCatalog.open(directory / "catalog"),
+        'category_index': CategoryIndex.open(directory / "category_index"),
+        'similarity_graph': SimilarityGraph.open(directory / "similarity"),
+        'substitutions': SubstitutionIndex.open(directory / "substitutions"),
+        'text_index': TextIndex.open(directory / "text_index")
+    }
+
+
+def main():
+    """Build parancs: artifact elkészítése a feldolgozott CSV-ből"""
+    from user_study.hybrid_recommender import HybridRecipeRecommender
+
+    csv_path = Path(sys.argv[1] if len(sys.argv) > 1 else "data/processed_recipes.csv")
+    if not csv_path.exists():
+        print(f"❌ CSV nem található: {csv_path}")
+        return False
+
+    recommender = HybridRecipeRecommender(str(csv_path))
+    print(f"📦 Katalógus artifact: {recommender.artifact_dir}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Katalógus méret-benchmark (teljes katalógus mód)
+Szintetikus katalógust készít a feldolgozott receptekből (összetevők újrakeverésével),
+majd külön processzekben méri az artifact építést, a worker indulást, a memóriát és a
+get_recommendations / keresés / auto-complete késleltetését.
+
+Használat:
+    python -m user_study.catalog_benchmark [--source data/processed_recipes_full.csv]
+                                           [--sizes 2000 100000 1000000] [--workdir /tmp/catalog_benchmark]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from user_study.catalog import iter_csv_chunks
+
+DEFAULT_SIZES = (2_000, 100_000, 1_000_000)
+CHUNK_SIZE = 50_000
+N_QUERIES = 200
+
+
+def make_synthetic_catalog(source_csv, n_recipes, output_csv, seed=42):
+    """N receptes CSV: forrás receptek + az összetevők ~30%-a véletlen szótárelemre cserélve"""
+    source = pd.concat(iter_csv_chunks(source_csv), ignore_index=True)
+    rng = np.random.default_rng(seed)
+
+    ingredient_lists = [
+        [item.strip() for item in str(text).split(',') if item.strip()]
+        for text in source['ingredients'].fillna('')
+    ]
+    vocabulary = np.array(sorted({item for items in ingredient_lists for item in items}), dtype=object)
+
+    with open(output_csv, 'w', encoding='utf-8', newline='') as f:
+        for start in range(0, n_recipes, CHUNK_SIZE):
+            size = min(CHUNK_SIZE, n_recipes - start)
+            picks = rng.integers(0, len(source), size)
+            chunk = source.iloc[picks].reset_index(drop=True)
+
+            ingredients = []
+            for pick in picks:
+                items = list(ingredient_lists[pick])
+                swap = rng.random(len(items)) < 0.3
+                for pos in np.flatnonzero(swap):
+                    items[pos] = vocabulary[rng.integers(len(vocabulary))]
+                ingredients.append(', '.join(items))
+
+            chunk['ingredients'] = ingredients
+            chunk['recipeid'] = np.arange(start + 1, start + size + 1)
+            for column in ('ESI', 'HSI', 'PPI'):
+                jitter = rng.normal(0, 2.0, size).astype(np.float32)
+                chunk[column] = np.clip(chunk[column] + jitter, 0, 100)
+            chunk['composite_score'] = chunk['ESI'] * 0.4 + chunk['HSI'] * 0.4 + chunk['PPI'] * 0.2
+
+            chunk.to_csv(f, index=False, header=(start == 0))
+
+    return output_csv
+
+
+def _memory_mb():
+    """Rezidens memória (anon = worker-privát, file = megosztható mmap lapok) MB-ban"""
+    status = {}
+    with open('/proc/self/status', encoding='utf-8') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('VmRSS', 'RssAnon', 'RssFile', 'VmHWM'):
+                status[key] = int(value.split()[0]) / 1024
+    return status
+
+
+def _percentiles(samples):
+    samples_ms = np.asarray(samples) * 1000
+    return {'p50_ms': float(np.percentile(samples_ms, 50)), 'p95_ms': float(np.percentile(samples_ms, 95))}
+
+
+def _timed(function, arguments):
+    samples = []
+    for argument in arguments:
+        start = time.perf_counter()
+        function(argument)
+        samples.append(time.perf_counter() - start)
+    return _percentiles(samples)
+
+
+def run_build(csv_path):
+    """Hideg indulás: CSV betöltés, illesztés, artifact mentés"""
+    from user_study.hybrid_recommender import HybridRecipeRecommender
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender = HybridRecipeRecommender(str(csv_path))
+    build_seconds = time.perf_counter() - start
+
+    artifact_bytes = sum(p.stat().st_size for p in Path(recommender.artifact_dir).rglob('*') if p.is_file())
+    return {
+        'build_s': build_seconds,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'artifact_mb': artifact_bytes / 2**20
+    }
+
+
+def run_serve(csv_path):
+    """Meleg indulás az artifactból + lekérdezés késleltetések (query cache nélkül)"""
+    os.environ['QUERY_CACHE_SIZE'] = '0'
+    from user_study.hybrid_recommender import HybridRecipeRecommender
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender = HybridRecipeRecommender(str(csv_path))
+    open_seconds = time.perf_counter() - start
+    memory = _memory_mb()
+
+    # Lekérdezések a gyakori összetevőkből (1-3 kifejezés), szabad szöveg a TF-IDF úthoz
+    rng = np.random.default_rng(0)
+    index = recommender.ingredient_index
+    frequent = np.argsort(-index.doc_freq)[:500]
+    searches = [
+        ', '.join(index.vocabulary[i] for i in rng.choice(frequent, rng.integers(1, 4), replace=False))
+        for _ in range(N_QUERIES)
+    ]
+    prefixes = [index.vocabulary[i][:3] for i in rng.choice(frequent, N_QUERIES)]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        profile = {
+            'open_s': open_seconds,
+            'rss_mb': memory.get('VmRSS'),
+            'rss_anon_mb': memory.get('RssAnon'),
+            'rss_file_mb': memory.get('RssFile'),
+            'no_search': _timed(lambda _: recommender.get_recommendations('v3', ''), range(N_QUERIES)),
+            'search': _timed(lambda q: recommender.get_recommendations('v3', q), searches),
+            'tfidf_search': _timed(recommender._tfidf_search, searches),
+            'suggest': _timed(lambda p: recommender.suggestion_engine._suggest(p, 8), prefixes)
+        }
+    return profile
+
+
+def _run_subprocess(mode, csv_path, env):
+    output = subprocess.run(
+        [sys.executable, '-m', 'user_study.catalog_benchmark', f'--{mode}', str(csv_path)],
+        check=True, capture_output=True, text=True, env=env
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def format_report(results):
+    """Markdown táblázat a README-hez"""
+    lines = [
+        "| Receptek | Build (s) | Build csúcs RSS (MB) | Artifact (MB) | Indulás (s) | RSS privát / mmap (MB) "
+        "| Ajánlás p50/p95 (ms) | Keresés p50/p95 (ms) | TF-IDF p50/p95 (ms) | Auto-complete p50 (ms) |",
+        "|---|---|---|---|---|---|---|---|---|---|"
+    ]
+    for n_recipes, build, serve in results:
+        lines.append(
+            f"| {n_recipes:,} | {build['build_s']:.1f} | {build['peak_rss_mb']:.0f} | {build['artifact_mb']:.0f} "
+            f"| {serve['open_s']:.2f} | {serve['rss_anon_mb']:.0f} / {serve['rss_file_mb']:.0f} "
+            f"| {serve['no_search']['p50_ms']:.2f} / {serve['no_search']['p95_ms']:.2f} "
+            f"| {serve['search']['p50_ms']:.2f} / {serve['search']['p95_ms']:.2f} "
+            f"| {serve['tfidf_search']['p50_ms']:.2f} / {serve['tfidf_search']['p95_ms']:.2f} "
+            f"| {serve['suggest']['p50_ms']:.3f} |"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Katalógus méret-benchmark")
+    parser.add_argument('--source', default="data/processed_recipes_full.csv")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--workdir', default="/tmp/catalog_benchmark")
+    parser.add_argument('--build', help=argparse.SUPPRESS)
+    parser.add_argument('--serve', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Belső mód: egy mérés egy friss processzben
+    if args.build or args.serve:
+        result = run_build(args.build) if args.build else run_serve(args.serve)
+        print(json.dumps(result))
+        return True
+
+    workdir = Path(args.workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
+    env = dict(os.environ, CATALOG_ARTIFACT_DIR=str(workdir / "artifacts"))
+
+    results = []
+    for n_recipes in args.sizes:
+        csv_path = workdir / f"catalog_{n_recipes}.csv"
+        print(f"🔧 {n_recipes:,} recept: szintetikus katalógus...")
+        make_synthetic_catalog(args.source, n_recipes, csv_path)
+
+        print(f"📦 {n_recipes:,} recept: artifact build...")
+        build = _run_subprocess('build', csv_path, env)
+        print(f"⚡ {n_recipes:,} recept: kiszolgálás mérése...")
+        serve = _run_subprocess('serve', csv_path, env)
+        results.append((n_recipes, build, serve))
+
+    print()
+    print(format_report(results))
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Inkrementális katalógus szerkesztések (új / módosított / törölt receptek)
+A memory-mapped alap artifact változatlan marad; a szerkesztések egy append-only
+naplóba (journal.jsonl az artifact könyvtárban) kerülnek, amelyből minden worker
+ugyanazt a kis, memóriában tartott deltát építi fel. Időnként a delta beolvad az
+alapba (tömörítés = teljes újraillesztés egy új CSV-ből).
+"""
+
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from user_study.explanations import catalog_fragments
+from user_study.text_normalizer import normalize_text
+
+# Nyers pontszám oszlopok (a régebbi CSVProcessor kimenetekben _raw utótaggal)
+ENV_SCORE_COLUMNS = ('env_score_raw', 'env_score')
+NUTRI_SCORE_COLUMNS = ('nutri_score_raw', 'nutri_score')
+MEAL_SCORE_COLUMNS = ('meal_score_raw', 'meal_score')
+
+# Származtatott oszlopok: a szerkesztő nem adhatja meg, a delta építésekor számolódnak
+DERIVED_COLUMNS = ('recipeid', 'composite_score', 'ingredients_clean', 'pareto_layer',
+                   'explanation_prefix', 'explanation_labels')
+
+# Származtatott oszlop -> forrás mezők (ha a forrás változik, a régi érték elavult)
+DERIVED_SOURCES = {
+    'ESI': ENV_SCORE_COLUMNS,
+    'HSI': NUTRI_SCORE_COLUMNS,
+    'PPI': MEAL_SCORE_COLUMNS,
+}
+
+
+class CatalogJournal:
+    """Append-only szerkesztési napló + fájlzár a workerek közötti sorosításhoz"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock_path = self.path.with_suffix('.lock')
+        self.offset = 0  # eddig feldolgozott bájtok
+
+    @contextmanager
+    def locked(self):
+        """Kizárólagos zár (flock) a napló írásához - minden folyamatban ugyanaz a fájl"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield self
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def has_new(self):
+        """Van-e még nem feldolgozott bejegyzés (egy stat hívás)"""
+        try:
+            return self.path.stat().st_size > self.offset
+        except FileNotFoundError:
+            return False
+
+    def read_new(self):
+        """Az utolsó olvasás óta hozzáfűzött teljes sorok (a félig írt sor a következő körre marad)"""
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read()
+        except FileNotFoundError:
+            return []
+
+        end = data.rfind(b'\n') + 1
+        self.offset += end
+        return [json.loads(line) for line in data[:end].decode('utf-8').splitlines() if line.strip()]
+
+    def append(self, entry):
+        """Bejegyzés hozzáfűzése (a hívó tartja a zárat)"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _first_column(names, candidates):
+    return next((name for name in candidates if name in names), None)
+
+
+class CatalogDelta:
+    """Az alap katalógushoz képesti változások: törölt alap sorok + delta receptek
+
+    Módosításkor az alap sor törlődik (tombstone) és a frissített recept a deltába kerül,
+    így az alap tömbök soha nem íródnak.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.deleted = np.zeros(len(base), dtype=bool)
+        self.records = {}  # recipeid -> nyers mezők (beszúrási sorrend = delta sorrend)
+        self._base_rows = None
+        self._overrides = (None, {})  # (env tartomány, felülírt oszlopok) - tartományonként egyszer
+
+        names = base.column_names
+        self.env_column = _first_column(names, ENV_SCORE_COLUMNS)
+        self.nutri_column = _first_column(names, NUTRI_SCORE_COLUMNS)
+        self.meal_column = _first_column(names, MEAL_SCORE_COLUMNS)
+
+        recipe_ids = base.values('recipeid') if 'recipeid' in names else np.empty(0)
+        self.max_recipe_id = int(recipe_ids.max()) if len(recipe_ids) else 0
+
+        # Az alap ESI normalizálás tartománya (min/max env_score)
+        self.base_env = None
+        self.base_env_range = None
+        if self.env_column is not None and len(base):
+            self.base_env = base.values(self.env_column).astype(np.float64)
+            self.base_env_range = (np.nanmin(self.base_env), np.nanmax(self.base_env))
+
+    def __len__(self):
+        """A delta mérete (tömörítési küszöbhöz): delta receptek + törölt alap sorok"""
+        return len(self.records) + int(self.deleted.sum())
+
+    def is_empty(self):
+        return not self.records and not self.deleted.any()
+
+    def base_row(self, recipeid):
+        """Alap sor pozíciója recept id alapján (None, ha nincs)"""
+        if self._base_rows is None:
+            ids = self.base.values('recipeid') if 'recipeid' in self.base.column_names else []
+            self._base_rows = {int(recipe_id): row for row, recipe_id in enumerate(ids)}
+        return self._base_rows.get(int(recipeid))
+
+    def position(self, recipeid):
+        """Recept pozíciója a rétegzett katalógusban (alap sor vagy n_base + delta sor), None ha nincs"""
+        recipeid = int(recipeid)
+        if recipeid in self.records:
+            return len(self.deleted) + list(self.records).index(recipeid)
+        row = self.base_row(recipeid)
+        if row is None or self.deleted[row]:
+            return None
+        return row
+
+    def __contains__(self, recipeid):
+        if recipeid in self.records:
+            return True
+        row = self.base_row(recipeid)
+        return row is not None and not self.deleted[row]
+
+    def apply(self, entry):
+        """Egy napló bejegyzés alkalmazása ('add', 'update', 'delete')"""
+        op, recipeid = entry['op'], int(entry['recipeid'])
+        self.max_recipe_id = max(self.max_recipe_id, recipeid)
+
+        if op == 'delete':
+            self.records.pop(recipeid, None)
+            row = self.base_row(recipeid)
+            if row is not None:
+                self.deleted[row] = True
+            return
+
+        fields = dict(entry.get('fields', {}))
+        if recipeid in self.records:
+            record = self.records[recipeid]
+        else:
+            row = self.base_row(recipeid)
+            if row is not None and not self.deleted[row]:
+                record = self.base.rows([row])[0]
+                self.deleted[row] = True
+            else:
+                record = {}
+
+        # A megváltozott forrásból származtatott régi pontszám elavult
+        for derived, sources in DERIVED_SOURCES.items():
+            if derived not in fields and any(source in fields for source in sources):
+                record.pop(derived, None)
+
+        record.update(fields)
+        record['recipeid'] = recipeid
+        self.records[recipeid] = record
+
+    def env_range(self):
+        """Aktuális env_score tartomány: élő alap sorok + delta receptek"""
+        if self.env_column is None:
+            return None
+        values = [self.base_env[~self.deleted]] if self.base_env is not None else []
+        values.append(np.array(
+            [record.get(self.env_column) for record in self.records.values()], dtype=np.float64
+        ))
+        values = np.concatenate(values)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return None
+        return float(values.min()), float(values.max())
+
+    @staticmethod
+    def _esi(env, env_range):
+        env_min, env_max = env_range
+        if env_max == env_min:
+            return np.full_like(env, 70.0)
+        return 100 - ((env - env_min) / (env_max - env_min) * 100)
+
+    def overrides(self):
+        """Újranormalizált alap ESI + kompozit oszlop, ha az env tartomány megváltozott
+
+        Azonos tartományra ugyanaz az objektum (a hívók azonosság alapján látják a változást).
+        """
+        env_range = self.env_range()
+        if self.base_env is None or env_range is None or env_range == self.base_env_range:
+            return {}
+        if self._overrides[0] == env_range:
+            return self._overrides[1]
+
+        esi = self._esi(self.base_env, env_range)
+        composite = (
+            esi * 0.4 +
+            self.base.values('HSI') * 0.4 +
+            self.base.values('PPI') * 0.2
+        )
+        overrides = {
+            'ESI': esi.astype(self.base['ESI'].dtype),
+            'composite_score': composite.astype(self.base['composite_score'].dtype),
+        }
+        self._overrides = (env_range, overrides)
+        return overrides
+
+    def frame(self):
+        """A delta receptek DataFrame-ként, az alap katalógus oszlopaival és dtype-jaival"""
+        columns = self.base.column_names
+        records = list(self.records.values())
+        frame = pd.DataFrame.from_records(records, columns=columns)
+
+        def numbers(name):
+            if name is None or name not in frame:
+                return pd.Series(np.nan, index=frame.index)
+            return pd.to_numeric(frame[name], errors='coerce')
+
+        # ESI mindig az aktuális tartománnyal az env_score-ból (ha van), különben a megadott érték
+        env_range = self.env_range()
+        env = numbers(self.env_column)
+        esi = numbers('ESI')
+        if env_range is not None:
+            esi = esi.where(env.isna(), self._esi(env.to_numpy(), env_range))
+        frame['ESI'] = esi.fillna(70.0)
+        frame['HSI'] = numbers('HSI').fillna(numbers(self.nutri_column)).fillna(75.0)
+        frame['PPI'] = numbers('PPI').fillna(numbers(self.meal_column)).fillna(80.0)
+        frame['composite_score'] = frame['ESI'] * 0.4 + frame['HSI'] * 0.4 + frame['PPI'] * 0.2
+        frame['ingredients_clean'] = [normalize_text(text) for text in frame['ingredients'].tolist()]
+
+        prefixes, labels = catalog_fragments(frame)
+        frame['explanation_prefix'] = prefixes
+        frame['explanation_labels'] = labels
+
+        # Az alap oszlopokkal azonos típusok (a rétegzett oszlop így egységes)
+        for name in columns:
+            base_column = self.base[name]
+            if isinstance(base_column, np.ndarray):
+                frame[name] = numbers(name).fillna(0).astype(base_column.dtype)
+            else:
+                frame[name] = frame[name].astype(object).where(frame[name].notna(), None)
+        return frame[columns]
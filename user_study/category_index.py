@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Kategória index - kategóriánként egy tömörített bitmap + receptenkénti kategória kód
+Egy kategória szűrő (több kategória esetén a bitmapek VAGY-a) egyszer készül el, a
+keresési találatokra bitenkénti ÉS-ként (bit teszt) alkalmazódik; a facet számok a
+kód tömbön egy bincount-tal adódnak, DataFrame maszkolás nélkül.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+
+def bitmap_contains(bitmap, indices):
+    """Az indexek bitje a tömörített (np.packbits) bitmapben - O(k)"""
+    indices = np.asarray(indices, dtype=np.intp)
+    return ((bitmap[indices >> 3] >> (7 - (indices & 7))) & 1).astype(bool)
+
+
+def clean_category(value):
+    """Kategória érték tisztítása (hiányzó érték: üres, azaz kategória nélküli)"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    return str(value).strip()
+
+
+class CategoryIndex:
+    """Kategóriák (gyakoriság szerint) + receptenkénti kód (-1: nincs) + kategóriánkénti bitmap"""
+
+    def __init__(self, categories, codes, bitmaps):
+        self.categories = list(categories)
+        self.category_ids = {name: i for i, name in enumerate(self.categories)}
+        self.codes = codes        # int32, receptenként
+        self.bitmaps = bitmaps    # uint8, kategóriák × ceil(n/8)
+        self.n_recipes = len(codes)
+
+    @classmethod
+    def from_values(cls, values, categories=None):
+        """Építés a kategória oszlopból
+
+        categories: meglévő kategória lista, amelynek id-i megmaradnak (az újak a végére kerülnek)
+        """
+        cleaned = [clean_category(value) for value in values]
+        category_ids = {name: i for i, name in enumerate(categories or [])}
+
+        if categories is None:
+            # Gyakoriság szerint csökkenő, azonosnál név szerinti sorrend
+            names, counts = np.unique([name for name in cleaned if name], return_counts=True)
+            for name in names[np.lexsort((names, -counts))].tolist():
+                category_ids[name] = len(category_ids)
+
+        codes = np.array(
+            [category_ids.setdefault(name, len(category_ids)) if name else -1 for name in cleaned],
+            dtype=np.int32
+        )
+        # Minden recept bitje egy menetben (a kategóriák számától független)
+        rows = np.flatnonzero(codes >= 0)
+        bitmaps = np.zeros((len(category_ids), (len(codes) + 7) // 8), dtype=np.uint8)
+        np.bitwise_or.at(bitmaps, (codes[rows], rows >> 3), (128 >> (rows & 7)).astype(np.uint8))
+
+        return cls(sorted(category_ids, key=category_ids.get), codes, bitmaps)
+
+    @classmethod
+    def from_catalog(cls, catalog, categories=None):
+        """Építés egy (oszlopos) katalógusból - category oszlop nélkül minden recept kategória nélküli"""
+        if 'category' not in catalog.column_names:
+            return cls.from_values([''] * len(catalog), categories)
+        return cls.from_values(catalog.values('category'), categories)
+
+    def save(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / "codes.npy", self.codes)
+        np.save(directory / "bitmaps.npy", self.bitmaps)
+        with open(directory / "categories.json", 'w', encoding='utf-8') as f:
+            json.dump(self.categories, f, ensure_ascii=False)
+
+    @classmethod
+    def open(cls, directory):
+        directory = Path(directory)
+        with open(directory / "categories.json", encoding='utf-8') as f:
+            categories = json.load(f)
+        return cls(
+            categories,
+            np.load(directory / "codes.npy", mmap_mode='r'),
+            np.load(directory / "bitmaps.npy", mmap_mode='r')
+        )
+
+    def __len__(self):
+        return len(self.categories)
+
+    def category_id(self, name):
+        """Kategória azonosítója vagy None"""
+        return self.category_ids.get(clean_category(name))
+
+    def bitmap(self, category_ids):
+        """A kategóriák bitmapjeinek VAGY-a (tömörített)"""
+        if not category_ids:
+            return np.zeros((self.n_recipes + 7) // 8, dtype=np.uint8)
+        return np.bitwise_or.reduce(self.bitmaps[list(category_ids)], axis=0)
+
+    def codes_of(self, indices):
+        return np.asarray(self.codes)[np.asarray(indices, dtype=np.intp)]
+
+
+class LayeredCategoryIndex:
+    """Alap index + delta receptek kategóriái közös kategória listával
+
+    A szűrő bitmap a LayeredCatalog index terében készül (alap bitek a törölt sorok
+    nélkül, majd a delta bitek); egy szűrőre egyszer, O(n / 8) munkával.
+    """
+
+    def __init__(self, base, delta, deleted):
+        self.base = base
+        self.delta = delta
+        self.deleted = deleted
+        self.n_base = base.n_recipes
+        self.n_recipes = self.n_base + delta.n_recipes
+        self.categories = delta.categories
+        self.category_ids = delta.category_ids
+
+    def __len__(self):
+        return len(self.categories)
+
+    def category_id(self, name):
+        return self.delta.category_id(name)
+
+    def bitmap(self, category_ids):
+        base_ids = [i for i in category_ids if i < len(self.base)]
+        base_bits = np.unpackbits(self.base.bitmap(base_ids), count=self.n_base).astype(bool)
+        delta_bits = np.unpackbits(self.delta.bitmap(category_ids), count=self.delta.n_recipes).astype(bool)
+        return np.packbits(np.concatenate((base_bits & ~self.deleted, delta_bits)))
+
+    def codes_of(self, indices):
+        indices = np.asarray(indices, dtype=np.intp)
+        in_base = indices < self.n_base
+        codes = np.empty(len(indices), dtype=np.int32)
+        codes[in_base] = self.base.codes_of(indices[in_base])
+        codes[~in_base] = self.delta.codes_of(indices[~in_base] - self.n_base)
+        return codes
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Kollaboratív szűrés az interactions táblából (offline tanítás, kiszolgáláskor egy skalárszorzat)
+A (user_id, recipe_id, rating) értékelésekből ritka felhasználó × recept mátrix készül, erre
+implicit ALS (Hu-Koren-Volinsky) illeszkedik: a felhasználónkénti normálegyenletek egy
+kötegben, vektorizált NumPy-jal / LAPACK-kal oldódnak meg (a BLAS szálai párhuzamosítanak).
+A float32 faktor tömbök lemezre kerülnek; a HybridRecipeRecommender csak betölti őket.
+
+Használat:
+    python -m user_study.collaborative [user_study.db] [data/cf_model]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+DEFAULT_MODEL_DIR = Path(__file__).parent.parent / "data" / "cf_model"
+
+# Értékelés -> preferencia: 3 csillagtól pozitív, a bizalom a csillagokkal nő
+POSITIVE_RATING = 3
+
+# Egy kötegben megoldott felhasználók / receptek (a köteg f × f mátrixai a memóriában)
+SOLVE_BATCH = 4096
+
+
+def model_dir():
+    """Faktor tömbök könyvtára (CF_MODEL_DIR felülírhatja)"""
+    return Path(os.environ.get('CF_MODEL_DIR', DEFAULT_MODEL_DIR))
+
+
+def cf_blend_weight():
+    """A kollaboratív pontszám súlya a végső pontszámban (CF_BLEND_WEIGHT, alapból 0 = ki)"""
+    return float(os.environ.get('CF_BLEND_WEIGHT', 0))
+
+
+def load_interactions(db_path):
+    """Értékelések az SQLite adatbázisból; felhasználó-recept páronként a legutolsó"""
+    with sqlite3.connect(db_path) as conn:
+        df = pd.read_sql_query(
+            'SELECT user_id, recipe_id, rating FROM interactions '
+            'WHERE user_id IS NOT NULL AND recipe_id IS NOT NULL AND rating IS NOT NULL '
+            'ORDER BY id',
+            conn
+        )
+    return df.drop_duplicates(['user_id', 'recipe_id'], keep='last').reset_index(drop=True)
+
+
+def confidence_matrix(interactions, alpha=10.0):
+    """Felhasználó × recept bizalom mátrix (CSR) + a sor/oszlop id-k
+
+    Pozitív preferencia a POSITIVE_RATING feletti értékeléseknél, bizalom:
+    alpha · (rating - POSITIVE_RATING + 1); az alacsony értékelés nem pozitív jel.
+    """
+    positive = interactions[interactions['rating'] >= POSITIVE_RATING]
+    user_ids, user_rows = np.unique(positive['user_id'].to_numpy(), return_inverse=True)
+    recipe_ids, recipe_cols = np.unique(positive['recipe_id'].to_numpy(), return_inverse=True)
+    confidence = alpha * (positive['rating'].to_numpy(dtype=np.float32) - POSITIVE_RATING + 1)
+
+    matrix = sparse.csr_matrix(
+        (confidence, (user_rows, recipe_cols)),
+        shape=(len(user_ids), len(recipe_ids)), dtype=np.float32
+    )
+    return matrix, user_ids, recipe_ids
+
+
+def _als_step(confidence, fixed, regularization):
+    """Egy ALS fél-lépés: minden sor faktora a rögzített oldal faktoraiból
+
+    (YᵀY + Yᵤᵀ (Cᵤ - I) Yᵤ + λI) xᵤ = Yᵤᵀ cᵤ  - a YᵀY egyszer, a sorok kötegben oldódnak meg.
+    """
+    n_rows, n_factors = confidence.shape[0], fixed.shape[1]
+    gram = fixed.T @ fixed + regularization * np.eye(n_factors, dtype=np.float32)
+    result = np.zeros((n_rows, n_factors), dtype=np.float32)
+
+    for start in range(0, n_rows, SOLVE_BATCH):
+        block = confidence[start:start + SOLVE_BATCH]
+        if block.nnz == 0:
+            continue
+        vectors = fixed[block.indices]                      # nnz × f
+        weights = block.data                                # c - 1 (a bizalom többlete)
+
+        # Soronkénti összegek (CSR szegmensek): Σ (c-1) y yᵀ és Σ c y
+        has_data = np.diff(block.indptr) > 0
+        segments = block.indptr[:-1][has_data]
+        outer = (vectors * weights[:, None])[:, :, None] * vectors[:, None, :]
+        lhs = np.add.reduceat(outer, segments, axis=0) + gram
+        rhs = np.add.reduceat(vectors * (1 + weights)[:, None], segments, axis=0)
+
+        rows = np.flatnonzero(has_data) + start
+        result[rows] = np.linalg.solve(lhs, rhs[:, :, None])[:, :, 0]
+    return result
+
+
+def train_als(confidence, factors=16, regularization=0.1, iterations=15, seed=0):
+    """Implicit ALS: (felhasználó faktorok, recept faktorok), float32"""
+    rng = np.random.default_rng(seed)
+    n_users, n_items = confidence.shape
+    user_factors = rng.normal(0, 0.01, (n_users, factors)).astype(np.float32)
+    item_factors = rng.normal(0, 0.01, (n_items, factors)).astype(np.float32)
+    by_item = confidence.T.tocsr()
+
+    for _ in range(iterations):
+        user_factors = _als_step(confidence, item_factors, regularization)
+        item_factors = _als_step(by_item, user_factors, regularization)
+    return user_factors, item_factors
+
+
+class CollaborativeModel:
+    """Betanított faktorok: felhasználó id -> vektor, recept id -> vektor"""
+
+    def __init__(self, user_factors, item_factors, user_ids, recipe_ids, metadata=None):
+        self.user_factors = user_factors
+        self.item_factors = item_factors
+        self.user_ids = np.asarray(user_ids)
+        self.recipe_ids = np.asarray(recipe_ids)
+        self.metadata = metadata or {}
+        self._user_rows = {int(user_id): row for row, user_id in enumerate(self.user_ids)}
+
+    def save(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / "user_factors.npy", self.user_factors)
+        np.save(directory / "item_factors.npy", self.item_factors)
+        np.save(directory / "user_ids.npy", self.user_ids)
+        np.save(directory / "recipe_ids.npy", self.recipe_ids)
+        with open(directory / "model.json", 'w', encoding='utf-8') as f:
+            json.dump(self.metadata, f, indent=2)
+
+    @classmethod
+    def open(cls, directory):
+        """Megnyitás (memory-mapped) - None, ha nincs betanított modell"""
+        directory = Path(directory)
+        if not (directory / "model.json").exists():
+            return None
+        with open(directory / "model.json", encoding='utf-8') as f:
+            metadata = json.load(f)
+        arrays = [
+            np.load(directory / f"{name}.npy", mmap_mode='r')
+            for name in ('user_factors', 'item_factors', 'user_ids', 'recipe_ids')
+        ]
+        return cls(*arrays, metadata=metadata)
+
+    def user_vector(self, user_id):
+        """A felhasználó faktora (None, ha a tanításkor még nem értékelt)"""
+        if user_id is None:
+            return None
+        row = self._user_rows.get(int(user_id))
+        return None if row is None else np.asarray(self.user_factors[row])
+
+    def item_rows(self, recipe_ids):
+        """Recept id-k -> faktor sorok (-1: a modell nem ismeri a receptet)"""
+        recipe_ids = np.asarray(recipe_ids)
+        if len(self.recipe_ids) == 0:
+            return np.full(len(recipe_ids), -1, dtype=np.int32)
+        positions = np.minimum(np.searchsorted(self.recipe_ids, recipe_ids), len(self.recipe_ids) - 1)
+        found = self.recipe_ids[positions] == recipe_ids
+        return np.where(found, positions, -1).astype(np.int32)
+
+    def scores(self, user_vector, item_rows):
+        """Becsült preferencia a megadott faktor sorokra (ismeretlen recept: 0) - egy skalárszorzat"""
+        scores = np.zeros(len(item_rows), dtype=np.float32)
+        known = item_rows >= 0
+        scores[known] = self.item_factors[item_rows[known]] @ user_vector
+        return scores
+
+
+def main():
+    """Tanítás az SQLite interactions táblából, faktorok mentése"""
+    db_path = Path(sys.argv[1] if len(sys.argv) > 1 else "user_study.db")
+    output_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else model_dir()
+    if not db_path.exists():
+        print(f"❌ Adatbázis nem található: {db_path}")
+        return False
+
+    interactions = load_interactions(db_path)
+    confidence, user_ids, recipe_ids = confidence_matrix(interactions)
+    print(f"📊 {len(interactions)} értékelés, {len(user_ids)} felhasználó × {len(recipe_ids)} recept "
+          f"({confidence.nnz} pozitív)")
+    if confidence.nnz == 0:
+        print("⚠️ Nincs pozitív értékelés, a modell nem készül el")
+        return False
+
+    start = time.perf_counter()
+    user_factors, item_factors = train_als(confidence)
+    print(f"🧮 ALS kész: {time.perf_counter() - start:.1f} s")
+
+    CollaborativeModel(user_factors, item_factors, user_ids, recipe_ids, metadata={
+        'n_interactions': int(len(interactions)),
+        'n_users': int(len(user_ids)),
+        'n_recipes': int(len(recipe_ids)),
+        'factors': int(user_factors.shape[1]),
+        'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }).save(output_dir)
+    print(f"💾 Kollaboratív modell mentve: {output_dir}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Diverzitás újrarangsorolás (Maximal Marginal Relevance) a top pool felett
+A pool receptjei közti hasonlóság az előre számolt szomszéd listákból jön
+(SimilarityGraph), így egy kérés csak O(k²) kikeresés. A/B/C karonként
+kapcsolható: MMR_ARMS=v2,v3 (alapból egyik karon sem).
+"""
+
+import os
+
+import numpy as np
+
+# Relevancia vs. diverzitás súlya (1 = csak relevancia, 0 = csak diverzitás)
+DEFAULT_MMR_LAMBDA = 0.5
+
+
+def mmr_arms():
+    """Azok a karok (v1/v2/v3), ahol a pool MMR-rel választ (MMR_ARMS env, vesszővel)"""
+    return {arm.strip() for arm in os.environ.get('MMR_ARMS', '').split(',') if arm.strip()}
+
+
+def mmr_lambda():
+    return float(os.environ.get('MMR_LAMBDA', DEFAULT_MMR_LAMBDA))
+
+
+def mmr_select(relevance, similarity, k, lambda_=DEFAULT_MMR_LAMBDA, first=None):
+    """k pozíció mohó MMR sorrendben: λ · relevancia - (1 - λ) · max hasonlóság a már kiválasztottakhoz
+
+    relevance: a pool pontszámai (a poolon belül 0-1 közé skálázva)
+    similarity: k × k páronkénti hasonlóság
+    first: az első kiválasztott pozíció (None: a legrelevánsabb)
+    """
+    relevance = np.asarray(relevance, dtype=np.float64)
+    k = min(k, len(relevance))
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+
+    spread = relevance.max() - relevance.min()
+    relevance = (relevance - relevance.min()) / spread if spread > 0 else np.ones_like(relevance)
+
+    selected = [int(np.argmax(relevance)) if first is None else int(first)]
+    max_similarity = np.array(similarity[:, selected[0]], dtype=np.float64)
+    while len(selected) < k:
+        marginal = lambda_ * relevance - (1 - lambda_) * max_similarity
+        marginal[selected] = -np.inf
+        best = int(np.argmax(marginal))
+        selected.append(best)
+        max_similarity = np.maximum(max_similarity, similarity[:, best])
+
+    return np.array(selected, dtype=np.intp)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+V3 magyarázatok - előre számolt, receptenkénti szövegrészek
+A pontszámfüggő részek (összpontszám mondat, környezet/egészség/népszerűség címkék)
+a katalógus építésekor egyszer készülnek el és az artifactba kerülnek; kéréskor csak
+a keresési relevancia mondat illesztődik be.
+"""
+
+from user_study.scoring import DEFAULT_WEIGHTS
+
+BALANCED_SENTENCE = "🍽️ Kiegyensúlyozott összetétel minden szempontból"
+
+
+def explanation_fragments(env_score, health_score, pop_score, weights=DEFAULT_WEIGHTS):
+    """Egy recept pontszámfüggő részei: (összpontszám előtag, címkék ' • '-tel összefűzve)"""
+    env_weight, health_weight, pop_weight = weights
+    composite_score = env_score * env_weight + health_score * health_weight + pop_score * pop_weight
+    prefix = (
+        f"Ezt a receptet {composite_score:.1f}/100 összpontszám alapján ajánljuk "
+        f"({env_weight:.0%} környezeti + {health_weight:.0%} egészség + {pop_weight:.0%} népszerűség). "
+    )
+
+    labels = []
+    if env_score >= 70:
+        labels.append(f"🌱 Környezetbarát ({env_score:.0f}/100 pont)")
+    if health_score >= 70:
+        labels.append(f"💚 Egészséges ({health_score:.0f}/100 pont)")
+    if pop_score >= 70:
+        labels.append(f"⭐ Népszerű ({pop_score:.0f}/100 pont)")
+
+    return prefix, " • ".join(labels)
+
+
+def catalog_fragments(df):
+    """Az egész katalógus részei (ESI/HSI/PPI oszlopokból) - két oszlop a katalógusba"""
+    fragments = [
+        explanation_fragments(env_score, health_score, pop_score)
+        for env_score, health_score, pop_score in zip(
+            df['ESI'].tolist(), df['HSI'].tolist(), df['PPI'].tolist()
+        )
+    ]
+    prefixes = [prefix for prefix, _ in fragments]
+    labels = [label for _, label in fragments]
+    return prefixes, labels
+
+
+def relevance_sentence(relevance):
+    """Keresési relevancia mondat (üres, ha a recept nem illeszkedik)"""
+    if relevance >= 0.8:
+        return "🔍 Tökéletesen illeszkedik a keresett összetevőkhöz"
+    if relevance >= 0.5:
+        return f"🔍 Jól illeszkedik a kereséshez ({relevance:.0%})"
+    if relevance > 0:
+        return "🔍 Részben tartalmazza a keresett összetevőket"
+    return ""
+
+
+def swap_sentence(swap):
+    """Fenntartható csere tipp (forrás, cél, becsült ESI javulás) -> mondat (üres, ha nincs csere)"""
+    if swap is None:
+        return ""
+    source, target, gain = swap
+    return f"🔄 Fenntarthatóbb változat: {source} helyett {target} (becslés: kb. +{gain:.0f} ESI pont)"
+
+
+def compose_explanation(prefix, labels, relevance="", tip=""):
+    """Előtag + relevancia mondat + címkék (ha egyik sincs: kiegyensúlyozott összetétel) + csere tipp"""
+    body = " • ".join(part for part in (relevance, labels) if part) or BALANCED_SENTENCE
+    return prefix + " • ".join(part for part in (body, tip) if part)
@@ -0,0 +1,1284 @@
+#!/usr/bin/env python3
+"""
+Hibrid receptajánló - keresés + content filtering + egységes scoring
+Flask-független modul, így offline build lépésekből is importálható
+"""
+
+import functools
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from user_study.catalog import (
+    CatalogWriter, LayeredCatalog, LayeredColumn, RecipeCatalog, iter_csv_chunks, widen_floats
+)
+from user_study.catalog_artifact import (
+    artifact_dir_for, build_lock, file_signature, load_artifact, save_artifact
+)
+from user_study.category_index import CategoryIndex, LayeredCategoryIndex, bitmap_contains
+from user_study.catalog_delta import (
+    DERIVED_COLUMNS, ENV_SCORE_COLUMNS, MEAL_SCORE_COLUMNS, NUTRI_SCORE_COLUMNS, CatalogDelta, CatalogJournal
+)
+from user_study.collaborative import CollaborativeModel, cf_blend_weight, model_dir
+from user_study.diversity import mmr_arms, mmr_lambda, mmr_select
+from user_study.explanations import (
+    compose_explanation, explanation_fragments, relevance_sentence, swap_sentence
+)
+from user_study.ingredient_index import (
+    IngredientIndex, LayeredIngredientIndex, TrigramIndex, SuggestionEngine
+)
+from user_study.pareto import LayeredParetoIndex, ParetoIndex, pareto_layers
+from user_study.query_cache import QueryResultCache
+from user_study.recipe_pipeline import catalog_columns
+from user_study.rng import make_rng
+from user_study.similarity_graph import SimilarityGraph
+from user_study.substitutions import SubstitutionIndex, swap_tips_enabled
+from user_study.scoring import (
+    DEFAULT_WEIGHTS, SCORE_COLUMNS, SEARCH_BOOST_WEIGHT, ScoringEngine, weights_from_preferences
+)
+from user_study.text_index import LayeredTextIndex, TextIndex, text_fusion_weight
+from user_study.text_normalizer import normalize_text
+from user_study.tfidf_index import LayeredTfidfPostings, TfidfPostings
+
+
+# Előre számolt magyarázat részek a katalógusban (nem részei az ajánlás dict-nek)
+EXPLANATION_COLUMNS = ('explanation_prefix', 'explanation_labels')
+
+# Az ajánlás dict-ekbe (sablonok, API) kerülő recept mezők - a csak indexeléshez tárolt
+# oszlopok (ingredients_clean, pareto_layer, magyarázat részek) kimaradnak
+PUBLIC_COLUMNS = (
+    ('recipeid', 'title', 'ingredients', 'instructions', 'category', 'images')
+    + ENV_SCORE_COLUMNS + NUTRI_SCORE_COLUMNS + MEAL_SCORE_COLUMNS
+    + ('ESI', 'HSI', 'PPI', 'composite_score')
+)
+
+# Kötelező mezők új recepthez
+REQUIRED_RECIPE_FIELDS = ('title', 'ingredients')
+
+# Ajánlási módok: 'standard' (pontszám top 15 + véletlen minta), 'pareto' (legjobb kompromisszum)
+RECOMMENDATION_MODES = ('standard', 'pareto')
+
+# Keresési módok: 'ingredients' (összetevő egyezés), 'text' (BM25 a címen és az útmutatón),
+# 'fusion' (a kettő relevanciájának súlyozott összege, TEXT_FUSION_WEIGHT)
+SEARCH_MODES = ('ingredients', 'text', 'fusion')
+
+# Összevont keresésnél ennyi BM25 találat relevanciája számít (a többi jelöltnél 0)
+TEXT_CANDIDATES = 100
+
+# Pareto mód kereséssel: ennyi találat saját rétegei számolódnak
+PARETO_CANDIDATES = 200
+
+# Kollaboratív újrarangsorolás keresés nélkül: a profil szerinti top jelöltek száma
+CF_CANDIDATES = 100
+
+
+def _catalog_snapshot(method):
+    """A metódus a napló szinkronizálása után, konzisztens katalógus állapoton fut"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._catalog_lock:
+            self._sync_journal()
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class HybridRecipeRecommender:
+    """Hibrid ajánlórendszer: keresés + content filtering + egységes scoring"""
+    
+    def __init__(self, csv_path, catalog_writer=None):
+        """catalog_writer: a CSV tartalmával már feltöltött CatalogWriter (az előfeldolgozó
+        pipeline adja át, így az artifact építés nem olvassa vissza a CSV-t)"""
+        self.csv_path = csv_path
+        self.csv_signature = None
+        self.artifact_dir = None
+        self.tfidf_vectorizer = None
+        self.tfidf_matrix = None
+        self.tfidf_postings = None
+        self.text_index = None
+        self.ingredient_index = None
+        self.category_index = None
+        self.category_counts = None
+        self._category_filters = {}
+        self.similarity_graph = None
+        self.substitutions = None
+        self.cf_model = None
+        self.cf_item_rows = None  # katalógus sor -> faktor sor (-1: a modell nem ismeri)
+        self.base_cf_item_rows = None
+        self.trigram_index = None
+        self.base_trigram_index = None
+        self.suggestion_engine = None
+        self.base_suggestion_engine = None
+        self.catalog = None
+        self.scoring = None
+        self.base_scores = None
+        self.default_pool = None
+        self._default_pools = {}
+        # Inkrementális szerkesztések: alap (artifact) réteg + delta + napló
+        self.base_catalog = None
+        self.base_ingredient_index = None
+        self.base_category_index = None
+        self.base_tfidf_postings = None
+        self.base_text_index = None
+        self.base_pareto = None
+        self.pareto = None
+        self.live_base_category_counts = None  # élő (nem törölt) alap receptek kategóriánként
+        self.catalog_delta = None
+        self.catalog_overrides = {}
+        self.stale_explanations = None  # alap sor -> az előre számolt magyarázat elavult
+        # A pontszám részben már alkalmazott delta állapot (a következő szerkesztés ehhez képest foltoz)
+        self._scored_deleted = None
+        self._scored_overrides = {}
+        self.journal = None
+        self._catalog_lock = threading.RLock()
+        self.query_cache = QueryResultCache(
+            max_size=int(os.environ.get('QUERY_CACHE_SIZE', 256)),
+            ttl_seconds=float(os.environ.get('QUERY_CACHE_TTL', 300))
+        )
+        self._prepare_content_features(catalog_writer)
+    
+    def reload_catalog(self, csv_path):
+        """Katalógus újratöltése - minden index újraépül, a query cache törlődik"""
+        self.csv_path = csv_path
+        self._prepare_content_features()
+        
+    def _prepare_content_features(self, catalog_writer=None):
+        """Content filtering előkészítése"""
+        print("🔧 Content features előkészítése...")
+        
+        # Katalógus + TF-IDF modell + összetevő index: a megosztott (memory-mapped)
+        # artifactból, vagy ha még nincs, illesztés, mentés és visszanyitás
+        self.csv_signature = file_signature(self.csv_path)
+        self.artifact_dir = artifact_dir_for(self.csv_path)
+        artifact = load_artifact(self.artifact_dir)
+        
+        if artifact is None:
+            # Egyszerre csak egy worker illeszt; a többi a zár után a kész artifactot nyitja
+            with build_lock(self.artifact_dir):
+                artifact = load_artifact(self.artifact_dir)
+                if artifact is None:
+                    # A katalógus oszlopai egy ideiglenes könyvtárba íródnak, az artifact
+                    # hard linkkel veszi át őket
+                    staging = Path(tempfile.mkdtemp(
+                        prefix=f".{self.artifact_dir.name}-catalog-", dir=self.artifact_dir.parent
+                    ))
+                    try:
+                        self._fit_content_features(catalog_writer or self._write_catalog(staging))
+                        save_artifact(
+                            self.artifact_dir, self.tfidf_vectorizer, self.tfidf_matrix,
+                            self.ingredient_index, self.catalog,
+                            similarity_graph=self.similarity_graph,
+                            substitutions=self.substitutions,
+                            category_index=self.category_index,
+                            text_index=self.text_index,
+                            suggestions=self.suggestion_engine
+                        )
+                        print(f"💾 Katalógus artifact mentve: {self.artifact_dir.name}")
+                        artifact = load_artifact(self.artifact_dir)
+                    except OSError as e:
+                        print(f"⚠️ Artifact mentési hiba: {e}")
+                    finally:
+                        shutil.rmtree(staging, ignore_errors=True)
+        
+        if artifact is not None:
+            print(f"📦 Katalógus artifact megnyitva: {self.artifact_dir.name}")
+            self.tfidf_vectorizer = artifact['vectorizer']
+            self.tfidf_matrix = artifact['tfidf_matrix']
+            self.tfidf_postings = artifact['tfidf_postings']
+            self.ingredient_index = artifact['ingredient_index']
+            self.category_index = artifact['category_index']
+            self.similarity_graph = artifact['similarity_graph']
+            self.substitutions = artifact['substitutions']
+            self.text_index = artifact['text_index']
+            self.suggestion_engine = artifact['suggestions']
+            self.catalog = artifact['catalog']
+        
+        # Offline betanított kollaboratív faktorok (python -m user_study.collaborative), ha vannak
+        self.cf_model = CollaborativeModel.open(model_dir())
+        if self.cf_model is not None:
+            print(f"🤝 Kollaboratív modell: {len(self.cf_model.user_ids)} felhasználó × "
+                  f"{len(self.cf_model.recipe_ids)} recept")
+        
+        # Alap réteg + a naplóban már rögzített szerkesztések visszajátszása
+        self.base_catalog = self.catalog
+        self.base_ingredient_index = self.ingredient_index
+        self.base_category_index = self.category_index
+        self.base_tfidf_postings = self.tfidf_postings
+        self.base_text_index = self.text_index
+        self.base_suggestion_engine = self.suggestion_engine
+        self.base_pareto = ParetoIndex(
+            np.column_stack([self.base_catalog.values(name) for name in SCORE_COLUMNS]),
+            self.base_catalog.values('pareto_layer')
+        )
+        # Trigram index a részleges egyezésekhez (a szótár méretével nem lassul lineárisan)
+        self.base_trigram_index = TrigramIndex(self.base_ingredient_index.vocabulary)
+        
+        # Kereséstől független pontszámok az alap katalógusra (a szerkesztések ezt foltozzák)
+        self._build_scores()
+        
+        self.catalog_delta = CatalogDelta(self.base_catalog)
+        self.journal = CatalogJournal(self.artifact_dir / "journal.jsonl")
+        for entry in self.journal.read_new():
+            if entry['op'] != 'compacted':
+                self.catalog_delta.apply(entry)
+        
+        self._apply_delta()
+        
+        print(f"✅ {len(self.catalog)} recept feldolgozva content filtering-hez")
+    
+    def _apply_delta(self):
+        """Rétegzett katalógus + indexek a deltából, majd a pontszámok és az auto-complete foltozása
+        
+        Csak a delta receptek kerülnek vektorizálásra (a betanított szótárral, stabil
+        oszlop id-kkel) - az alap mátrix és index nem épül újra, a teljes újraépítés
+        tömörítéskor történik.
+        """
+        delta = self.catalog_delta
+        if delta.is_empty():
+            self.catalog = self.base_catalog
+            self.ingredient_index = self.base_ingredient_index
+            self.category_index = self.base_category_index
+            self.tfidf_postings = self.base_tfidf_postings
+            self.text_index = self.base_text_index
+            self.catalog_overrides = {}
+        else:
+            frame = delta.frame()
+            # Delta receptek rétege az alap rétegekhez képest (a teljes újraszámolás tömörítéskor)
+            frame['pareto_layer'] = self.base_pareto.layer_of(
+                frame[list(SCORE_COLUMNS)].to_numpy()
+            ).astype(frame['pareto_layer'].dtype)
+            self.catalog_overrides = delta.overrides()
+            self.catalog = LayeredCatalog(
+                self.base_catalog, RecipeCatalog.from_dataframe(frame), self.catalog_overrides
+            )
+            self.ingredient_index = LayeredIngredientIndex(
+                self.base_ingredient_index,
+                IngredientIndex.from_ingredient_texts(
+                    frame['ingredients_clean'].tolist(), vocabulary=self.base_ingredient_index.vocabulary
+                ),
+                delta.deleted
+            )
+            self.category_index = LayeredCategoryIndex(
+                self.base_category_index,
+                CategoryIndex.from_catalog(self.catalog.delta, categories=self.base_category_index.categories),
+                delta.deleted
+            )
+            self.tfidf_postings = LayeredTfidfPostings(
+                self.base_tfidf_postings,
+                TfidfPostings.from_matrix(self.tfidf_vectorizer.transform(frame['ingredients_clean'])),
+                delta.deleted
+            )
+            self.text_index = LayeredTextIndex(self.base_text_index, self.catalog.delta, delta.deleted)
+        
+        # Kereséstől független pontszámok: csak a legutóbbi állapot óta változott sorok
+        self._update_scores()
+        
+        # Trigram index és auto-complete motor (prefix + infix, gyakoriság szerinti rangsor):
+        # az alap részek közösek, csak a szerkesztésekkel bekerült új összetevők indexelődnek
+        self.trigram_index = self.base_trigram_index.extended(self.ingredient_index.vocabulary)
+        if delta.is_empty():
+            self.suggestion_engine = self.base_suggestion_engine
+        else:
+            self.suggestion_engine = self.base_suggestion_engine.extended(
+                self.ingredient_index.vocabulary, self.ingredient_index.doc_freq
+            )
+        
+        # A régi katalógusra számolt találatok érvénytelenek
+        self.query_cache.clear()
+    
+    def _sync_journal(self):
+        """Más workerek szerkesztéseinek átvétele (egy stat hívás, ha nincs újdonság)"""
+        if self.journal is None or not self.journal.has_new():
+            return
+        
+        entries = self.journal.read_new()
+        compacted = [entry for entry in entries if entry['op'] == 'compacted']
+        if compacted:
+            # A delta beolvadt egy új alapba - az új artifact megnyitása
+            print("🔄 Katalógus tömörítve egy másik workerben, újratöltés...")
+            self.reload_catalog(compacted[-1]['csv_path'])
+            return
+        
+        for entry in entries:
+            self.catalog_delta.apply(entry)
+        self._apply_delta()
+        print(f"🔄 {len(entries)} katalógus szerkesztés átvéve")
+    
+    def add_recipe(self, fields):
+        """Új recept felvétele (teljes újraillesztés nélkül) - az új recept id-t adja vissza"""
+        fields = self._validate_recipe_fields(fields, required=REQUIRED_RECIPE_FIELDS)
+        entry = self._record_edit(lambda: {
+            'op': 'add', 'recipeid': self.catalog_delta.max_recipe_id + 1, 'fields': fields
+        })
+        return entry['recipeid']
+    
+    def update_recipe(self, recipeid, fields):
+        """Meglévő recept mezőinek módosítása (KeyError, ha nincs ilyen recept)"""
+        fields = self._validate_recipe_fields(fields)
+        self._record_edit(lambda: {'op': 'update', 'recipeid': recipeid, 'fields': fields})
+    
+    def delete_recipe(self, recipeid):
+        """Recept törlése (KeyError, ha nincs ilyen recept)"""
+        self._record_edit(lambda: {'op': 'delete', 'recipeid': recipeid})
+    
+    def _record_edit(self, make_entry):
+        """Szerkesztés naplózása és alkalmazása - a naplózár alatt, friss állapoton"""
+        while True:
+            journal = self.journal
+            with journal.locked(), self._catalog_lock:
+                self._sync_journal()
+                if self.journal is not journal:
+                    continue  # közben tömörítés történt, az új naplóba kell írni
+                
+                entry = make_entry()
+                if entry['op'] != 'add' and entry['recipeid'] not in self.catalog_delta:
+                    raise KeyError(entry['recipeid'])
+                entry['timestamp'] = time.time()
+                
+                journal.append(entry)
+                journal.offset = journal.path.stat().st_size
+                self.catalog_delta.apply(entry)
+                self._apply_delta()
+                print(f"✏️ Recept {entry['op']}: #{entry['recipeid']} (delta: {len(self.catalog_delta)})")
+                return entry
+    
+    def _validate_recipe_fields(self, fields, required=()):
+        """Szerkeszthető mezők ellenőrzése (ValueError hibás bemenetnél)"""
+        if not isinstance(fields, dict):
+            raise ValueError("A recept mezőket objektumként kell megadni")
+        
+        editable = [name for name in self.base_catalog.column_names if name not in DERIVED_COLUMNS]
+        unknown = sorted(set(fields) - set(editable))
+        if unknown:
+            raise ValueError(f"Ismeretlen mezők: {', '.join(unknown)}")
+        missing = [name for name in required if not str(fields.get(name) or '').strip()]
+        if missing:
+            raise ValueError(f"Hiányzó mezők: {', '.join(missing)}")
+        
+        for name, value in fields.items():
+            is_numeric = not hasattr(self.base_catalog[name], 'missing')  # StringColumn: szöveg
+            if is_numeric and value is not None and (
+                    isinstance(value, bool) or not isinstance(value, (int, float))):
+                raise ValueError(f"A(z) '{name}' mező számot vár")
+        return fields
+    
+    def compact(self):
+        """Delta beolvasztása: élő receptek új CSV-be, teljes újraillesztés, napló lezárása
+        
+        Az új ajánlót adja vissza (a hívó cseréli le rá a régit); a többi worker a napló
+        'compacted' bejegyzéséből tudja, hogy az új artifactot kell megnyitnia.
+        """
+        journal = self.journal
+        with journal.locked():
+            with self._catalog_lock:
+                self._sync_journal()
+                if self.journal is not journal or self.catalog_delta.is_empty():
+                    return self
+                
+                alive = ~self._deleted_mask()
+                frame = self.catalog.to_frame().loc[alive]
+                frame = frame.drop(columns=list(EXPLANATION_COLUMNS), errors='ignore')
+            
+            csv_path = Path(self.csv_path)
+            tmp_path = csv_path.with_name(f".{csv_path.name}.compact-{os.getpid()}")
+            print(f"🗜️ Katalógus tömörítése: {len(frame)} recept ({len(self.catalog_delta)} változás)")
+            frame.to_csv(tmp_path, index=False, encoding='utf-8')
+            
+            try:
+                compacted = HybridRecipeRecommender(str(tmp_path))
+                os.replace(tmp_path, csv_path)
+            finally:
+                if tmp_path.exists():
+                    tmp_path.unlink()
+            compacted.csv_path = str(csv_path)
+            
+            journal.append({'op': 'compacted', 'csv_path': str(csv_path), 'timestamp': time.time()})
+        return compacted
+    
+    def _write_catalog(self, directory):
+        """A CSV darabonként a katalógus oszlopaiba (lemezre) - a teljes tábla nincs a memóriában"""
+        writer = CatalogWriter(directory)
+        for chunk in iter_csv_chunks(self.csv_path):
+            writer.append(catalog_columns(chunk))
+        return writer
+    
+    def _fit_content_features(self, catalog_writer):
+        """TF-IDF illesztés, összetevő / kategória / szöveg indexek a megírt katalógusból
+        (csak ha nincs artifact)"""
+        # Pareto réteg index (0 = nem dominált) az ESI / HSI / PPI pontszámok felett
+        catalog_writer.add_column('pareto_layer', pareto_layers(
+            np.column_stack([catalog_writer.column(name) for name in SCORE_COLUMNS])
+        ))
+        
+        # Csak olvasható oszlopos katalógus (memory-mapped) a kiszolgáláshoz; a normalizált
+        # összetevők és a V3 magyarázat részek darabonként kerültek bele (catalog_columns)
+        self.catalog = catalog_writer.close()
+        ingredients_clean = self.catalog.values('ingredients_clean')
+        
+        # TF-IDF vektorizálás az összetevőkre
+        self.tfidf_vectorizer = TfidfVectorizer(
+            max_features=500,
+            stop_words=None,
+            ngram_range=(1, 2),
+            min_df=1  # Csökkentett min_df a kis adatbázishoz
+        )
+        
+        self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(ingredients_clean)
+        self.tfidf_postings = TfidfPostings.from_matrix(self.tfidf_matrix)
+        
+        # Recept-recept top-N szomszéd listák (diverzitás, hasonló receptek)
+        self.similarity_graph = SimilarityGraph.from_matrix(self.tfidf_matrix)
+        
+        # Összetevő index építése gyors kereséshez
+        self._build_ingredient_index(ingredients_clean)
+        del ingredients_clean
+        
+        # Kategóriánkénti bitmapek (facet szűrés)
+        self.category_index = CategoryIndex.from_catalog(self.catalog)
+        
+        # Fenntartható összetevő cserék (együttes előfordulás + env_score regresszió)
+        self.substitutions = SubstitutionIndex.build(self.ingredient_index, self.catalog)
+        
+        # BM25 index a címekre és az elkészítési útmutatókra (szabad szöveges keresés)
+        self.text_index = TextIndex.from_catalog(self.catalog)
+    
+    def _build_scores(self):
+        """A kereséstől független pontszám rész és a keresés nélküli pool az alap katalógusra
+        (teljes építés; a szerkesztéseket _update_scores foltozza)"""
+        # Az ajánlás dict-ekbe csak a nyilvános recept mezők kerülnek (katalógus sorrendben)
+        self.row_columns = [
+            name for name in self.base_catalog.column_names if name in PUBLIC_COLUMNS
+        ]
+        
+        # [ESI, HSI, PPI] float32 mátrix; a pontszám profilonként egy mátrix-vektor szorzat
+        self.scoring = ScoringEngine.from_catalog(self.base_catalog)
+        self.base_scores = self.scoring.profile_scores(DEFAULT_WEIGHTS)  # 40/40/20
+        
+        # Receptek Pareto réteg szerint (a legjobb kompromisszum lekérdezésekhez)
+        self.pareto = self.base_pareto
+        
+        # Katalógus sorok faktor sorai (a kollaboratív pontszám egy szorzat a jelölteken)
+        if self.cf_model is not None:
+            self.base_cf_item_rows = self.cf_model.item_rows(self.base_catalog.values('recipeid'))
+        self.cf_item_rows = self.base_cf_item_rows
+        
+        # Kategória szűrők (bitmap) és az élő katalógus facet számai
+        self._category_filters = {}
+        self.live_base_category_counts = self._category_counts(np.arange(len(self.base_catalog)))
+        self.category_counts = self.live_base_category_counts.copy()
+        
+        # Keresés nélküli top 15 pool (profilonként, az alap profilé előre)
+        self._default_pools = {}
+        self.default_pool = self._default_pool(DEFAULT_WEIGHTS)
+        
+        self._scored_deleted = np.zeros(len(self.base_catalog), dtype=bool)
+        self._scored_overrides = {}
+    
+    def _update_scores(self):
+        """A pontszám rész foltozása a legutóbb alkalmazott delta óta változott sorokra
+        
+        Az alap sorokból csak az újonnan töröltek íródnak (újranormalizált ESI esetén az
+        összes), a delta receptek minden szerkesztéskor. Egy pool csak akkor számolódik
+        újra, ha egy tagja változott; különben a változott sorokkal fésülődik össze.
+        """
+        delta = self.catalog_delta
+        n_base = len(self.base_catalog)
+        n_rows = len(self.catalog)
+        newly_deleted = np.flatnonzero(delta.deleted & ~self._scored_deleted)
+        
+        rows, points = [], []
+        excluded = newly_deleted
+        override_esi = self.catalog_overrides.get('ESI')
+        if override_esi is not self._scored_overrides.get('ESI'):
+            # Megváltozott env tartomány: az alap ESI oszlop (és a magyarázatok) újranormalizálva
+            rows.append(np.arange(n_base))
+            points.append(np.column_stack([
+                self.catalog_overrides.get(name, self.base_catalog.values(name)) for name in SCORE_COLUMNS
+            ]))
+            excluded = np.flatnonzero(delta.deleted)
+            self.stale_explanations = (
+                None if override_esi is None else override_esi != self.base_catalog.values('ESI')
+            )
+        if n_rows > n_base:
+            rows.append(np.arange(n_base, n_rows))
+            points.append(np.column_stack([self.catalog.delta.values(name) for name in SCORE_COLUMNS]))
+        
+        # Törölt alap receptek soha nem kerülnek poolba (-inf)
+        changed = self.scoring.update(
+            n_rows,
+            np.concatenate(rows) if rows else np.empty(0, dtype=np.intp),
+            np.concatenate(points) if points else np.empty((0, len(SCORE_COLUMNS))),
+            excluded_rows=excluded
+        )
+        self.base_scores = self.scoring.profile_scores(DEFAULT_WEIGHTS)
+        self._scored_deleted = delta.deleted.copy()
+        self._scored_overrides = self.catalog_overrides
+        
+        # Pareto rétegek, faktor sorok: alap + delta réteg
+        delta_rows = np.arange(n_base, n_rows)
+        if delta.is_empty():
+            self.pareto = self.base_pareto
+            self.cf_item_rows = self.base_cf_item_rows
+        else:
+            self.pareto = LayeredParetoIndex(
+                self.base_pareto, self.catalog.delta.values('pareto_layer'), delta.deleted
+            )
+            if self.cf_model is not None:
+                self.cf_item_rows = LayeredColumn(
+                    self.base_cf_item_rows, self.cf_model.item_rows(self.catalog.delta.values('recipeid'))
+                )
+        
+        # Facet számok: az élő alap számokból az újonnan törölt sorok levonva + a delta receptek
+        codes = self.base_category_index.codes_of(newly_deleted)
+        self.live_base_category_counts -= np.bincount(
+            codes[codes >= 0], minlength=len(self.live_base_category_counts)
+        )
+        self.category_counts = self._category_counts(delta_rows)
+        self.category_counts[:len(self.live_base_category_counts)] += self.live_base_category_counts
+        self._category_filters = {}
+        
+        # Keresés nélküli poolok: változott tag -> lusta újraszámolás, különben összefésülés
+        pools, self._default_pools = self._default_pools, {}
+        candidates = changed[changed < n_rows]
+        for (weights, k, categories), pool in pools.items():
+            if np.isin(pool, changed).any():
+                continue
+            merged = candidates
+            if categories:
+                bitmap, _ = self._category_filter(categories)
+                merged = merged[bitmap_contains(bitmap, merged)]
+            merged = np.union1d(pool, merged)
+            scores = self.scoring.profile_scores(weights)
+            merged = merged[self._top_k(scores[merged], k)]
+            merged = merged[np.isfinite(scores[merged])]
+            merged.flags.writeable = False
+            self._default_pools[(weights, k, categories)] = merged
+        self.default_pool = self._default_pool(DEFAULT_WEIGHTS)
+    
+    def _default_pool(self, weights, k=15, categories=()):
+        """Keresés nélküli top k pool egy súlyprofilra és kategória szűrőre (cache-elve)"""
+        pool = self._default_pools.get((weights, k, categories))
+        if pool is None:
+            scores = self.scoring.profile_scores(weights)
+            if categories:
+                rows = self._category_rows(categories)
+                pool = rows[self._top_k(scores[rows], k)]
+            else:
+                pool = self._top_k(scores, k)
+            pool = pool[np.isfinite(scores[pool])]
+            pool.flags.writeable = False
+            self._default_pools[(weights, k, categories)] = pool
+        return pool
+    
+    def category_key(self, names):
+        """Kategória nevek -> rendezett id tuple (cache kulcs; az ismeretlen nevek kimaradnak)"""
+        ids = (self.category_index.category_id(name) for name in names or ())
+        return tuple(sorted({category_id for category_id in ids if category_id is not None}))
+    
+    def _category_filter(self, categories):
+        """Egy kategória szűrő: (tömörített bitmap, receptek száma) - szűrőnként egyszer számolva"""
+        category_filter = self._category_filters.get(categories)
+        if category_filter is None:
+            bitmap = self.category_index.bitmap(categories)
+            bitmap.flags.writeable = False
+            category_filter = (bitmap, int(np.unpackbits(bitmap).sum()))
+            self._category_filters[categories] = category_filter
+        return category_filter
+    
+    def _category_rows(self, categories):
+        """A szűrő receptjei (rendezett indexek)"""
+        bitmap, _ = self._category_filter(categories)
+        return np.flatnonzero(np.unpackbits(bitmap, count=len(self.catalog)))
+    
+    def _category_counts(self, indices):
+        """Receptek száma kategóriánként (bincount a kód tömbön)"""
+        codes = self.category_index.codes_of(indices)
+        return np.bincount(codes[codes >= 0], minlength=len(self.category_index))
+    
+    def _deleted_mask(self):
+        """Törölt sorok maszkja a (rétegzett) katalógus index terében"""
+        deleted = np.zeros(len(self.catalog), dtype=bool)
+        if self.catalog_delta is not None:
+            deleted[:len(self.catalog_delta.deleted)] = self.catalog_delta.deleted
+        return deleted
+    
+    def _build_ingredient_index(self, ingredients_clean):
+        """Összetevő index (egész kódolt szótár + CSR + bitsetek) és auto-complete suffix tömb"""
+        self.ingredient_index = IngredientIndex.from_ingredient_texts(list(ingredients_clean))
+        self.suggestion_engine = SuggestionEngine.build(
+            self.ingredient_index.vocabulary, self.ingredient_index.doc_freq
+        )
+    
+    def search_by_ingredients(self, search_ingredients, max_results=20, match_all=False, categories=()):
+        """Keresés összetevők alapján
+        
+        match_all=True esetén csak azok a receptek maradnak, amelyek minden keresett
+        kifejezésre illeszkednek (posting listák metszete), különben unió.
+        categories: kategória id-k (category_key); a szűrő a csonkolás előtt, bit tesztként érvényesül
+        """
+        allowed = self._category_filter(categories) if categories else None
+        if not search_ingredients:
+            if allowed is not None:
+                return self._category_rows(categories).tolist()
+            return np.flatnonzero(~self._deleted_mask()).tolist()
+        
+        # Keresési kifejezések normalizálása
+        search_terms = [
+            normalize_text(term.strip()) 
+            for term in search_ingredients.split(',')
+            if term.strip()
+        ]
+        
+        recipe_indices = self._ingredient_candidates(search_terms, max_results, match_all, allowed)
+        
+        # Ha nincs találat, használj TF-IDF hasonlóságot
+        if len(recipe_indices) == 0:
+            relevant_recipes = self._tfidf_search(search_ingredients, max_results, allowed)
+            return list(relevant_recipes)[:max_results]
+        
+        return recipe_indices.tolist()
+    
+    def _ingredient_candidates(self, search_terms, max_results=20, match_all=False, allowed=None):
+        """Pontos + részleges összetevő egyezések egyezésszám szerint rendezve (üres, ha nincs)
+        
+        allowed: kategória szűrő (_category_filter); max_results=None: minden találat
+        """
+        # Összetevő id -> súly (pontos egyezés 1, részleges 0.5)
+        term_weights = {}
+        term_groups = []
+        
+        for search_term in search_terms:
+            ingredient_id = self.ingredient_index.term_id(search_term)
+            
+            # Pontos egyezés
+            if ingredient_id is not None:
+                term_weights[ingredient_id] = term_weights.get(ingredient_id, 0) + 1.0
+                term_groups.append([ingredient_id])
+            
+            # Részleges egyezés (fuzzy matching)
+            else:
+                partial_ids = self.trigram_index.partial_matches(search_term)
+                for partial_id in partial_ids:
+                    term_weights[partial_id] = term_weights.get(partial_id, 0) + 0.5
+                term_groups.append(partial_ids)
+        
+        # Vektorizált egyezésszámítás a posting listákon
+        recipe_indices, match_scores = self.ingredient_index.match_scores(term_weights)
+        
+        if match_all and len(recipe_indices):
+            keep = np.isin(recipe_indices, self.ingredient_index.intersect(term_groups))
+            recipe_indices, match_scores = recipe_indices[keep], match_scores[keep]
+        
+        if allowed is not None and len(recipe_indices):
+            keep = bitmap_contains(allowed[0], recipe_indices)
+            recipe_indices, match_scores = recipe_indices[keep], match_scores[keep]
+        
+        # Rendezés az egyezések száma szerint (azonos pontszámnál index szerint)
+        order = np.argsort(-match_scores, kind='stable')[:max_results]
+        
+        return recipe_indices[order].astype(np.intp)
+    
+    def _tfidf_search(self, search_query, max_results=20, allowed=None):
+        """TF-IDF alapú keresés - csak a lekérdezés kifejezéseinek posting listáit járja be"""
+        # Keresési lekérdezés vektorizálása (L2 normált, így a skalárszorzat = koszinusz)
+        query_clean = normalize_text(search_query)
+        query_vector = self.tfidf_vectorizer.transform([query_clean])
+        
+        # Kategória szűrővel a szűrő szelektivitásával arányosan több jelölt kell
+        k = max_results
+        if allowed is not None:
+            k = min(len(self.catalog), max_results * -(-len(self.catalog) // max(allowed[1], 1)))
+        
+        # Top receptek a küszöb felett (term-at-a-time + MaxScore + részleges rendezés)
+        top_indices, _ = self.tfidf_postings.top_k(
+            query_vector, k, threshold=0.05  # Alacsonyabb threshold
+        )
+        
+        if allowed is not None:
+            top_indices = top_indices[bitmap_contains(allowed[0], top_indices)][:max_results]
+        return top_indices.tolist()
+    
+    def _text_search(self, search_query, max_results=20, allowed=None):
+        """BM25 keresés a címeken és útmutatókon: (recept indexek, pontszámok) csökkenő sorrendben
+        
+        Csak a lekérdezés szavainak (és prefix folytatásaiknak) posting listái olvasódnak.
+        """
+        query_vector = self.text_index.query_vector(search_query)
+        
+        k = max_results
+        if allowed is not None:
+            k = min(len(self.catalog), max_results * -(-len(self.catalog) // max(allowed[1], 1)))
+        top_indices, top_scores = self.text_index.postings.top_k(query_vector, k)
+        
+        if allowed is not None:
+            keep = bitmap_contains(allowed[0], top_indices)
+            top_indices, top_scores = top_indices[keep][:max_results], top_scores[keep][:max_results]
+        return top_indices, top_scores
+    
+    def _search_candidates(self, search_terms, max_results=20, categories=(), search_mode='ingredients'):
+        """Keresési jelöltek és relevancia boostjuk (0-100) a keresési mód szerint
+        
+        'text': a BM25 top találatok, a legjobb találathoz viszonyított pontszámmal;
+        'fusion': az összetevő és a BM25 top találatok uniója, a két relevancia súlyozott összegével
+        """
+        if search_mode == 'ingredients':
+            candidate_indices = np.asarray(
+                self.search_by_ingredients(", ".join(search_terms), max_results=max_results, categories=categories),
+                dtype=np.intp
+            )
+            return candidate_indices, self._calculate_search_boost(candidate_indices, search_terms)
+        
+        allowed = self._category_filter(categories) if categories else None
+        n_text = max_results if search_mode == 'text' else max(max_results, TEXT_CANDIDATES)
+        text_indices, text_scores = self._text_search(" ".join(search_terms), n_text, allowed)
+        text_relevance = text_scores.astype(np.float64) / text_scores[0] if len(text_scores) else np.zeros(0)
+        if search_mode == 'text':
+            return text_indices, text_relevance * 100
+        
+        ingredient_indices = np.asarray(
+            self.search_by_ingredients(", ".join(search_terms), max_results=max_results, categories=categories),
+            dtype=np.intp
+        )
+        candidate_indices = np.concatenate((ingredient_indices, text_indices[:max_results]))
+        first = np.sort(np.unique(candidate_indices, return_index=True)[1])
+        candidate_indices = candidate_indices[first]
+        
+        # BM25 relevancia a jelöltekre (a TEXT_CANDIDATES találaton kívül 0)
+        text_lookup = dict(zip(text_indices.tolist(), text_relevance.tolist()))
+        text_part = np.array([text_lookup.get(index, 0.0) for index in candidate_indices.tolist()])
+        ingredient_part = self._calculate_search_boost(candidate_indices, search_terms) / 100
+        weight = text_fusion_weight()
+        return candidate_indices, ((1 - weight) * ingredient_part + weight * text_part) * 100
+    
+    @_catalog_snapshot
+    def get_recommendations(self, version='v1', search_ingredients="", user_preferences=None, n_recommendations=5,
+                            seed=None, mode='standard', categories=None, search_mode='ingredients'):
+        """EGYSÉGES ajánlási algoritmus - csak információ megjelenítés különbözik
+        
+        seed: a top pool mintavételének seed-je (None: új, kérésenkénti seed)
+        user_preferences: súlyprofil forrása (PERSONALIZED_SCORING=1 esetén, különben 40/40/20);
+            a 'user_id' kulccsal a kollaboratív pontszám is beleszámít (CF_BLEND_WEIGHT > 0 esetén)
+        mode: 'pareto' esetén a nem dominált (legjobb kompromisszumú) receptek, sorrendben
+        categories: kategória nevek - csak ezekből a kategóriákból ajánl (VAGY kapcsolat)
+        search_mode: 'ingredients' (összetevő egyezés), 'text' (BM25 a címen / útmutatón) vagy
+            'fusion' (a kettő súlyozott összege) - lásd SEARCH_MODES
+        """
+        if mode not in RECOMMENDATION_MODES:
+            raise ValueError(f"Ismeretlen ajánlási mód: {mode}")
+        if search_mode not in SEARCH_MODES:
+            raise ValueError(f"Ismeretlen keresési mód: {search_mode}")
+        weights = weights_from_preferences(user_preferences)
+        user_vector = self._collaborative_user_vector(user_preferences)
+        category_key = self.category_key(categories)
+        if categories and not category_key:
+            print(f"❌ Ismeretlen kategória: {categories}")
+            return []
+        
+        # 1-2. KERESÉS + EGYSÉGES SCORING (minden verzióban ugyanaz, cache-elve)
+        search_terms = self._canonical_search_terms(search_ingredients)
+        if mode == 'pareto':
+            top_pool, pool_scores, pool_relevance = self._pareto_pool(
+                search_terms, weights, category_key, search_mode
+            )
+            print(f"⚖️ Pareto '{search_ingredients}' -> {len(top_pool)} recept az első rétegekből")
+            
+            if len(top_pool) == 0:
+                return []
+        elif user_vector is not None and len(self.catalog):
+            top_pool, pool_scores, pool_relevance = self._collaborative_pool(
+                search_terms, weights, user_vector, category_key, search_mode
+            )
+            print(f"🤝 Kollaboratív '{search_ingredients}' -> top {len(top_pool)} recept")
+            
+            if len(top_pool) == 0:
+                print("❌ Nincs találat a keresésre")
+                return []
+        elif search_terms:
+            top_pool, pool_scores, pool_relevance = self._ranked_pool(
+                search_terms, weights, category_key, search_mode
+            )
+            print(f"🔍 Keresés '{search_ingredients}' -> top {len(top_pool)} találat")
+            
+            if len(top_pool) == 0:
+                print("❌ Nincs találat a keresésre")
+                return []
+        else:
+            print(f"📊 Teljes adatbázis -> {len(self.catalog)} recept")
+            if len(self.catalog) == 0:
+                return []
+            
+            # Keresés nélkül a top pool profilonként statikus (az alap profilé előre számolt)
+            top_pool = self._default_pool(weights, categories=category_key)
+            if len(top_pool) == 0:
+                return []
+            pool_scores = self.scoring.profile_scores(weights)[top_pool]
+            pool_relevance = np.zeros(len(top_pool))
+        
+        if mode == 'pareto':
+            # Réteg, majd pontszám szerinti sorrend: az első n (nincs mintavétel)
+            selected = np.arange(min(n_recommendations, len(top_pool)))
+        else:
+            # Top 15 közül random kiválasztás (kérésenkénti generátor, nem a globális állapot)
+            rng, seed = make_rng(seed, context=f"{version} '{search_ingredients}'")
+            if len(top_pool) <= n_recommendations:
+                selected = np.arange(len(top_pool))
+            elif version in mmr_arms():
+                # MMR kar: az első recept véletlen (a randomizálás megmarad), a többi diverzitás szerint
+                selected = mmr_select(
+                    pool_scores, self.similarity_graph.pair_similarities(top_pool),
+                    n_recommendations, mmr_lambda(), first=rng.integers(len(top_pool))
+                )
+                print(f"🎲 MMR: {n_recommendations} diverz recept a top {len(top_pool)} közül")
+            else:
+                selected = rng.choice(len(top_pool), n_recommendations, replace=False)
+                print(f"🎲 RANDOMIZÁLT: {n_recommendations} recept a top {len(top_pool)} közül")
+        
+        # Csak a kiválasztott receptekből készül dict
+        recommendations = self._pool_rows(top_pool[selected], pool_scores[selected], pool_relevance[selected])
+        
+        # 4. VERZIÓ-SPECIFIKUS INFORMÁCIÓ DISCLOSURE
+        self._apply_disclosure(recommendations, version, search_ingredients, top_pool[selected], weights)
+        
+        print(f"✅ {len(recommendations)} ajánlás generálva ({version}) - Egységes algoritmus, verzió-specifikus megjelenítés")
+        return recommendations
+    
+    @_catalog_snapshot
+    def get_recommendations_batch(self, queries):
+        """Sok lekérdezés egyszerre (email digest, offline kiértékelés) - rangsorolt listák
+        
+        queries: [{'search_ingredients': str, 'version': 'v1'|'v2'|'v3', 'n': int,
+                   'categories': [str, ...] (opcionális), 'search_mode': str (opcionális)}, ...]
+        A rangsor a top 15 pool első n eleme, véletlen mintavétel nélkül. Az azonos
+        kanonikus keresések egyszer számolódnak, és a study oldal cache-ét is feltöltik.
+        """
+        term_keys = [self._canonical_search_terms(query.get('search_ingredients', '')) for query in queries]
+        category_keys = [self.category_key(query.get('categories')) for query in queries]
+        search_modes = [query.get('search_mode', 'ingredients') for query in queries]
+        unknown_modes = sorted(set(search_modes) - set(SEARCH_MODES))
+        if unknown_modes:
+            raise ValueError(f"Ismeretlen keresési mód: {', '.join(map(str, unknown_modes))}")
+        pools = self._ranked_pools([
+            key for key in dict.fromkeys(
+                key for key, category_key, search_mode in zip(term_keys, category_keys, search_modes)
+                if not category_key and search_mode == 'ingredients'
+            ) if key
+        ])
+        
+        results = []
+        for query, key, category_key, search_mode in zip(queries, term_keys, category_keys, search_modes):
+            if query.get('categories') and not category_key:
+                results.append([])
+                continue
+            if key and (category_key or search_mode != 'ingredients'):
+                top_pool, pool_scores, pool_relevance = self._ranked_pool(
+                    key, DEFAULT_WEIGHTS, category_key, search_mode
+                )
+            elif key:
+                top_pool, pool_scores, pool_relevance = pools[key]
+            elif category_key:
+                top_pool = self._default_pool(DEFAULT_WEIGHTS, categories=category_key)
+                pool_scores = self.base_scores[top_pool]
+                pool_relevance = np.zeros(len(top_pool))
+            else:
+                top_pool = self.default_pool
+                pool_scores = self.base_scores[top_pool]
+                pool_relevance = np.zeros(len(top_pool))
+            
+            n = max(0, int(query.get('n', 5)))
+            recommendations = self._pool_rows(top_pool[:n], pool_scores[:n], pool_relevance[:n])
+            self._apply_disclosure(
+                recommendations, query.get('version', 'v1'), query.get('search_ingredients', ''), top_pool[:n]
+            )
+            results.append(recommendations)
+        
+        print(f"📦 Batch: {len(queries)} lekérdezés, {len(pools)} egyedi keresés")
+        return results
+    
+    def _pool_rows(self, indices, scores, relevance):
+        """Pool receptek dict-ként, a pontszám mezőkkel kiegészítve (a rangsor float32
+        pontosságú, kifelé ennek a tizedes alakja kerül)"""
+        recommendations = self.catalog.rows(indices, self.row_columns)
+        scores = widen_floats(np.asarray(scores, dtype=np.float32)).tolist()
+        relevance = widen_floats(np.asarray(relevance, dtype=np.float32)).tolist()
+        for rec, score, search_relevance in zip(recommendations, scores, relevance):
+            rec['search_relevance'] = search_relevance
+            rec['recommendation_score'] = score
+        return recommendations
+    
+    def _apply_disclosure(self, recommendations, version, search_ingredients, indices, weights=DEFAULT_WEIGHTS):
+        """Verzió-specifikus megjelenítés - A/B/C különbségek CSAK az információ megjelenítésében"""
+        if version == 'v3':
+            prefixes = self.catalog['explanation_prefix'][indices]
+            labels = self.catalog['explanation_labels'][indices]
+            stale = self._stale_explanations(indices)
+            # Csere tipp csak SWAP_TIPS=1 esetén (alapból a v3 magyarázat változatlan)
+            swaps = (
+                [self._swap_suggestion(index) for index in indices] if swap_tips_enabled()
+                else [None] * len(recommendations)
+            )
+        
+        for position, rec in enumerate(recommendations):
+            if version == 'v1':
+                # V1: BASELINE - Rejtett score-ok, nincs magyarázat
+                rec['show_scores'] = False
+                rec['show_explanation'] = False
+                rec['explanation'] = ""
+                
+            elif version == 'v2':
+                # V2: SCORE DISCLOSURE - Látható score-ok, nincs magyarázat
+                rec['show_scores'] = True
+                rec['show_explanation'] = False
+                rec['explanation'] = ""
+                
+            elif version == 'v3':
+                # V3: FULL DISCLOSURE - Látható score-ok + magyarázat
+                rec['show_scores'] = True
+                rec['show_explanation'] = True
+                relevance = relevance_sentence(rec['search_relevance']) if search_ingredients.strip() else ""
+                prefix, label = prefixes[position], labels[position]
+                if stale[position]:
+                    # Újranormalizált ESI: a sor részei újraszámolódnak
+                    prefix, label = explanation_fragments(rec['ESI'], rec['HSI'], rec['PPI'], weights)
+                elif weights != DEFAULT_WEIGHTS:
+                    # Egyéni súlyprofil: csak az összpontszám előtag függ a súlyoktól, a címkék nem
+                    prefix, _ = explanation_fragments(rec['ESI'], rec['HSI'], rec['PPI'], weights)
+                rec['explanation'] = compose_explanation(prefix, label, relevance, swap_sentence(swaps[position]))
+    
+    def _stale_explanations(self, indices):
+        """Pozíciónként: elavult-e a recept előre számolt magyarázata (újranormalizált alap sor)"""
+        indices = np.asarray(indices, dtype=np.intp)
+        stale = np.zeros(len(indices), dtype=bool)
+        if self.stale_explanations is not None:
+            in_base = indices < len(self.stale_explanations)
+            stale[in_base] = self.stale_explanations[indices[in_base]]
+        return stale
+    
+    @staticmethod
+    def _top_k(scores, k):
+        """A k legnagyobb pontszám pozíciója csökkenő sorrendben (argpartition + kis rendezés)"""
+        k = min(k, len(scores))
+        if k == 0:
+            return np.empty(0, dtype=np.intp)
+        top = np.argpartition(-scores, k - 1)[:k]
+        # Azonos pontszámnál az előbbi pozíció nyer (mint a nlargest keep='first')
+        return top[np.lexsort((top, -scores[top]))]
+    
+    def _canonical_search_terms(self, search_ingredients):
+        """Kanonikus keresési kulcs: tisztított kifejezések rendezve (a sorrend nem számít)"""
+        return tuple(sorted(
+            normalize_text(term.strip())
+            for term in search_ingredients.split(',')
+            if term.strip()
+        ))
+    
+    def _ranked_pool(self, search_terms, weights=DEFAULT_WEIGHTS, categories=(), search_mode='ingredients'):
+        """Rangsorolt top 15 pool egy kanonikus kereséshez és súlyprofilhoz - LRU/TTL cache mögött
+        
+        categories: kategória szűrő (category_key); szűrő nélkül, összetevő keresésnél a kulcs
+        a batch úttal közös
+        """
+        if search_mode != 'ingredients':
+            cache_key = (search_mode, weights, search_terms, categories)
+        elif categories:
+            cache_key = (weights, search_terms, categories)
+        else:
+            cache_key = (weights, search_terms)
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        candidate_indices, search_boost = self._search_candidates(search_terms, 20, categories, search_mode)
+        
+        # EGYSÉGES SCORING (minden verzióban UGYANAZ) - csak a jelöltekre, O(k)
+        pool = self._build_pool(candidate_indices, search_boost, weights)
+        
+        self.query_cache.put(cache_key, pool)
+        return pool
+    
+    def _ranked_pools(self, term_keys):
+        """Több kanonikus keresés poolja egyszerre
+        
+        Összetevő egyezés keresésenként (posting listák), a TF-IDF fallback egyetlen
+        ritka mátrixszorzás, a boost + pontozás egyetlen menet az összefűzött jelölteken.
+        """
+        pools = {}
+        pending = []
+        for key in term_keys:
+            cached = self.query_cache.get((DEFAULT_WEIGHTS, key))
+            if cached is not None:
+                pools[key] = cached
+            else:
+                pending.append(key)
+        if not pending:
+            return pools
+        
+        candidates = {}
+        fallback = []
+        for key in pending:
+            indices = self._ingredient_candidates(key, max_results=20)
+            if len(indices):
+                candidates[key] = indices
+            else:
+                fallback.append(key)
+        
+        if fallback:
+            query_matrix = self.tfidf_vectorizer.transform(
+                [normalize_text(", ".join(key)) for key in fallback]
+            )
+            top_lists = self.tfidf_postings.top_k_batch(query_matrix, 20, threshold=0.05)
+            for key, (indices, _) in zip(fallback, top_lists):
+                candidates[key] = indices
+        
+        # Egy pontozási menet: összefűzött jelöltek, kereséskénti szegmensekkel
+        keys = list(candidates)
+        lengths = np.array([len(candidates[key]) for key in keys], dtype=np.intp)
+        bounds = np.concatenate(([0], np.cumsum(lengths)))
+        flat_indices = np.concatenate([candidates[key] for key in keys]).astype(np.intp)
+        
+        texts = self.catalog['ingredients_clean'][flat_indices]
+        search_boost = np.zeros(len(flat_indices))
+        for key, start, end in zip(keys, bounds[:-1], bounds[1:]):
+            if end > start:
+                matches = [[term in (text or "") for text in texts[start:end]] for term in key]
+                search_boost[start:end] = np.mean(matches, axis=0) * 100
+        
+        for key, start, end in zip(keys, bounds[:-1], bounds[1:]):
+            pool = self._build_pool(flat_indices[start:end], search_boost[start:end])
+            self.query_cache.put((DEFAULT_WEIGHTS, key), pool)
+            pools[key] = pool
+        
+        return pools
+    
+    def _pareto_pool(self, search_terms, weights=DEFAULT_WEIGHTS, categories=(), search_mode='ingredients'):
+        """Legjobb kompromisszum pool: Pareto réteg, azon belül pontszám szerint (top 15)
+        
+        Keresés nélkül a katalógus első rétegei (előre számolt réteg index, csak ezek
+        olvasódnak); kereséssel a találatok saját rétegei - egy globálisan dominált
+        recept a találatok között lehet nem dominált. Kategória szűrővel (keresés nélkül) a
+        kategória receptjeinek saját rétegei.
+        """
+        cache_key = ('pareto', weights, search_terms, categories, search_mode)
+        cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        if search_terms:
+            candidates, search_boost = self._search_candidates(
+                search_terms, PARETO_CANDIDATES, categories, search_mode
+            )
+            layers = pareto_layers(self.scoring.score_matrix[candidates])
+        elif categories:
+            candidates = self._category_rows(categories)
+            layers = pareto_layers(self.scoring.score_matrix[candidates])
+            search_boost = np.zeros(len(candidates))
+        else:
+            candidates = self.pareto.first_layers(15)
+            layers = self.catalog['pareto_layer'][candidates]
+            search_boost = np.zeros(len(candidates))
+        
+        scores = self.scoring.profile_scores(weights)[candidates] + search_boost * SEARCH_BOOST_WEIGHT
+        order = np.lexsort((candidates, -scores, layers))[:15]
+        
+        pool = (candidates[order], scores[order], search_boost[order] / 100)
+        for values in pool:
+            values.flags.writeable = False
+        self.query_cache.put(cache_key, pool)
+        return pool
+    
+    def _collaborative_user_vector(self, user_preferences):
+        """A felhasználó faktor vektora (None: nincs modell, ki van kapcsolva, vagy nem ismert)"""
+        if self.cf_model is None or not user_preferences or cf_blend_weight() <= 0:
+            return None
+        return self.cf_model.user_vector(user_preferences.get('user_id'))
+    
+    def _collaborative_pool(self, search_terms, weights, user_vector, categories=(), search_mode='ingredients'):
+        """Top 15 pool a kollaboratív pontszámmal kiegészítve (felhasználónként, nem cache-elt)
+        
+        A jelöltek ugyanazok, mint a cache-elt úton (keresés: a top 20 találat, keresés
+        nélkül a profil top CF_CANDIDATES receptje); a preferencia egy faktor-mátrix ×
+        felhasználó-vektor szorzat a jelölteken.
+        """
+        if search_terms:
+            candidate_indices, search_boost = self._search_candidates(search_terms, 20, categories, search_mode)
+        else:
+            candidate_indices = self._default_pool(weights, CF_CANDIDATES, categories)
+            search_boost = np.zeros(len(candidate_indices))
+        
+        preference = self.cf_model.scores(user_vector, self.cf_item_rows[candidate_indices])
+        return self._build_pool(
+            candidate_indices, search_boost, weights,
+            extra_scores=preference * 100 * cf_blend_weight()
+        )
+    
+    def _build_pool(self, candidate_indices, search_boost, weights=DEFAULT_WEIGHTS, extra_scores=None):
+        """Top 15 pool a jelöltekből: (indexek, pontszámok, relevancia), csak olvasható"""
+        scores = (
+            self.scoring.profile_scores(weights)[candidate_indices] +
+            search_boost * SEARCH_BOOST_WEIGHT  # 10% keresési relevancia
+        )
+        if extra_scores is not None:
+            scores = scores + extra_scores
+        pool_positions = self._top_k(scores, 15)
+        
+        pool = (
+            candidate_indices[pool_positions],
+            scores[pool_positions],
+            search_boost[pool_positions] / 100  # a boost-ból, nem újraszámolva
+        )
+        for values in pool:
+            values.flags.writeable = False
+        return pool
+    
+    def _calculate_search_boost(self, candidate_indices, search_terms):
+        """Keresési relevancia boost számítása (0-100) egyetlen vektorizált lépésben"""
+        if not search_terms or len(candidate_indices) == 0:
+            return np.zeros(len(candidate_indices))
+        
+        match_matrix = self._search_match_matrix(candidate_indices, search_terms)
+        
+        # Egyező kifejezések aránya receptenként
+        return match_matrix.mean(axis=0) * 100
+    
+    def _search_match_matrix(self, candidate_indices, search_terms):
+        """Keresési kifejezés × recept egyezési mátrix a tisztított összetevő oszlopon"""
+        ingredients_clean = pd.Series(self.catalog['ingredients_clean'][candidate_indices], dtype=object)
+        return np.vstack([
+            ingredients_clean.str.contains(term, regex=False).to_numpy(dtype=bool)
+            for term in search_terms
+        ])
+    
+    @_catalog_snapshot
+    def similar_recipes(self, recipeid, n=10):
+        """A recepthez leghasonlóbb receptek (None, ha nincs ilyen recept)
+        
+        Az előre számolt szomszéd listából (O(1)); a gráf építése után hozzáadott vagy
+        módosított receptekre a TF-IDF postings-on keres.
+        """
+        position = self.catalog_delta.position(recipeid)
+        if position is None:
+            return None
+        
+        if position < self.similarity_graph.n_recipes:
+            neighbors, similarities = self.similarity_graph.neighbors_of(position)
+            alive = ~self.catalog_delta.deleted[neighbors]
+            neighbors, similarities = neighbors[alive], similarities[alive]
+        else:
+            query_vector = self.tfidf_vectorizer.transform([self.catalog['ingredients_clean'][position] or ""])
+            neighbors, similarities = self.tfidf_postings.top_k(query_vector, n + 1)
+            keep = neighbors != position
+            neighbors, similarities = neighbors[keep], similarities[keep]
+        
+        neighbors, similarities = neighbors[:n], similarities[:n]
+        recipes = self.catalog.rows(neighbors, self.row_columns)
+        for recipe, similarity in zip(recipes, similarities):
+            recipe['similarity'] = round(float(similarity), 4)
+        return recipes
+    
+    def _recipe_ingredient_ids(self, position):
+        """Egy recept összetevő id-i (alap sor: az alap index, delta sor: a delta index CSR sora)"""
+        index, row = self.base_ingredient_index, position
+        if position >= index.n_recipes:
+            index, row = self.ingredient_index.delta, position - index.n_recipes
+        return index.incidence.indices[index.incidence.indptr[row]:index.incidence.indptr[row + 1]]
+    
+    def _swap_suggestion(self, position):
+        """A recept legjobb fenntartható cseréje: (forrás, cél, ESI javulás) vagy None
+        
+        Alap receptre az előre számolt tömbből (O(1)); delta receptre az összetevőnkénti
+        jelölt listákból (legfeljebb összetevők × K kikeresés).
+        """
+        if position < self.substitutions.n_recipes:
+            return self.substitutions.recipe_swap(position)
+        return self.substitutions.best_swap(self._recipe_ingredient_ids(position).tolist())
+    
+    @_catalog_snapshot
+    def recipe_substitutions(self, recipeid):
+        """Egy recept csere javaslatai: legjobb csere + összetevőnkénti jelöltek (None, ha nincs ilyen recept)"""
+        position = self.catalog_delta.position(recipeid)
+        if position is None:
+            return None
+        
+        ingredient_ids = self._recipe_ingredient_ids(position).tolist()
+        present = set(ingredient_ids)
+        ingredients = []
+        for ingredient_id in ingredient_ids:
+            substitutes = [
+                {'ingredient': target, 'similarity': round(similarity, 4), 'esi_gain': round(gain, 1)}
+                for target, similarity, gain in self.substitutions.substitutes_for(ingredient_id)
+                if self.base_ingredient_index.term_id(target) not in present
+            ]
+            if substitutes:
+                ingredients.append({
+                    'ingredient': self.ingredient_index.vocabulary[ingredient_id],
+                    'substitutes': substitutes
+                })
+        
+        swap = self._swap_suggestion(position)
+        best = None
+        if swap is not None:
+            source, target, gain = swap
+            best = {'ingredient': source, 'substitute': target, 'esi_gain': round(gain, 1),
+                    'explanation': swap_sentence(swap)}
+        return {'best': best, 'ingredients': ingredients}
+    
+    def ingredient_substitutes(self, ingredient):
+        """Egy összetevő fenntarthatóbb csere jelöltjei (None, ha az összetevő ismeretlen)"""
+        ingredient_id = self.base_ingredient_index.term_id(normalize_text(ingredient))
+        if ingredient_id is None:
+            return None
+        return [
+            {'ingredient': target, 'similarity': round(similarity, 4), 'esi_gain': round(gain, 1)}
+            for target, similarity, gain in self.substitutions.substitutes_for(ingredient_id)
+        ]
+    
+    @_catalog_snapshot
+    def category_facets(self, search_ingredients="", search_mode='ingredients'):
+        """Facet számok az aktuális találati halmazra: [{'category', 'count'}, ...] csökkenő sorrendben
+        
+        Keresés nélkül az élő katalógus (előre számolva), kereséssel az összes összetevő
+        egyezés (csonkolás nélkül), TF-IDF fallback esetén a top 20 találat. Szöveges
+        keresésnél az összes BM25 találat, összevont keresésnél a két halmaz uniója.
+        """
+        search_terms = self._canonical_search_terms(search_ingredients)
+        if not search_terms:
+            counts = self.category_counts
+        else:
+            cache_key = ('facets', search_terms)
+            if search_mode != 'ingredients':
+                cache_key += (search_mode,)
+            counts = self.query_cache.get(cache_key)
+            if counts is None:
+                indices = np.empty(0, dtype=np.intp)
+                if search_mode != 'ingredients':
+                    indices, _ = self._text_search(" ".join(search_terms), max_results=len(self.catalog))
+                if search_mode != 'text':
+                    ingredient_indices = self._ingredient_candidates(list(search_terms), max_results=None)
+                    if len(ingredient_indices) == 0:
+                        ingredient_indices = np.asarray(self._tfidf_search(", ".join(search_terms)), dtype=np.intp)
+                    indices = np.union1d(indices, ingredient_indices) if len(indices) else ingredient_indices
+                counts = self._category_counts(indices)
+                self.query_cache.put(cache_key, counts)
+        
+        order = np.lexsort((np.arange(len(counts)), -counts))
+        return [
+            {'category': self.category_index.categories[category_id], 'count': int(counts[category_id])}
+            for category_id in order.tolist() if counts[category_id] > 0
+        ]
+    
+    @_catalog_snapshot
+    def get_ingredient_suggestions(self, partial_input, max_suggestions=10):
+        """Összetevő javaslatok auto-complete-hez"""
+        if len(partial_input) < 2:
+            return []
+        
+        partial_clean = normalize_text(partial_input)
+        if not partial_clean:
+            return []
+        
+        return list(self.suggestion_engine.suggest(partial_clean, max_suggestions))
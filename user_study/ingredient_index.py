@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""
+Összetevő index - egész kódolású szótár, ritka recept×összetevő mátrix és bitsetek
+A keresés néhány NumPy / sparse műveletre redukálódik a Python halmazok helyett
+"""
+
+import json
+from bisect import bisect_left
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+from user_study.catalog import open_sparse, save_sparse
+
+
+class IngredientIndex:
+    """Invertált összetevő index: CSR (recept -> összetevők), CSC (összetevő -> receptek) + bitsetek"""
+
+    # Egy posting lista akkor kap sűrű bitsetet, ha a bitset kisebb mint az int32 lista
+    # (df * 32 bit > n_recipes bit)
+    DENSE_RATIO = 32
+
+    def __init__(self, vocabulary, incidence, postings=None, bitsets=None, bitset_slot=None):
+        self.vocabulary = list(vocabulary)
+        self.vocab_ids = {name: i for i, name in enumerate(self.vocabulary)}
+
+        # recept × összetevő, az érték az előfordulások száma a receptben
+        self.incidence = sparse.csr_matrix(incidence, dtype=np.float32, copy=False)
+        self.n_recipes = self.incidence.shape[0]
+
+        # összetevő -> receptek posting listák (rendezett recept indexek)
+        if postings is None:
+            postings = self.incidence.tocsc()
+            postings.sort_indices()
+        self.postings = postings
+        self.doc_freq = np.diff(self.postings.indptr).astype(np.int32)
+
+        if bitsets is None:
+            self._build_bitsets()
+        else:
+            self.bitsets, self.bitset_slot = bitsets, bitset_slot
+
+    @classmethod
+    def from_ingredient_texts(cls, ingredient_texts, vocabulary=None):
+        """Index építése tisztított, vesszővel elválasztott összetevő szövegekből
+
+        vocabulary: meglévő szótár, amelynek id-i megmaradnak (az új összetevők a végére kerülnek)
+        """
+        vocab_ids = {name: i for i, name in enumerate(vocabulary or [])}
+        rows, cols = [], []
+
+        for idx, ingredients in enumerate(ingredient_texts):
+            for ingredient in ingredients.split(','):
+                ingredient = ingredient.strip()
+                if not ingredient:
+                    continue
+                ingredient_id = vocab_ids.setdefault(ingredient, len(vocab_ids))
+                rows.append(idx)
+                cols.append(ingredient_id)
+
+        n_recipes = len(ingredient_texts)
+        # Duplikált (recept, összetevő) párok összeadódnak -> előfordulási szám
+        incidence = sparse.coo_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(n_recipes, len(vocab_ids))
+        ).tocsr()
+        incidence.sum_duplicates()
+
+        vocabulary = sorted(vocab_ids, key=vocab_ids.get)
+        return cls(vocabulary, incidence)
+
+    def save(self, directory):
+        """Mentés nyers .npy tömbökbe (a workerek memory-mapped módban nyitják meg)"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        save_sparse(directory, "incidence", self.incidence)
+        save_sparse(directory, "postings", self.postings)
+        np.save(directory / "bitsets.npy", self.bitsets)
+        np.save(directory / "bitset_slot.npy", self.bitset_slot)
+        with open(directory / "vocabulary.json", 'w', encoding='utf-8') as f:
+            json.dump(self.vocabulary, f, ensure_ascii=False)
+
+    @classmethod
+    def open(cls, directory):
+        """Megnyitás memory-mapped tömbökre - csak a szótár dict készül workerenként"""
+        directory = Path(directory)
+        with open(directory / "vocabulary.json", encoding='utf-8') as f:
+            vocabulary = json.load(f)
+        return cls(
+            vocabulary,
+            open_sparse(directory, "incidence"),
+            postings=open_sparse(directory, "postings"),
+            bitsets=np.load(directory / "bitsets.npy", mmap_mode='r'),
+            bitset_slot=np.load(directory / "bitset_slot.npy", mmap_mode='r')
+        )
+
+    def _build_bitsets(self):
+        """Sűrű bitsetek a gyakori összetevőkhöz (ritkákhoz a posting lista olcsóbb)"""
+        dense_ids = np.flatnonzero(self.doc_freq * self.DENSE_RATIO > self.n_recipes)
+        n_bytes = (self.n_recipes + 7) // 8
+
+        self.bitset_slot = np.full(len(self.vocabulary), -1, dtype=np.int32)
+        self.bitset_slot[dense_ids] = np.arange(len(dense_ids), dtype=np.int32)
+        self.bitsets = np.zeros((len(dense_ids), n_bytes), dtype=np.uint8)
+
+        for slot, ingredient_id in enumerate(dense_ids):
+            mask = np.zeros(self.n_recipes, dtype=bool)
+            mask[self.recipes_for(ingredient_id)] = True
+            self.bitsets[slot] = np.packbits(mask)
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    def __contains__(self, ingredient):
+        return ingredient in self.vocab_ids
+
+    def term_id(self, ingredient):
+        """Összetevő azonosítója vagy None"""
+        return self.vocab_ids.get(ingredient)
+
+    def recipes_for(self, ingredient_id):
+        """Egy összetevő posting listája (rendezett recept indexek)"""
+        start, end = self.postings.indptr[ingredient_id], self.postings.indptr[ingredient_id + 1]
+        return self.postings.indices[start:end]
+
+    def match_scores(self, weights):
+        """Súlyozott egyezésszám receptenként: {összetevő_id: súly} -> (recept indexek, pontszámok)
+
+        Csak az érintett posting listákat járja be, a katalógus méretével nem nő.
+        """
+        if not weights:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        ids = np.fromiter(weights.keys(), dtype=np.int32, count=len(weights))
+        term_weights = np.fromiter(weights.values(), dtype=np.float32, count=len(weights))
+
+        starts = self.postings.indptr[ids]
+        ends = self.postings.indptr[ids + 1]
+        lengths = ends - starts
+        if lengths.sum() == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        # Az összes érintett posting pozíció egyetlen vektorban
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        positions = offsets + np.arange(lengths.sum())
+        recipe_hits = self.postings.indices[positions]
+        hit_scores = self.postings.data[positions] * np.repeat(term_weights, lengths)
+
+        recipes, inverse = np.unique(recipe_hits, return_inverse=True)
+        scores = np.bincount(inverse, weights=hit_scores).astype(np.float32)
+        return recipes.astype(np.int32), scores
+
+    def union(self, ingredient_ids):
+        """Posting listák uniója (rendezett recept indexek)"""
+        if not ingredient_ids:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate([self.recipes_for(i) for i in ingredient_ids]))
+
+    def intersect(self, groups):
+        """Csoportok metszete - minden csoport összetevő id-k listája, csoporton belül unió
+
+        Ha minden csoport egyetlen sűrű összetevő, bitenkénti ÉS-sel számol,
+        különben a legrövidebb listából indulva rendezett metszetekkel.
+        """
+        if not groups or any(not group for group in groups):
+            return np.empty(0, dtype=np.int32)
+
+        slots = [self.bitset_slot[group[0]] for group in groups if len(group) == 1]
+        if len(slots) == len(groups) and min(slots) >= 0:
+            combined = np.bitwise_and.reduce(self.bitsets[slots], axis=0)
+            mask = np.unpackbits(combined, count=self.n_recipes).astype(bool)
+            return np.flatnonzero(mask).astype(np.int32)
+
+        lists = sorted((self.union(group) for group in groups), key=len)
+        result = lists[0]
+        for posting in lists[1:]:
+            if len(result) == 0:
+                break
+            result = np.intersect1d(result, posting, assume_unique=True)
+        return result.astype(np.int32)
+
+
+class LayeredIngredientIndex:
+    """Alap index + delta index (inkrementális szerkesztések) közös szótárral
+
+    A delta index a kibővített szótárral épül (az alap id-k változatlanok), a törölt
+    alap receptek a maszkkal esnek ki; a recept indexek a LayeredCatalog index terét követik.
+    """
+
+    def __init__(self, base, delta, deleted):
+        self.base = base
+        self.delta = delta
+        self.deleted = deleted
+        self.n_base = base.n_recipes
+        self.n_base_terms = len(base.vocabulary)
+        self.n_recipes = self.n_base + delta.n_recipes
+
+        self.vocabulary = delta.vocabulary
+        self.vocab_ids = delta.vocab_ids
+
+        # Dokumentum gyakoriság: alap - törölt alap receptek + delta
+        doc_freq = np.zeros(len(self.vocabulary), dtype=np.int32)
+        doc_freq[:self.n_base_terms] = base.doc_freq
+        deleted_rows = np.flatnonzero(deleted)
+        if len(deleted_rows):
+            deleted_terms = base.incidence[deleted_rows].indices
+            doc_freq[:self.n_base_terms] -= np.bincount(
+                deleted_terms, minlength=self.n_base_terms
+            ).astype(np.int32)
+        doc_freq += delta.doc_freq
+        self.doc_freq = doc_freq
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    def __contains__(self, ingredient):
+        return ingredient in self.vocab_ids
+
+    def term_id(self, ingredient):
+        return self.vocab_ids.get(ingredient)
+
+    def _alive(self, recipes):
+        in_base = recipes < self.n_base
+        keep = np.ones(len(recipes), dtype=bool)
+        keep[in_base] = ~self.deleted[recipes[in_base]]
+        return keep
+
+    def match_scores(self, weights):
+        base_weights = {i: w for i, w in weights.items() if i < self.n_base_terms}
+        base_recipes, base_scores = self.base.match_scores(base_weights)
+        delta_recipes, delta_scores = self.delta.match_scores(weights)
+
+        recipes = np.concatenate([base_recipes, delta_recipes + self.n_base]).astype(np.int32)
+        scores = np.concatenate([base_scores, delta_scores]).astype(np.float32)
+        keep = self._alive(recipes)
+        return recipes[keep], scores[keep]
+
+    def intersect(self, groups):
+        base_groups = [[i for i in group if i < self.n_base_terms] for group in groups]
+        recipes = np.concatenate([
+            self.base.intersect(base_groups),
+            self.delta.intersect(groups) + self.n_base
+        ]).astype(np.int32)
+        return recipes[self._alive(recipes)]
+
+
+class TrigramIndex:
+    """Karakter-trigram index az összetevő szótár felett a részleges egyezés szűkítéséhez"""
+
+    N = 3
+
+    def __init__(self, vocabulary):
+        self.vocabulary = list(vocabulary)
+
+        gram_ids = {}
+        rows, cols = [], []
+        char_postings = {}
+
+        for ingredient_id, ingredient in enumerate(self.vocabulary):
+            for gram in self._grams(ingredient):
+                rows.append(ingredient_id)
+                cols.append(gram_ids.setdefault(gram, len(gram_ids)))
+            for char in set(ingredient):
+                char_postings.setdefault(char, []).append(ingredient_id)
+
+        self.gram_ids = gram_ids
+        # trigram -> összetevők posting listák
+        self.postings = sparse.csc_matrix(
+            (np.ones(len(rows), dtype=np.int8), (rows, cols)),
+            shape=(len(self.vocabulary), len(gram_ids))
+        )
+        self.postings.sort_indices()
+        self.gram_counts = np.bincount(
+            np.asarray(rows, dtype=np.int64), minlength=len(self.vocabulary)
+        )
+        # 3 karakternél rövidebb összetevők (nincs trigramjuk) - ezeket közvetlenül nézzük
+        self.short_ids = np.flatnonzero(self.gram_counts == 0)
+        # 1-2 karakteres keresésekhez karakter posting listák
+        self.char_postings = {
+            char: np.asarray(ids, dtype=np.int32) for char, ids in char_postings.items()
+        }
+
+    @classmethod
+    def _grams(cls, text):
+        return {text[i:i + cls.N] for i in range(len(text) - cls.N + 1)}
+
+    def _gram_postings(self, gram_id):
+        start, end = self.postings.indptr[gram_id], self.postings.indptr[gram_id + 1]
+        return self.postings.indices[start:end]
+
+    def _containing(self, search_term):
+        """Jelöltek, amelyek tartalmazhatják a keresett szót (minden trigramja/karaktere megvan)"""
+        if len(search_term) >= self.N:
+            gram_ids = [self.gram_ids.get(gram) for gram in self._grams(search_term)]
+            if None in gram_ids:
+                return np.empty(0, dtype=np.int32)
+            lists = [self._gram_postings(gram_id) for gram_id in gram_ids]
+        else:
+            lists = [self.char_postings.get(char) for char in set(search_term)]
+            if any(posting is None for posting in lists):
+                return np.empty(0, dtype=np.int32)
+
+        lists.sort(key=len)
+        result = lists[0]
+        for posting in lists[1:]:
+            result = np.intersect1d(result, posting, assume_unique=True)
+        return result
+
+    def _contained(self, search_term):
+        """Jelöltek, amelyek részei lehetnek a keresett szónak (minden trigramjuk benne van)"""
+        gram_ids = [
+            self.gram_ids[gram] for gram in self._grams(search_term) if gram in self.gram_ids
+        ]
+        if not gram_ids:
+            return self.short_ids
+
+        hits = np.concatenate([self._gram_postings(gram_id) for gram_id in gram_ids])
+        ingredient_ids, counts = np.unique(hits, return_counts=True)
+        complete = ingredient_ids[counts == self.gram_counts[ingredient_ids]]
+        return np.concatenate([complete, self.short_ids])
+
+    def partial_matches(self, search_term):
+        """Részleges egyezésű összetevők: a keresett szó része az összetevőnek vagy fordítva
+
+        A trigram index csak a jelölteket szűkíti, a végső döntés a substring ellenőrzés.
+        """
+        if not search_term:
+            return list(range(len(self.vocabulary)))
+
+        candidates = np.union1d(self._containing(search_term), self._contained(search_term))
+        return [
+            int(ingredient_id) for ingredient_id in candidates
+            if search_term in self.vocabulary[ingredient_id]
+            or self.vocabulary[ingredient_id] in search_term
+        ]
+
+    def extended(self, vocabulary):
+        """Index a bővített szótárra (az új összetevők a végén) - csak az új összetevők indexelődnek"""
+        if len(vocabulary) == len(self.vocabulary):
+            return self
+        return LayeredTrigramIndex(self, TrigramIndex(vocabulary[len(self.vocabulary):]))
+
+
+class LayeredTrigramIndex:
+    """Alap trigram index + a szerkesztésekkel bekerült új összetevők kis indexe"""
+
+    def __init__(self, base, delta):
+        self.base = base
+        self.delta = delta
+        self.n_base = len(base.vocabulary)
+
+    def partial_matches(self, search_term):
+        return self.base.partial_matches(search_term) + [
+            self.n_base + ingredient_id for ingredient_id in self.delta.partial_matches(search_term)
+        ]
+
+
+class SuggestionEngine:
+    """Auto-complete motor: prefix keresés rendezett szótárral, infix keresés suffix tömbbel
+
+    Az eredmények gyakoriság (hány receptben szerepel) szerint rangsoroltak,
+    a prefix találatok megelőzik a szó közbeni találatokat. A rendezett szótár és a
+    suffix tömb csak int32 (összetevő id, kezdő pozíció) tömb - az artifactban
+    memory-mapped, az összehasonlítás a szótár szövegein történik. A szerkesztésekkel
+    bekerült új összetevők egy külön, kis részbe kerülnek (extended).
+    """
+
+    # A prefix tartomány felső határa (minden összetevő karakternél nagyobb)
+    _UPPER = '\U0010ffff'
+
+    def __init__(self, vocabulary, frequencies, parts, cache_size=4096):
+        """parts: [(rendezett id-k, suffix összetevő id-k, suffix kezdő pozíciók), ...] - az
+        alap rész és legfeljebb egy delta rész (a base után felvett összetevők)"""
+        self.vocabulary = list(vocabulary)
+        self.parts = parts
+        self.cache_size = cache_size
+
+        # Globális rang: gyakoriság csökkenő, azonos gyakoriságnál ábécé sorrend
+        self.ranked_ids = np.lexsort((self._name_positions(), -np.asarray(frequencies, dtype=np.int64)))
+        self.rank = np.empty(len(self.vocabulary), dtype=np.int32)
+        self.rank[self.ranked_ids] = np.arange(len(self.vocabulary), dtype=np.int32)
+
+        self.suggest = lru_cache(maxsize=cache_size)(self._suggest)
+
+    @staticmethod
+    def _part(vocabulary, term_ids):
+        """Rendezett szótár + suffix tömb a megadott összetevőkre (a suffixek csak rendezéskor élnek)"""
+        sorted_ids = np.array(sorted(term_ids, key=vocabulary.__getitem__), dtype=np.int32)
+        suffixes = sorted(
+            (
+                (term_id, start)
+                for term_id in term_ids
+                for start in range(1, len(vocabulary[term_id]))
+            ),
+            key=lambda suffix: vocabulary[suffix[0]][suffix[1]:]
+        )
+        suffixes = np.array(suffixes, dtype=np.int32).reshape(-1, 2)
+        return sorted_ids, np.ascontiguousarray(suffixes[:, 0]), np.ascontiguousarray(suffixes[:, 1])
+
+    @classmethod
+    def build(cls, vocabulary, frequencies, cache_size=4096):
+        """A teljes szótár indexelése (build lépés)"""
+        vocabulary = list(vocabulary)
+        return cls(vocabulary, frequencies, [cls._part(vocabulary, range(len(vocabulary)))],
+                   cache_size=cache_size)
+
+    def save(self, directory):
+        """Az alap rész mentése nyers .npy tömbökbe (a szótár az összetevő indexé)"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, values in zip(('sorted_ids', 'suffix_terms', 'suffix_offsets'), self.parts[0]):
+            np.save(directory / f"{name}.npy", values)
+
+    @classmethod
+    def open(cls, directory, vocabulary, frequencies, cache_size=4096):
+        """Megnyitás memory-mapped tömbökre - csak a rang tömb készül workerenként"""
+        directory = Path(directory)
+        part = tuple(
+            np.load(directory / f"{name}.npy", mmap_mode='r')
+            for name in ('sorted_ids', 'suffix_terms', 'suffix_offsets')
+        )
+        return cls(vocabulary, frequencies, [part], cache_size=cache_size)
+
+    def extended(self, vocabulary, frequencies):
+        """Motor a bővített szótárra új gyakoriságokkal (szerkesztés után)
+
+        Az alap rész tömbjei közösek, csak az új összetevők (id >= az alap szótár mérete)
+        kapnak saját kis részt.
+        """
+        base = self.parts[0]
+        n_base = len(base[0])
+        parts = [base]
+        if len(vocabulary) > n_base:
+            parts.append(self._part(list(vocabulary), range(n_base, len(vocabulary))))
+        return SuggestionEngine(vocabulary, frequencies, parts, cache_size=self.cache_size)
+
+    def _name_positions(self):
+        """Összetevő -> ábécé sorrendbeli pozíció a teljes szótárban (a részek összefésülve)"""
+        base_ids = self.parts[0][0]
+        if len(self.parts) == 1:
+            positions = np.empty(len(self.vocabulary), dtype=np.int64)
+            positions[base_ids] = np.arange(len(base_ids))
+            return positions
+
+        # Az új összetevő az alap rész két szomszédja közé kerül (bináris keresés), az
+        # azonos helyre esők egymás közti sorrendje a delta rész sorrendje
+        delta_ids = self.parts[1][0]
+        slots = np.array([
+            bisect_left(range(len(base_ids)), self.vocabulary[term_id],
+                        key=lambda i: self.vocabulary[base_ids[i]])
+            for term_id in delta_ids.tolist()
+        ], dtype=np.int64)
+        primary = np.empty(len(self.vocabulary), dtype=np.int64)
+        primary[base_ids] = 2 * np.arange(len(base_ids))
+        primary[delta_ids] = 2 * slots - 1
+        secondary = np.zeros(len(self.vocabulary), dtype=np.int64)
+        secondary[delta_ids] = np.arange(len(delta_ids))
+
+        positions = np.empty(len(self.vocabulary), dtype=np.int64)
+        positions[np.lexsort((secondary, primary))] = np.arange(len(self.vocabulary))
+        return positions
+
+    @staticmethod
+    def _range(key, size, query):
+        positions = range(size)
+        return (
+            bisect_left(positions, query, key=key),
+            bisect_left(positions, query + SuggestionEngine._UPPER, key=key)
+        )
+
+    def _prefix_ids(self, part, query):
+        sorted_ids = part[0]
+        start, end = self._range(lambda i: self.vocabulary[sorted_ids[i]], len(sorted_ids), query)
+        return sorted_ids[start:end]
+
+    def _infix_ids(self, part, query):
+        _, suffix_terms, suffix_offsets = part
+        start, end = self._range(
+            lambda i: self.vocabulary[suffix_terms[i]][suffix_offsets[i]:], len(suffix_terms), query
+        )
+        return suffix_terms[start:end]
+
+    def _ranks(self, term_ids):
+        return np.unique(np.concatenate([self.rank[ids] for ids in term_ids]))
+
+    def _suggest(self, query, limit=10):
+        """Legfeljebb limit javaslat egy már normalizált lekérdezésre"""
+        prefix_ranks = self._ranks([self._prefix_ids(part, query) for part in self.parts])
+        if len(prefix_ranks) >= limit:
+            return tuple(self.vocabulary[i] for i in self.ranked_ids[prefix_ranks[:limit]])
+
+        infix_ranks = np.setdiff1d(
+            self._ranks([self._infix_ids(part, query) for part in self.parts]),
+            prefix_ranks, assume_unique=True
+        )
+        ranks = np.concatenate([prefix_ranks, infix_ranks[:limit - len(prefix_ranks)]])
+        return tuple(self.vocabulary[i] for i in self.ranked_ids[ranks])
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Pareto rétegek (skyline) az ESI / HSI / PPI pontszámok felett
+Egy recept dominál egy másikat, ha mindhárom pontszáma legalább akkora és legalább
+egyben nagyobb. A 0. réteg a nem dominált receptek (skyline), az i. réteg azok, amelyeket
+csak a 0..i-1. rétegek receptjei dominálnak. A réteg index a katalógus artifact része,
+így a "legjobb kompromisszum" lekérdezések csak az első rétegeket járják be.
+"""
+
+from bisect import bisect_left
+
+import numpy as np
+
+
+def _dominated(staircase, y, z):
+    """Van-e a réteg lépcsőjén (y, z)-t gyengén domináló pont (bináris keresés)"""
+    ys, zs = staircase
+    j = bisect_left(ys, y)
+    return j < len(ys) and zs[j] >= z
+
+
+def _insert(staircase, y, z):
+    """(y, z) beszúrása a lépcsőbe, az általa dominált pontok eltávolításával
+
+    A lépcső y szerint növekvő, z szerint csökkenő sorrendű maximális pontokat tart.
+    """
+    ys, zs = staircase
+    j = bisect_left(ys, y)
+    end = j + 1 if j < len(ys) and ys[j] == y else j
+    start = j
+    while start > 0 and zs[start - 1] <= z:
+        start -= 1
+    ys[start:end] = [y]
+    zs[start:end] = [z]
+
+
+def pareto_layers(points):
+    """Pareto réteg index minden pontra (n × 3 tömb, nagyobb = jobb), O(n log² n)
+
+    Az első koordináta szerint csökkenő sorrendben feldolgozva egy pontot csak a már
+    látott pontok dominálhatnak; rétegenként egy 2D lépcső (a maradék két koordináta)
+    dönti el a dominanciát, a réteg bináris kereséssel adódik (ha az L. réteg dominál,
+    minden korábbi is). Az azonos pontok ugyanabba a rétegbe kerülnek.
+    """
+    points = np.nan_to_num(np.asarray(points, dtype=np.float64), nan=-np.inf)
+    if len(points) == 0:
+        return np.empty(0, dtype=np.int32)
+
+    unique, inverse = np.unique(points, axis=0, return_inverse=True)
+    order = np.lexsort((-unique[:, 2], -unique[:, 1], -unique[:, 0]))
+    ys, zs = unique[:, 1].tolist(), unique[:, 2].tolist()
+
+    staircases = []
+    unique_layers = np.empty(len(unique), dtype=np.int32)
+    for i in order.tolist():
+        y, z = ys[i], zs[i]
+        lo, hi = 0, len(staircases)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _dominated(staircases[mid], y, z):
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == len(staircases):
+            staircases.append(([], []))
+        _insert(staircases[lo], y, z)
+        unique_layers[i] = lo
+
+    return unique_layers[np.ravel(inverse)]
+
+
+class ParetoIndex:
+    """Receptek réteg szerint rendezve: az első rétegek egy szeletként olvashatók"""
+
+    def __init__(self, points, layers, excluded=None):
+        self.points = points
+        self.layers = np.asarray(layers, dtype=np.int32)
+
+        rows = np.arange(len(self.layers))
+        if excluded is not None:
+            rows = rows[~excluded]
+        self.order = rows[np.argsort(self.layers[rows], kind='stable')]
+        # bounds[L]: az L. réteg első pozíciója az order tömbben
+        n_layers = int(self.layers[self.order[-1]]) + 1 if len(self.order) else 0
+        self.bounds = np.searchsorted(self.layers[self.order], np.arange(n_layers + 1))
+
+    def __len__(self):
+        return len(self.bounds) - 1
+
+    def first_layers(self, min_count):
+        """Az első rétegek receptjei, amíg legalább min_count recept össze nem gyűlik"""
+        n_layers = int(np.searchsorted(self.bounds, min_count, side='left'))
+        return self.order[:self.bounds[min(max(n_layers, 1), len(self))]]
+
+    def layer_of(self, points):
+        """Új pontok rétege a meglévő rétegekhez képest (a meglévők rétege nem változik)
+
+        Rétegenként bináris keresés; egy lépés csak az adott réteg pontjait nézi.
+        """
+        points = np.asarray(points, dtype=np.float64)
+        layers = np.empty(len(points), dtype=np.int32)
+        for i, point in enumerate(points):
+            lo, hi = 0, len(self)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                members = self.points[self.order[self.bounds[mid]:self.bounds[mid + 1]]]
+                dominates = np.all(members >= point, axis=1) & np.any(members > point, axis=1)
+                if dominates.any():
+                    lo = mid + 1
+                else:
+                    hi = mid
+            layers[i] = lo
+        return layers
+
+
+class LayeredParetoIndex:
+    """Alap Pareto index + delta receptek rétegei (a LayeredCatalog index terében)
+
+    Az alap index nem épül újra: a törölt alap sorok lekérdezéskor esnek ki, a delta
+    receptek rétege a beszúráskor számolódik (ParetoIndex.layer_of).
+    """
+
+    def __init__(self, base, delta_layers, deleted):
+        self.base = base
+        self.delta_layers = np.asarray(delta_layers, dtype=np.int32)
+        self.deleted = deleted
+        self.n_base = len(base.layers)
+
+    def __len__(self):
+        n_delta_layers = int(self.delta_layers.max()) + 1 if len(self.delta_layers) else 0
+        return max(len(self.base), n_delta_layers)
+
+    def first_layers(self, min_count):
+        """Az első rétegek élő receptjei, amíg legalább min_count recept össze nem gyűlik"""
+        rows = []
+        count = 0
+        for layer in range(len(self)):
+            if layer < len(self.base):
+                base_rows = self.base.order[self.base.bounds[layer]:self.base.bounds[layer + 1]]
+                rows.append(base_rows[~self.deleted[base_rows]])
+                count += len(rows[-1])
+            rows.append(self.n_base + np.flatnonzero(self.delta_layers == layer))
+            count += len(rows[-1])
+            if count >= min_count:
+                break
+        if not rows:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(rows).astype(self.base.order.dtype)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Lekérdezés-eredmény cache az ajánlási pipeline-hoz
+Korlátos méretű LRU, lejárati idővel (TTL) és találat/hiány számlálókkal
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueryResultCache:
+    """Szálbiztos LRU cache TTL-lel - kulcs: kanonikus keresési kifejezések"""
+
+    def __init__(self, max_size=256, ttl_seconds=300.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Érték a cache-ből vagy None (lejárt bejegyzést töröl)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        """Érték mentése, a legrégebben használt bejegyzés kiesik ha tele van"""
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Teljes invalidálás (pl. katalógus újratöltésekor)"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Számlálók a monitorozáshoz"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Egységes, streamelt recept előfeldolgozás
+betöltés -> pontszám normalizálás -> szöveg tisztítás -> kép URL -> normalizált összetevők
+
+A nyers CSV darabokban (read_csv(chunksize=...)) halad át a láncolt lépéseken, egy
+generátorból: egyszerre csak egy darab van a memóriában. A globális statisztikák
+(env_score min/max, nutri_score / meal_score max, sorok száma) egy olcsó első menetből
+jönnek, amely csak a pontszám oszlopokat olvassa; a user study minta sorai szintén a
+pontszámokból választódnak ki, így a szöveges oszlopok egyszer olvasódnak.
+
+Egy lépés: (darab, ScoreStats) -> darab. A feldolgozott darabok egyszerre íródnak a
+processed CSV-be és a katalógus artifact oszlopaiba (CatalogWriter), az artifact
+építés nem olvassa vissza a CSV-t. A recipe_preprocessor.py, a setup_database.py és
+a CSVProcessor is ezt a pipeline-t használja.
+
+Használat:
+    python -m user_study.recipe_pipeline [hungarian_recipes_github.csv] [data/processed_recipes.csv] [--sample 50]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from user_study.catalog import CatalogWriter, detect_encoding, iter_csv_chunks
+from user_study.catalog_artifact import artifact_root
+from user_study.catalog_delta import ENV_SCORE_COLUMNS, MEAL_SCORE_COLUMNS, NUTRI_SCORE_COLUMNS
+from user_study.category_index import clean_category
+from user_study.explanations import catalog_fragments
+from user_study.rng import make_rng
+from user_study.scoring import DEFAULT_WEIGHTS, SCORE_COLUMNS
+from user_study.text_normalizer import normalize_series
+
+CHUNK_SIZE = 50_000
+
+# A user study minta mérete (RECIPE_CATALOG_MODE=full esetén nincs mintavétel)
+STUDY_SAMPLE_SIZE = 50
+
+# Nyers oszlop -> katalógus oszlop
+COLUMN_NAMES = {'name': 'title'}
+
+# Hiányzó szöveg mezők helyettesítője
+TEXT_DEFAULTS = {
+    'title': 'Névtelen recept',
+    'ingredients': 'Ismeretlen összetevők',
+    'instructions': 'Nincs útmutató',
+}
+
+# Pontszám hiányzó nyers oszlop / érték esetén (a delta receptekével azonos)
+SCORE_DEFAULTS = {'ESI': 70.0, 'HSI': 75.0, 'PPI': 80.0}
+
+# Kép nélküli receptek képe (a recept id választ, így a kimenet determinisztikus)
+FALLBACK_IMAGES = (
+    'https://images.unsplash.com/photo-1547592180-85f173990554?w=400&h=300&fit=crop&auto=format',
+    'https://images.unsplash.com/photo-1565299624946-b28f40a0ca4b?w=400&h=300&fit=crop&auto=format',
+    'https://images.unsplash.com/photo-1544943910-4c1dc44aab44?w=400&h=300&fit=crop&auto=format',
+    'https://images.unsplash.com/photo-1558030006-450675393462?w=400&h=300&fit=crop&auto=format',
+    'https://images.unsplash.com/photo-1572441713132-51c75654db73?w=400&h=300&fit=crop&auto=format',
+)
+
+
+def _first_column(names, candidates):
+    return next((name for name in candidates if name in names), None)
+
+
+def _combine(current, value, reduce):
+    """Futó min/max frissítése egy darab értékével (NaN: nincs érték a darabban)"""
+    if pd.isna(value):
+        return current
+    return float(value) if current is None else reduce(current, float(value))
+
+
+class ScoreStats:
+    """A teljes CSV pontszám statisztikái (első menet): nyers oszlopok, tartományok, sorok száma"""
+
+    def __init__(self, columns):
+        names = list(columns)
+        self.env_column = _first_column(names, ENV_SCORE_COLUMNS)
+        self.nutri_column = _first_column(names, NUTRI_SCORE_COLUMNS)
+        self.meal_column = _first_column(names, MEAL_SCORE_COLUMNS)
+        # Pontszám oszlopok nélkül egy oszlop is elég a sorok megszámolásához
+        self.usecols = [
+            name for name in (self.env_column, self.nutri_column, self.meal_column) if name
+        ] or names[:1]
+        self.env_min = None
+        self.env_max = None
+        self.nutri_max = None
+        self.meal_max = None
+        self.n_rows = 0
+
+    def update(self, chunk):
+        self.n_rows += len(chunk)
+        if self.env_column:
+            self.env_min = _combine(self.env_min, chunk[self.env_column].min(), min)
+            self.env_max = _combine(self.env_max, chunk[self.env_column].max(), max)
+        if self.nutri_column:
+            self.nutri_max = _combine(self.nutri_max, chunk[self.nutri_column].max(), max)
+        if self.meal_column:
+            self.meal_max = _combine(self.meal_max, chunk[self.meal_column].max(), max)
+
+    def __str__(self):
+        def fmt(value):
+            return '-' if value is None else f"{value:.2f}"
+        return (f"{self.n_rows} recept, env_score: {fmt(self.env_min)} - {fmt(self.env_max)}, "
+                f"nutri_score max: {fmt(self.nutri_max)}, meal_score max: {fmt(self.meal_max)}")
+
+
+def scan_scores(path, encoding=None, chunksize=CHUNK_SIZE):
+    """Első menet: csak a pontszám oszlopok olvasódnak (a szöveges oszlopok nem parse-olódnak)"""
+    encoding = encoding or detect_encoding(path)
+    stats = ScoreStats(pd.read_csv(path, encoding=encoding, nrows=0).columns)
+    for chunk in iter_csv_chunks(path, chunksize, usecols=stats.usecols, encoding=encoding):
+        stats.update(chunk)
+    return stats
+
+
+# --- Lépések: (darab, ScoreStats) -> darab ---
+
+def rename_columns(chunk, stats):
+    """Nyers oszlopnevek a katalógus nevekre (name -> title)"""
+    return chunk.rename(columns=COLUMN_NAMES)
+
+
+def assign_recipe_ids(chunk, stats):
+    """Recept id = a sor pozíciója a nyers CSV-ben + 1 (mintavétel után is stabil)"""
+    chunk['recipeid'] = np.asarray(chunk.index, dtype=np.int64) + 1
+    return chunk
+
+
+def _scaled(chunk, column, maximum):
+    """0-100 skála: a nyers érték, ha a maximum <= 100, különben a maximumra skálázva"""
+    if column is None or maximum is None:
+        return pd.Series(np.nan, index=chunk.index)
+    if maximum > 100:
+        return chunk[column] / maximum * 100
+    return chunk[column]
+
+
+def normalize_scores(chunk, stats):
+    """ESI / HSI / PPI (0-100) a teljes CSV tartományaival + kompozit pontszám
+
+    ESI: invertált env_score (kisebb = jobb környezetileg), azonos min/max esetén 70.
+    Hiányzó nyers oszlop / érték: SCORE_DEFAULTS.
+    """
+    if stats.env_column is not None and stats.env_min is not None and stats.env_max > stats.env_min:
+        esi = 100 - ((chunk[stats.env_column] - stats.env_min) / (stats.env_max - stats.env_min) * 100)
+    else:
+        esi = pd.Series(np.nan, index=chunk.index)
+
+    chunk['ESI'] = esi.fillna(SCORE_DEFAULTS['ESI'])
+    chunk['HSI'] = _scaled(chunk, stats.nutri_column, stats.nutri_max).fillna(SCORE_DEFAULTS['HSI'])
+    chunk['PPI'] = _scaled(chunk, stats.meal_column, stats.meal_max).fillna(SCORE_DEFAULTS['PPI'])
+    chunk['composite_score'] = sum(
+        chunk[name] * weight for name, weight in zip(SCORE_COLUMNS, DEFAULT_WEIGHTS)
+    )
+    return chunk
+
+
+def clean_text(chunk, stats):
+    """Hiányzó szöveg mezők pótlása, szóközök levágása, kategória tisztítás (facet szűrés)"""
+    for name, default in TEXT_DEFAULTS.items():
+        if name in chunk:
+            chunk[name] = chunk[name].fillna(default).astype(str).str.strip()
+        else:
+            chunk[name] = default
+    chunk['category'] = chunk['category'].map(clean_category) if 'category' in chunk else ''
+    return chunk
+
+
+def clean_image_url(value, recipe_id=0):
+    """Első kép URL idézőjelek nélkül, https-sel; érvénytelen / hiányzó érték: tartalék kép"""
+    fallback = FALLBACK_IMAGES[int(recipe_id) % len(FALLBACK_IMAGES)]
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return fallback
+
+    # Vesszővel elválasztott URL lista, idézőjelekkel körülvéve
+    url = str(value).strip().strip('"').strip("'").split(',')[0].strip().strip('"').strip("'")
+    if url.lower() in ('', 'nan', 'null'):
+        return fallback
+    if url.startswith('http://'):
+        return 'https://' + url[len('http://'):]
+    if url.startswith('www.'):
+        return 'https://' + url
+    if url.startswith('http'):
+        return url
+    return fallback
+
+
+def clean_image_urls(chunk, stats):
+    """Kép URL-ek tisztítása (az images oszlop nélkül minden recept tartalék képet kap)"""
+    images = chunk['images'].tolist() if 'images' in chunk else [None] * len(chunk)
+    chunk['images'] = [
+        clean_image_url(value, recipe_id)
+        for value, recipe_id in zip(images, chunk['recipeid'].tolist())
+    ]
+    return chunk
+
+
+def normalize_ingredients(chunk, stats):
+    """Normalizált összetevők a kereséshez / indexeléshez (közös normalizáló)"""
+    chunk['ingredients_clean'] = normalize_series(chunk['ingredients'])
+    return chunk
+
+
+DEFAULT_STAGES = (
+    rename_columns,
+    assign_recipe_ids,
+    normalize_scores,
+    clean_text,
+    clean_image_urls,
+    normalize_ingredients,
+)
+
+
+def sample_rows(path, stats, sample_size, encoding=None, chunksize=CHUNK_SIZE, seed=None):
+    """User study minta sorai: kompozit pontszám kvartilisenként kiegyensúlyozva
+
+    Csak a pontszám oszlopokat olvassa (a kompozit pontszám a globális tartományokkal
+    számolódik). Visszatér: rendezett sor pozíciók a nyers CSV-ben.
+    """
+    composite = np.concatenate([
+        normalize_scores(chunk, stats)['composite_score'].to_numpy(np.float64)
+        for chunk in iter_csv_chunks(path, chunksize, usecols=stats.usecols, encoding=encoding)
+    ])
+    rng, _ = make_rng(seed, context="user study minta")
+
+    # Kvartilis a rang szerint (azonos pontszámoknál is négy egyenlő csoport)
+    ranks = np.empty(len(composite), dtype=np.int64)
+    ranks[np.argsort(composite, kind='stable')] = np.arange(len(composite))
+    quartiles = ranks * 4 // len(composite)
+
+    rows = []
+    for quartile in range(4):
+        members = np.flatnonzero(quartiles == quartile)
+        size = sample_size // 4 + (1 if quartile < sample_size % 4 else 0)
+        rows.append(members if len(members) <= size else rng.choice(members, size, replace=False))
+    return np.sort(np.concatenate(rows))
+
+
+def process_chunks(path, stages=DEFAULT_STAGES, sample_size=None, chunksize=CHUNK_SIZE, seed=None):
+    """Feldolgozott darabok generátora
+
+    sample_size: user study minta mérete (None: minden recept). A nyers CSV egy
+    pontszám menet (+ mintavételnél még egy) után egyszer olvasódik végig.
+    """
+    encoding = detect_encoding(path)
+    if encoding is None:
+        raise ValueError(f"A CSV egyik encoding-gal sem olvasható: {path}")
+
+    stats = scan_scores(path, encoding, chunksize)
+    print(f"📊 {path} ({encoding}): {stats}")
+
+    rows = None
+    if sample_size is not None and stats.n_rows > sample_size:
+        rows = sample_rows(path, stats, sample_size, encoding, chunksize, seed)
+        print(f"🎯 User study minta: {len(rows)} recept (kompozit kvartilisenként)")
+
+    for chunk in iter_csv_chunks(path, chunksize, encoding=encoding):
+        if rows is not None:
+            chunk = chunk.loc[chunk.index.isin(rows)].copy()
+            if chunk.empty:
+                continue
+        for stage in stages:
+            chunk = stage(chunk, stats)
+        yield chunk
+
+
+def catalog_columns(chunk):
+    """Katalógus darab egy feldolgozott darabból: normalizált összetevők + V3 magyarázat részek
+
+    A pareto_layer oszlop itt csak a helyét foglalja el, az értéke a teljes pontszám
+    mátrixból számolódik (CatalogWriter.add_column).
+    """
+    if 'ingredients_clean' in chunk:
+        chunk['ingredients_clean'] = chunk['ingredients_clean'].fillna('')
+    else:
+        chunk['ingredients_clean'] = normalize_series(chunk['ingredients'])
+    chunk['pareto_layer'] = 0
+
+    prefixes, labels = catalog_fragments(chunk)
+    chunk['explanation_prefix'] = prefixes
+    chunk['explanation_labels'] = labels
+    return chunk
+
+
+def as_read_back(chunk):
+    """A darab úgy, ahogy a kiírt CSV-ből visszaolvasva látszik (üres szöveg -> hiányzó érték)
+    - a katalógus így azonos a CSV-ből építettel"""
+    chunk = chunk.copy()
+    for name in chunk.columns:
+        if chunk[name].dtype == object:
+            chunk[name] = chunk[name].where(chunk[name] != '', None)
+    return chunk
+
+
+def preprocess(input_path, output_path, sample_size=None, build_artifact=True,
+               chunksize=CHUNK_SIZE, seed=None):
+    """Nyers CSV -> feldolgozott CSV + katalógus artifact egy menetben
+
+    A CSV ideiglenes fájlba íródik és a végén atomikusan cserélődik (a futó workerek
+    katalógus figyelője csak a kész fájlt látja). Az artifact hiba nem végzetes: a
+    workerek ilyenkor maguk illesztenek. Visszatér: a feldolgozott receptek száma.
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp-{os.getpid()}")
+
+    staging = None
+    writer = None
+    if build_artifact:
+        artifact_root().mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=".catalog-", dir=artifact_root()))
+        writer = CatalogWriter(staging)
+
+    n_recipes = 0
+    try:
+        for chunk in process_chunks(input_path, sample_size=sample_size, chunksize=chunksize, seed=seed):
+            # A CSV float64 értékekkel íródik, a float32 csak az artifact belső formája
+            chunk.to_csv(tmp_path, mode='a' if n_recipes else 'w', header=not n_recipes,
+                         index=False, encoding='utf-8')
+            if writer is not None:
+                writer.append(catalog_columns(as_read_back(chunk)))
+            n_recipes += len(chunk)
+            print(f"   📦 {n_recipes} recept feldolgozva")
+
+        if not n_recipes:
+            raise ValueError(f"Nincs feldolgozható recept: {input_path}")
+        os.replace(tmp_path, output_path)
+        print(f"💾 Feldolgozott CSV: {output_path} ({n_recipes} recept, "
+              f"{output_path.stat().st_size / 1024:.1f} KB)")
+
+        if writer is not None:
+            try:
+                from user_study.hybrid_recommender import HybridRecipeRecommender
+
+                recommender = HybridRecipeRecommender(str(output_path), catalog_writer=writer)
+                print(f"📦 Katalógus artifact: {recommender.artifact_dir}")
+            except Exception as e:
+                print(f"⚠️ Katalógus artifact építési hiba: {e}")
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        if staging is not None:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    return n_recipes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recept CSV előfeldolgozás (streamelt)")
+    parser.add_argument('input', nargs='?', default="hungarian_recipes_github.csv")
+    parser.add_argument('output', nargs='?', default="data/processed_recipes.csv")
+    parser.add_argument('--sample', type=int, default=None,
+                        help="user study minta mérete (alapból minden recept)")
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--no-artifact', action='store_true', help="csak a CSV készül el")
+    args = parser.parse_args()
+
+    if not Path(args.input).exists():
+        print(f"❌ CSV nem található: {args.input}")
+        return False
+    preprocess(args.input, args.output, sample_size=args.sample,
+               build_artifact=not args.no_artifact, chunksize=args.chunksize)
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
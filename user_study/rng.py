@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Kérésenkénti véletlenszám-generátorok
+A globális random / NumPy állapot újraseedelése helyett minden kérés saját
+numpy Generator-t kap, egy folyamatszintű SeedSequence-ből származtatott seed-del
+(szálbiztos, nincs globális állapot). RNG_LOG_SEEDS=1 esetén a seed naplózódik,
+így egy résztvevő oldala reprodukálható; RNG_ROOT_SEED rögzíti a teljes sorozatot
+(benchmark, tesztelés).
+"""
+
+import os
+import threading
+
+import numpy as np
+
+_lock = threading.Lock()
+_root = None
+_root_pid = None
+
+
+def _log_seeds():
+    return os.environ.get('RNG_LOG_SEEDS', '').strip().lower() in ('1', 'true', 'yes')
+
+
+def new_seed():
+    """Új 64 bites seed a folyamat SeedSequence-éből (fork után új gyökér)"""
+    global _root, _root_pid
+    with _lock:
+        if _root is None or _root_pid != os.getpid():
+            root_seed = os.environ.get('RNG_ROOT_SEED')
+            _root = np.random.SeedSequence(int(root_seed) if root_seed else None)
+            _root_pid = os.getpid()
+        child = _root.spawn(1)[0]
+    return int(child.generate_state(1, np.uint64)[0])
+
+
+def make_rng(seed=None, context=""):
+    """(Generator, seed) - seed=None esetén új seed, megadott seed-del reprodukálható"""
+    if seed is None:
+        seed = new_seed()
+    if _log_seeds():
+        print(f"🎲 RNG seed{f' ({context})' if context else ''}: {seed}")
+    return np.random.default_rng(seed), seed
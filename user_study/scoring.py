@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Súlyprofil alapú pontozás
+A pontszám egyetlen mátrix-vektor szorzat az előre összerakott float32 [ESI, HSI, PPI]
+mátrixon. Az alap profil (40/40/20) minden felhasználónál ugyanaz; a személyre szabott
+profil (PERSONALIZED_SCORING=1) a fenntarthatósági érzékenységből származik, kvantálva,
+így a top pool-ok profilonként cache-elhetők.
+"""
+
+import os
+
+import numpy as np
+
+SCORE_COLUMNS = ('ESI', 'HSI', 'PPI')
+
+# 40% környezeti + 40% egészség + 20% népszerűség
+DEFAULT_WEIGHTS = (0.4, 0.4, 0.2)
+
+# Keresési relevancia súlya a végső pontszámban
+SEARCH_BOOST_WEIGHT = 0.1
+
+# Súlyok kvantálási lépése (kevés különböző profil -> jó cache találati arány)
+WEIGHT_STEP = 0.05
+
+# Fenntarthatósági érzékenység (1-5 skála) egy pontjának hatása a környezeti súlyra
+AWARENESS_STEP = 0.1
+NEUTRAL_AWARENESS = 3
+
+
+def personalization_enabled():
+    """Személyre szabott súlyok (PERSONALIZED_SCORING=1) - alapból mindenki a 40/40/20 profilt kapja"""
+    return os.environ.get('PERSONALIZED_SCORING', '').strip().lower() in ('1', 'true', 'yes')
+
+
+def quantize_weights(weights):
+    """Súlyok WEIGHT_STEP rácsra kerekítve, 1-re normálva (hashelhető tuple)"""
+    steps = np.maximum(np.round(np.asarray(weights, dtype=np.float64) / WEIGHT_STEP), 0)
+    if steps.sum() == 0:
+        return DEFAULT_WEIGHTS
+    # A kerekítési maradék a legnagyobb súlyhoz kerül, így a rács pontos marad
+    total = int(round(1 / WEIGHT_STEP))
+    steps[int(np.argmax(steps))] += total - steps.sum()
+    return tuple(round(float(step) * WEIGHT_STEP, 2) for step in steps)
+
+
+def weights_from_preferences(preferences):
+    """Súlyprofil a felhasználói preferenciákból
+
+    A fenntarthatósági érzékenység (1-5) pontonként 10%-kal tolja a környezeti súlyt;
+    a maradék az egészség és a népszerűség között az alap 2:1 arányban oszlik meg.
+    Semleges (3) érzékenységnél az alap profil.
+    """
+    if not preferences or not personalization_enabled():
+        return DEFAULT_WEIGHTS
+
+    try:
+        awareness = int(preferences.get('sustainability_awareness', NEUTRAL_AWARENESS))
+    except (TypeError, ValueError):
+        return DEFAULT_WEIGHTS
+    awareness = min(max(awareness, 1), 5)
+
+    env_weight = DEFAULT_WEIGHTS[0] + (awareness - NEUTRAL_AWARENESS) * AWARENESS_STEP
+    rest = 1 - env_weight
+    rest_total = DEFAULT_WEIGHTS[1] + DEFAULT_WEIGHTS[2]
+    return quantize_weights((
+        env_weight,
+        rest * DEFAULT_WEIGHTS[1] / rest_total,
+        rest * DEFAULT_WEIGHTS[2] / rest_total
+    ))
+
+
+class ScoringEngine:
+    """Receptenkénti [ESI, HSI, PPI] float32 mátrix + profilonkénti pontszám cache
+
+    Szerkesztéskor (update) csak a változott sorok íródnak a mátrixba és minden cache-elt
+    profilba; a tárolók kapacitása geometrikusan nő, így az új receptek hozzáfűzése
+    amortizáltan a változott sorok számával arányos.
+    """
+
+    def __init__(self, score_matrix, excluded=None, max_profiles=8):
+        self._matrix = np.array(score_matrix, dtype=np.float32, order='C')
+        self._excluded = np.zeros(len(self._matrix), dtype=bool)
+        if excluded is not None:
+            self._excluded[:len(excluded)] = excluded
+        self.n_rows = len(self._matrix)
+        self.max_profiles = max_profiles
+        self._profiles = {}
+
+    @classmethod
+    def from_catalog(cls, catalog, excluded=None):
+        return cls(
+            np.column_stack([catalog.values(name) for name in SCORE_COLUMNS]),
+            excluded=excluded
+        )
+
+    @property
+    def score_matrix(self):
+        return self._matrix[:self.n_rows]
+
+    @property
+    def excluded(self):
+        """Kizárt sorok (pl. törölt receptek): soha nem kerülnek poolba"""
+        return self._excluded[:self.n_rows]
+
+    def scores(self, weights, indices=None):
+        """Pontszám a megadott sorokra (None: az egész katalógus) - egy mátrix-vektor szorzat"""
+        matrix = self.score_matrix if indices is None else self.score_matrix[indices]
+        return matrix @ np.asarray(weights, dtype=np.float32)
+
+    def profile_scores(self, weights):
+        """Teljes pontszám vektor egy profilra (csak olvasható, kizárt sorok -inf), cache-elve"""
+        profile = self._profiles.get(weights)
+        if profile is None:
+            profile = self._matrix @ np.asarray(weights, dtype=np.float32)
+            profile[self._excluded] = -np.inf
+
+            if len(self._profiles) >= self.max_profiles:
+                self._profiles.pop(next(iter(self._profiles)))
+            self._profiles[weights] = profile
+
+        scores = profile[:self.n_rows]
+        scores.flags.writeable = False
+        return scores
+
+    def _reserve(self, n_rows):
+        """Tárolók bővítése legalább n_rows sorra (duplázással)"""
+        capacity = len(self._matrix)
+        if n_rows <= capacity:
+            return
+        capacity = max(n_rows, 2 * capacity)
+
+        def grown(values, fill):
+            result = np.full((capacity,) + values.shape[1:], fill, dtype=values.dtype)
+            result[:len(values)] = values
+            return result
+
+        self._matrix = grown(self._matrix, 0)
+        self._excluded = grown(self._excluded, True)
+        self._profiles = {weights: grown(profile, -np.inf) for weights, profile in self._profiles.items()}
+
+    def update(self, n_rows, rows, points, excluded_rows=()):
+        """Inkrementális frissítés: új sorszám, a rows sorok új pontszámai, újonnan kizárt sorok
+
+        Visszatér: a változott sorok (új / eltérő pontszám, kizárt, vagy a rövidülés miatt
+        kiesett) - ezek alapján foltozhatók a pontszámra épülő cache-ek.
+        """
+        old_rows = self.n_rows
+        self._reserve(n_rows)
+        rows = np.asarray(rows, dtype=np.intp)
+        points = np.asarray(points, dtype=np.float32).reshape(len(rows), len(SCORE_COLUMNS))
+        excluded_rows = np.asarray(excluded_rows, dtype=np.intp)
+
+        differs = (rows >= old_rows) | self._excluded[rows] | np.any(self._matrix[rows] != points, axis=1)
+        self._matrix[rows] = points
+        self._excluded[rows] = False
+        self._excluded[excluded_rows] = True
+        for weights, profile in self._profiles.items():
+            profile[rows] = points @ np.asarray(weights, dtype=np.float32)
+            profile[excluded_rows] = -np.inf
+
+        # A rövidülés után kieső sorok kizártak (egy későbbi hozzáfűzés felülírja őket)
+        dropped = np.arange(n_rows, old_rows)
+        self._excluded[dropped] = True
+        for profile in self._profiles.values():
+            profile[dropped] = -np.inf
+        self.n_rows = n_rows
+
+        return np.union1d(np.union1d(rows[differs], excluded_rows), dropped)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Recept-recept hasonlósági gráf (top-N szomszéd lista)
+A TF-IDF koszinusz hasonlóság build időben, darabokban számolódik (ritka mátrixszorzás
++ soronkénti részleges rendezés, a darabok egy process pool-on párhuzamosan), és kompakt
+int32 / float16 tömbökként kerül az artifactba. Kéréskor egy recept szomszédai O(1)
+kikeresés, k recept páronkénti hasonlósága O(k² · N) tömbművelet, nincs
+cosine_similarity hívás.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+# Receptenként tárolt szomszédok száma
+DEFAULT_NEIGHBORS = 20
+
+# Ennél kisebb katalógusnál nem éri meg folyamatokat indítani
+PARALLEL_MIN_RECIPES = 20_000
+
+# A worker folyamatok a mátrixot az inicializáláskor kapják meg (fork alatt másolás nélkül)
+_worker_state = {}
+
+
+def similarity_workers():
+    """Párhuzamos folyamatok száma (SIMILARITY_WORKERS env, alapból a CPU-k száma)"""
+    return max(1, int(os.environ.get('SIMILARITY_WORKERS', os.cpu_count() or 1)))
+
+
+def _init_worker(matrix, transposed, n_neighbors):
+    _worker_state.update(matrix=matrix, transposed=transposed, n_neighbors=n_neighbors)
+
+
+def _chunk_top_n(bounds):
+    """Egy sor-tartomány szomszéd listái a worker állapotából"""
+    start, end = bounds
+    similarity = (_worker_state['matrix'][start:end] @ _worker_state['transposed']).tocsr()
+    return _row_top_n(similarity, start, _worker_state['n_neighbors'])
+
+
+def _row_top_n(similarity, row_offset, n_neighbors):
+    """Egy CSR blokk soronkénti top-N szomszédja (önmaga nélkül, azonos pontszámnál kisebb index)"""
+    n_rows = similarity.shape[0]
+    neighbors = np.full((n_rows, n_neighbors), -1, dtype=np.int32)
+    scores = np.zeros((n_rows, n_neighbors), dtype=np.float16)
+
+    for row in range(n_rows):
+        start, end = similarity.indptr[row], similarity.indptr[row + 1]
+        columns = similarity.indices[start:end]
+        values = similarity.data[start:end]
+        keep = (columns != row_offset + row) & (values > 0)
+        columns, values = columns[keep], values[keep]
+
+        k = min(n_neighbors, len(values))
+        if k == 0:
+            continue
+        top = np.argpartition(-values, k - 1)[:k]
+        top = top[np.lexsort((columns[top], -values[top]))]
+        neighbors[row, :k] = columns[top]
+        scores[row, :k] = values[top]
+
+    return neighbors, scores
+
+
+class SimilarityGraph:
+    """Receptenként a top-N leghasonlóbb recept (index, koszinusz); -1 = nincs több szomszéd"""
+
+    def __init__(self, neighbors, scores):
+        self.neighbors = neighbors  # int32, n × N
+        self.scores = scores        # float16, n × N, csökkenő sorrend
+        self.n_recipes, self.n_neighbors = neighbors.shape
+
+    @classmethod
+    def from_matrix(cls, tfidf_matrix, n_neighbors=DEFAULT_NEIGHBORS, chunk_size=1024, workers=None):
+        """Építés az (L2 normált) TF-IDF mátrixból, chunk_size soronként
+
+        workers: folyamatok száma (None: SIMILARITY_WORKERS / CPU-k száma; kis katalógusnál 1)
+        """
+        matrix = sparse.csr_matrix(tfidf_matrix, dtype=np.float32)
+        transposed = matrix.T.tocsc()
+        n_recipes = matrix.shape[0]
+        chunks = [(start, min(start + chunk_size, n_recipes)) for start in range(0, n_recipes, chunk_size)]
+
+        if workers is None:
+            workers = similarity_workers() if n_recipes >= PARALLEL_MIN_RECIPES else 1
+        workers = min(workers, len(chunks))
+
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(matrix, transposed, n_neighbors)) as pool:
+                blocks = list(pool.map(_chunk_top_n, chunks))
+        else:
+            _init_worker(matrix, transposed, n_neighbors)
+            try:
+                blocks = [_chunk_top_n(bounds) for bounds in chunks]
+            finally:
+                _worker_state.clear()
+
+        if not blocks:
+            return cls(np.empty((0, n_neighbors), dtype=np.int32), np.empty((0, n_neighbors), dtype=np.float16))
+        return cls(
+            np.concatenate([neighbors for neighbors, _ in blocks]),
+            np.concatenate([scores for _, scores in blocks])
+        )
+
+    def save(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / "neighbors.npy", self.neighbors)
+        np.save(directory / "scores.npy", self.scores)
+
+    @classmethod
+    def open(cls, directory):
+        directory = Path(directory)
+        return cls(
+            np.load(directory / "neighbors.npy", mmap_mode='r'),
+            np.load(directory / "scores.npy", mmap_mode='r')
+        )
+
+    def neighbors_of(self, index):
+        """Egy recept szomszédai: (indexek, hasonlóságok), csökkenő sorrendben"""
+        if index >= self.n_recipes:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        neighbors = np.asarray(self.neighbors[index])
+        present = neighbors >= 0
+        return neighbors[present], np.asarray(self.scores[index], dtype=np.float32)[present]
+
+    def pair_similarities(self, indices):
+        """k × k szimmetrikus hasonlósági mátrix a szomszéd listákból (ami nincs a listán: 0)
+
+        A gráfon kívüli (pl. inkrementálisan hozzáadott) receptek hasonlósága 0.
+        """
+        indices = np.asarray(indices, dtype=np.intp)
+        in_graph = indices < self.n_recipes
+        rows = np.full((len(indices), self.n_neighbors), -1, dtype=np.int64)
+        row_scores = np.zeros((len(indices), self.n_neighbors), dtype=np.float32)
+        rows[in_graph] = self.neighbors[indices[in_graph]]
+        row_scores[in_graph] = self.scores[indices[in_graph]]
+
+        # matches[a, slot, b]: az a. recept slot. szomszédja a b. recept
+        matches = rows[:, :, None] == indices[None, None, :]
+        similarity = np.max(np.where(matches, row_scores[:, :, None], 0), axis=1)
+        return np.maximum(similarity, similarity.T)
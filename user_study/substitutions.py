@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Fenntartható összetevő csere javaslatok ("X helyett Y: kb. +N ESI pont, becslés")
+Build időben a recept × összetevő incidenciából összetevő × összetevő együttes
+előfordulási mátrix, ebből PPMI kontextus vektorok készülnek: két összetevő akkor
+helyettesítheti egymást, ha hasonló összetevők mellett fordulnak elő (koszinusz, a
+SimilarityGraph darabolt top-N számolásával), de egymás mellett ritkán (a gyakran
+együtt előforduló párok kiegészítik, nem helyettesítik egymást). Csak azonos szerepű
+összetevők cserélhetők (pl. hús -> hüvelyes, sajt -> túró); az alapanyagok, folyadékok és
+fűszerek (só, víz, olaj, liszt, babérlevél, ...) sem forrás, sem cél nem lehetnek. Az
+összetevők környezeti hatása az env_score ridge regressziójából becsült érték (ESI pontban). Az összetevőnkénti
+jelölt listák és a receptenkénti legjobb csere kompakt tömbökként az artifactba
+kerülnek; kéréskor minden kikeresés O(1).
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import lsqr
+
+from user_study.catalog import widen_floats
+from user_study.catalog_delta import ENV_SCORE_COLUMNS
+from user_study.similarity_graph import SimilarityGraph
+
+# Ennél ritkább összetevő sem forrás, sem cél nem lehet (zajos statisztika)
+MIN_DOC_FREQ = 5
+
+# Összetevőnként vizsgált kontextus szomszédok / tárolt csere jelöltek
+CONTEXT_NEIGHBORS = 50
+SUBSTITUTE_CANDIDATES = 5
+
+# Egy csere legalább ennyire hasonló kontextusú és legalább ennyi ESI pontot javít
+MIN_CONTEXT_SIMILARITY = 0.2
+MIN_ESI_GAIN = 1.0
+
+# Ennél gyakrabban együtt előforduló párok (PMI > log 2: a véletlen kétszerese) kiegészítők
+MAX_PAIR_PMI = float(np.log(2))
+
+# Ridge regresszió csillapítása (a ritka összetevők hatása 0 felé húzódik)
+RIDGE_DAMPING = 3.0
+
+# Összetevő szerepek a normalizált név fejszava alapján (az első illeszkedő sor dönt; egy
+# szerep több sorban is szerepelhet, ha egy szűkebb tőnek meg kell előznie egy másikat).
+# A STAPLE szerep (alapanyag, folyadék, fűszer) és a felismeretlen összetevők nem cserélhetők.
+STAPLE = 'staple'
+STAPLE_WORDS = frozenset({
+    'so', 'bors', 'viz', 'jeg', 'liszt', 'cukor', 'vaj', 'margarin', 'zsir', 'olaj', 'ecet', 'mez',
+    'bor', 'sor', 'le', 'tej', 'tejszin', 'tea', 'szosz', 'eleszto', 'zselatin', 'kemenyito',
+    'pehely', 'pehelo',
+})
+STAPLE_SUFFIXES = ('por', 'kivonat', 'aroma', 'bor', 'szirup', 'szarup')
+# Fűszer módosítók (őrölt, szárított) - a név többi részétől függetlenül fűszer
+SEASONING_MODIFIERS = ('rolt', 'szaritott', 'szară')
+# A fejszó után álló leíró szavak (darálva, darabok, levelek, gerezdek, ...)
+TRAILING_WORDS = frozenset({
+    'daralva', 'daralek', 'darabok', 'kocka', 'kockak', 'file', 'filek', 'szelotek', 'levelok',
+    'gerezd', 'gerezdek', 'szar', 'szarak', 'rozsa', 'fel',
+})
+INGREDIENT_ROLES = (
+    (STAPLE, (
+        'olaj', 'cukor', 'liszt', 'alaple', 'leves', 'szosz', 'ecet', 'bikarbona', 'mustar', 'ketchup',
+        'majonez', 'salsa', 'citrom', 'lime', 'fokhagyma', 'chili', 'csili', 'cayenne', 'petrezsel',
+        'bazsalikom', 'oregano', 'kakukk', 'koriander', 'baberlevel', 'rozmaring', 'zsalya', 'kapor',
+        'menta', 'tarkony', 'majoranna', 'komeny', 'fahej', 'szerecsen', 'szarecsen', 'gyomber',
+        'szegf', 'vanil', 'vană', 'kurkuma', 'curry', 'fuszer', 'halasz', 'paprikapehel', 'zellermag',
+        'borsoszem', 'kardamom', 'kokusztej', 'konyak', 'sherry',
+    )),
+    ('starch', (
+        'rizs', 'teszta', 'spagetti', 'makaroni', 'kenyer', 'zsemle', 'tortilla', 'zab', 'kuskusz',
+        'kuszkusz', 'bulgur', 'quinoa', 'kinoa', 'burgonya', 'krumpli', 'polenta', 'arpa', 'buzadara',
+    )),
+    ('vegetable', ('zoldbab', 'vajbab')),
+    ('protein', (
+        'hus', 'marha', 'sertes', 'csirke', 'pulyka', 'kacsa', 'liba', 'barany', 'borju', 'sonka',
+        'szalonna', 'bacon', 'kolbasz', 'virsli', 'szalami', 'comb', 'steak', 'hamburger', 'hal',
+        'lazac', 'ponty', 'harcsa', 'pisztrang', 'szardin', 'garnel', 'kagylo', 'bab', 'lencse',
+        'csicseri', 'tofu', 'tempeh',
+    )),
+    ('egg', ('tojas',)),
+    ('dairy', (
+        'sajt', 'turo', 'joghurt', 'tejfol', 'kefir', 'mozzarel', 'ricotta', 'parmezan', 'feta',
+        'mascarpone',
+    )),
+    ('vegetable', (
+        'hagyma', 'paprika', 'paradicsom', 'repa', 'zeller', 'cukkini', 'padlizsan', 'spenot',
+        'kaposzta', 'gomba', 'brokkoli', 'karfiol', 'kukorica', 'uborka', 'salata', 'sparga',
+        'tok', 'retek', 'cekla', 'kelbimbo', 'karalabe', 'csicsoka', 'borso', 'olivabogyo', 'avokado',
+    )),
+    ('fruit', (
+        'alma', 'banan', 'narancs', 'eper', 'malna', 'afonya', 'mazsola', 'ananasz', 'barack',
+        'korte', 'szilva', 'meggy', 'cseresznye', 'szolo', 'mango', 'datolya',
+    )),
+    ('nut', ('dio', 'mandula', 'mogyoro', 'kesu', 'pisztacia', 'mak', 'szezam', 'napraforgo')),
+)
+
+
+def swap_tips_enabled():
+    """Csere tipp a v3 magyarázat végén (SWAP_TIPS=1) - alapból kikapcsolt, a v3 kar változatlan"""
+    return os.environ.get('SWAP_TIPS', '').strip().lower() in ('1', 'true', 'yes')
+
+
+def ingredient_role(term):
+    """Normalizált összetevő név szerepe (protein, dairy, vegetable, ...), STAPLE vagy None
+
+    A fejszó (az utolsó, nem leíró szó) dönt; a fűszer módosítók (őrölt, szárított) bárhol.
+    """
+    words = term.split()
+    while len(words) > 1 and words[-1] in TRAILING_WORDS:
+        words.pop()
+    if not words:
+        return None
+    head = words[-1]
+    if (head in STAPLE_WORDS or head.endswith(STAPLE_SUFFIXES)
+            or any(word.startswith(SEASONING_MODIFIERS) for word in words)):
+        return STAPLE
+    for role, stems in INGREDIENT_ROLES:
+        if any(stem in head for stem in stems):
+            return role
+    return None
+
+
+def role_groups(vocabulary):
+    """Összetevőnként a szerep kódja (-1: alapanyag / folyadék / fűszer / felismeretlen)"""
+    codes = {}
+    for role, _ in INGREDIENT_ROLES:
+        if role != STAPLE:
+            codes.setdefault(role, len(codes))
+    return np.array([codes.get(ingredient_role(term), -1) for term in vocabulary], dtype=np.int8)
+
+
+def ppmi_matrix(incidence):
+    """Pozitív pontonkénti kölcsönös információ (PPMI) az összetevő párok együttes előfordulásából"""
+    presence = sparse.csr_matrix(incidence, dtype=np.float32, copy=True)
+    presence.data[:] = 1
+    n_recipes = presence.shape[0]
+    doc_freq = np.asarray(presence.sum(axis=0)).ravel()
+
+    cooccurrence = (presence.T @ presence).tocoo()
+    off_diagonal = cooccurrence.row != cooccurrence.col
+    rows, cols = cooccurrence.row[off_diagonal], cooccurrence.col[off_diagonal]
+    counts = cooccurrence.data[off_diagonal].astype(np.float64)
+
+    pmi = np.log(counts * n_recipes / (doc_freq[rows] * doc_freq[cols]))
+    positive = pmi > 0
+    return sparse.csr_matrix(
+        (pmi[positive].astype(np.float32), (rows[positive], cols[positive])),
+        shape=cooccurrence.shape
+    )
+
+
+def esi_effects(incidence, env_scores, env_range):
+    """Összetevőnkénti becsült ESI hatás (pont): ridge regresszió env_score ~ incidencia
+
+    Az ESI az env_score fordítottja (100 - min-max normalizált), így a hatás előjele is fordul.
+    """
+    presence = sparse.csr_matrix(incidence, dtype=np.float64, copy=True)
+    presence.data[:] = 1
+    env_scores = np.asarray(env_scores, dtype=np.float64)
+    known = ~np.isnan(env_scores)
+    if not known.any():
+        return np.zeros(presence.shape[1], dtype=np.float32)
+
+    coefficients = lsqr(
+        presence[np.flatnonzero(known)], env_scores[known] - env_scores[known].mean(),
+        damp=RIDGE_DAMPING
+    )[0]
+    env_min, env_max = env_range
+    scale = 100 / (env_max - env_min) if env_max > env_min else 0.0
+    return (-coefficients * scale).astype(np.float32)
+
+
+def _catalog_env(catalog):
+    """(env_score értékek, tartomány) a katalógusból; env oszlop nélkül az ESI-ből"""
+    names = catalog.column_names
+    env_column = next((name for name in ENV_SCORE_COLUMNS if name in names), None)
+    if env_column is not None:
+        env = catalog.values(env_column).astype(np.float64)
+    else:
+        env = 100 - catalog.values('ESI').astype(np.float64)
+    finite = env[~np.isnan(env)]
+    env_range = (float(finite.min()), float(finite.max())) if len(finite) else (0.0, 0.0)
+    return env, env_range
+
+
+class SubstitutionIndex:
+    """Összetevőnként a top csere jelöltek + receptenként a legjobb csere
+
+    substitutes: int32, összetevők × K (-1 = nincs több jelölt), a kontextus hasonlóság szerint
+    similarity / gain: float16, a jelöltek kontextus hasonlósága és ESI javulása
+    recipe_swaps: int32, receptek × 2 (forrás, cél összetevő; -1 = nincs javaslat)
+    recipe_gain: float16, a recept legjobb cseréjének ESI javulása
+    """
+
+    def __init__(self, vocabulary, effects, substitutes, similarity, gain, recipe_swaps, recipe_gain):
+        self.vocabulary = vocabulary
+        self.effects = effects
+        self.substitutes = substitutes
+        self.similarity = similarity
+        self.gain = gain
+        self.recipe_swaps = recipe_swaps
+        self.recipe_gain = recipe_gain
+        self.n_recipes = len(recipe_gain)
+
+    @classmethod
+    def build(cls, ingredient_index, catalog, n_candidates=SUBSTITUTE_CANDIDATES):
+        """Építés az összetevő indexből és a katalógus env_score oszlopából"""
+        incidence = ingredient_index.incidence
+        env, env_range = _catalog_env(catalog)
+        effects = esi_effects(incidence, env, env_range)
+
+        # Csak a gyakori összetevők kontextus vektorai (a ritkák sorai üresek -> nincs szomszéd)
+        ppmi = ppmi_matrix(incidence)
+        eligible = ingredient_index.doc_freq >= MIN_DOC_FREQ
+        context = sparse.diags(eligible.astype(np.float32)) @ ppmi
+        norms = np.sqrt(np.asarray(context.multiply(context).sum(axis=1)).ravel())
+        context = sparse.diags(np.divide(1, norms, out=np.zeros_like(norms), where=norms > 0)) @ context
+        graph = SimilarityGraph.from_matrix(context, n_neighbors=CONTEXT_NEIGHBORS)
+
+        # Jelöltek: azonos szerep + hasonló kontextus + legalább MIN_ESI_GAIN javulás,
+        # hasonlóság szerinti sorrendben
+        groups = role_groups(ingredient_index.vocabulary)
+        neighbors = np.asarray(graph.neighbors, dtype=np.int64)
+        neighbor_similarity = np.asarray(graph.scores, dtype=np.float32)
+        neighbor_gain = np.where(neighbors >= 0, effects[neighbors] - effects[:, None], -np.inf)
+        complements = np.asarray(
+            ppmi[np.arange(len(neighbors))[:, None], np.maximum(neighbors, 0)].todense()
+        ) > MAX_PAIR_PMI
+        compatible = (groups[:, None] >= 0) & (groups[np.maximum(neighbors, 0)] == groups[:, None])
+        valid = (
+            (neighbors >= 0) & ~complements & compatible &
+            (neighbor_similarity >= MIN_CONTEXT_SIMILARITY) & (neighbor_gain >= MIN_ESI_GAIN)
+        )
+        order = np.argsort(~valid, axis=1, kind='stable')[:, :n_candidates]
+
+        substitutes = np.where(
+            np.take_along_axis(valid, order, axis=1), np.take_along_axis(neighbors, order, axis=1), -1
+        ).astype(np.int32)
+        present = substitutes >= 0
+        similarity = np.where(present, np.take_along_axis(neighbor_similarity, order, axis=1), 0).astype(np.float16)
+        gain = np.where(present, np.take_along_axis(neighbor_gain, order, axis=1), 0).astype(np.float16)
+
+        index = cls(list(ingredient_index.vocabulary), effects, substitutes, similarity, gain,
+                    np.empty((0, 2), dtype=np.int32), np.empty(0, dtype=np.float16))
+        index.recipe_swaps, index.recipe_gain = index._recipe_swaps(sparse.csr_matrix(incidence))
+        index.n_recipes = len(index.recipe_gain)
+        return index
+
+    def _recipe_swaps(self, incidence):
+        """Receptenként a legjobb csere: kontextus hasonlóság × ESI javulás maximuma
+
+        A cél nem lehet már a receptben. Egyetlen vektorizált menet: minden (recept,
+        összetevő, jelölt) hármas, majd receptenkénti maximum.
+        """
+        n_recipes, n_terms = incidence.shape
+        n_candidates = self.substitutes.shape[1]
+        recipes = np.repeat(np.arange(n_recipes, dtype=np.int64), np.diff(incidence.indptr))
+        sources = incidence.indices.astype(np.int64)
+
+        triple_recipes = np.repeat(recipes, n_candidates)
+        triple_sources = np.repeat(sources, n_candidates)
+        targets = self.substitutes[sources].ravel().astype(np.int64)
+        gains = self.gain[sources].ravel().astype(np.float32)
+        merits = gains * self.similarity[sources].ravel().astype(np.float32)
+
+        already_in_recipe = np.isin(triple_recipes * n_terms + targets, recipes * n_terms + sources)
+        valid = (targets >= 0) & ~already_in_recipe
+
+        recipe_swaps = np.full((n_recipes, 2), -1, dtype=np.int32)
+        recipe_gain = np.zeros(n_recipes, dtype=np.float16)
+        if valid.any():
+            triple_recipes, triple_sources = triple_recipes[valid], triple_sources[valid]
+            targets, gains, merits = targets[valid], gains[valid], merits[valid]
+            # Receptenként a legjobb csere (azonosnál a kisebb forrás / cél id)
+            order = np.lexsort((targets, triple_sources, -merits, triple_recipes))
+            first = order[np.r_[True, np.diff(triple_recipes[order]) != 0]]
+            recipe_swaps[triple_recipes[first]] = np.column_stack((triple_sources[first], targets[first]))
+            recipe_gain[triple_recipes[first]] = gains[first]
+        return recipe_swaps, recipe_gain
+
+    def save(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in ('effects', 'substitutes', 'similarity', 'gain', 'recipe_swaps', 'recipe_gain'):
+            np.save(directory / f"{name}.npy", getattr(self, name))
+        with open(directory / "vocabulary.json", 'w', encoding='utf-8') as f:
+            json.dump(self.vocabulary, f, ensure_ascii=False)
+
+    @classmethod
+    def open(cls, directory):
+        directory = Path(directory)
+        with open(directory / "vocabulary.json", encoding='utf-8') as f:
+            vocabulary = json.load(f)
+        return cls(vocabulary, *[
+            np.load(directory / f"{name}.npy", mmap_mode='r')
+            for name in ('effects', 'substitutes', 'similarity', 'gain', 'recipe_swaps', 'recipe_gain')
+        ])
+
+    def substitutes_for(self, ingredient_id):
+        """Egy összetevő csere jelöltjei: [(összetevő, hasonlóság, ESI javulás), ...]"""
+        if ingredient_id is None or ingredient_id >= len(self.substitutes):
+            return []
+        return [
+            (self.vocabulary[target], float(similarity), float(gain))
+            for target, similarity, gain in zip(
+                self.substitutes[ingredient_id].tolist(),
+                widen_floats(self.similarity[ingredient_id]).tolist(),
+                widen_floats(self.gain[ingredient_id]).tolist()
+            )
+            if target >= 0
+        ]
+
+    def recipe_swap(self, row):
+        """Egy alap recept legjobb cseréje: (forrás, cél, ESI javulás) vagy None"""
+        source, target = self.recipe_swaps[row].tolist()
+        if source < 0:
+            return None
+        return self.vocabulary[source], self.vocabulary[target], float(widen_floats(self.recipe_gain[row]))
+
+    def best_swap(self, ingredient_ids):
+        """Legjobb csere egy tetszőleges összetevő listára (az artifact utáni delta recepteknek)
+
+        Legfeljebb len(ingredient_ids) × K kikeresés; a szótáron kívüli id-k kimaradnak.
+        """
+        ids = sorted(i for i in ingredient_ids if i < len(self.substitutes))
+        present = set(ingredient_ids)
+        best, best_merit = None, None
+        for source in ids:
+            for target, similarity, gain in zip(
+                self.substitutes[source].tolist(), self.similarity[source].tolist(), self.gain[source].tolist()
+            ):
+                merit = np.float32(gain) * np.float32(similarity)
+                if target >= 0 and target not in present and (best_merit is None or merit > best_merit):
+                    best, best_merit = (
+                    self.vocabulary[source], self.vocabulary[target], float(widen_floats(self.gain.dtype.type(gain)))
+                ), merit
+        return best
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+BM25F szabad szöveges index a recept címekre és elkészítési útmutatókra
+A mezők (title, instructions) ugyanazzal a magyar normalizálóval tokenizálódnak,
+mezőnkénti súllyal és hossz normalizálással (BM25F). A (recept, kifejezés) párok
+BM25 hozzájárulása a lekérdezéstől független, ezért build időben előre számolódik:
+a lekérdezés csak a kifejezések posting listáit összegzi (TfidfPostings, MaxScore),
+a szövegek soha nem olvasódnak végig. Az építés blokkonként halad (a katalógus
+szövegei nem dekódolódnak egyszerre).
+
+A magyar toldalékok és összetett szavak miatt ("gulyás" -> "gulyást", "gulyásleves")
+a lekérdezés szavai prefixként is illeszkednek a rendezett szótárra (bisect).
+"""
+
+import bisect
+import json
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from user_study.text_normalizer import normalize_series, normalize_text
+from user_study.tfidf_index import LayeredTfidfPostings, TfidfPostings
+
+# Indexelt mezők és súlyuk (egy címbeli előfordulás háromszor annyit ér)
+FIELD_WEIGHTS = {'title': 3.0, 'instructions': 1.0}
+
+# BM25 paraméterek: kifejezés gyakoriság telítődése / hossz normalizálás erőssége
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Legalább két karakteres szavak a normalizált szövegben
+TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+_TOKEN_RE = re.compile(TOKEN_PATTERN)
+
+# Prefix illesztés: legalább ilyen hosszú szóra, a leggyakoribb folytatásokra, fél súllyal
+PREFIX_MIN_LENGTH = 4
+PREFIX_EXPANSIONS = 20
+PREFIX_WEIGHT = 0.5
+
+
+def text_fusion_weight():
+    """A BM25 relevancia súlya az összetevő egyezéssel összevont keresésben (TEXT_FUSION_WEIGHT)"""
+    return min(max(float(os.environ.get('TEXT_FUSION_WEIGHT', 0.5)), 0.0), 1.0)
+
+
+def catalog_fields(catalog, start=0, stop=None):
+    """A katalógus (egy sor tartományának) normalizált cím és útmutató szövegei
+
+    Hiányzó oszlop: üres szövegek.
+    """
+    names = catalog.column_names
+    rows = np.arange(start, len(catalog) if stop is None else min(stop, len(catalog)))
+    return [
+        normalize_series(pd.Series(catalog[name][rows], dtype=object)).tolist()
+        if name in names else [''] * len(rows)
+        for name in FIELD_WEIGHTS
+    ]
+
+
+def _count_blocks(blocks):
+    """Mezőnkénti kifejezés gyakoriság mátrixok (cím, útmutató) blokkok sorozatából
+
+    blocks: (címek, útmutatók) párok. A szótár blokkról blokkra bővül, a végén ábécé
+    rendbe kerül - az eredmény a CountVectorizer illesztésével azonos, de egyszerre csak
+    egy blokk szövegei vannak a memóriában.
+    """
+    vocabulary = {}
+    parts = ([], [])  # mezőnként blokk mátrixok (a blokk végi szótár szélességével)
+    for block in blocks:
+        for field, texts in zip(parts, block):
+            indices, indptr = [], [0]
+            for text in texts:
+                indices.extend(vocabulary.setdefault(token, len(vocabulary))
+                               for token in _TOKEN_RE.findall(text))
+                indptr.append(len(indices))
+            matrix = sparse.csr_matrix(
+                (np.ones(len(indices), dtype=np.float32), np.array(indices, dtype=np.int64),
+                 np.array(indptr, dtype=np.int64)),
+                shape=(len(texts), len(vocabulary))
+            )
+            matrix.sum_duplicates()
+            field.append(matrix)
+
+    # Ábécé rendezett szótár: régi (első előfordulás szerinti) id -> új id
+    terms = sorted(vocabulary)
+    new_ids = np.empty(len(terms), dtype=np.int64)
+    new_ids[[vocabulary[term] for term in terms]] = np.arange(len(terms))
+
+    counts = []
+    for field in parts:
+        matrix = sparse.vstack(
+            [sparse.csr_matrix((part.data, part.indices, part.indptr), shape=(part.shape[0], len(terms)))
+             for part in field], format='csr'
+        ) if field else sparse.csr_matrix((0, len(terms)), dtype=np.float32)
+        matrix.indices = new_ids[matrix.indices].astype(matrix.indices.dtype)
+        matrix.has_sorted_indices = False
+        matrix.sort_indices()
+        counts.append(matrix)
+    return terms, counts
+
+
+class TextIndex:
+    """Rendezett szótár + kifejezésenkénti statisztika + BM25 hozzájárulás postings
+
+    postings: TfidfPostings a recept × kifejezés BM25 hozzájárulásokon (float32, CSC)
+    doc_freq: hány receptben fordul elő a kifejezés (a prefix folytatások rangsorához)
+    """
+
+    def __init__(self, vocabulary, doc_freq, idf, avg_lengths, postings=None):
+        self.vocabulary = list(vocabulary)
+        self.term_ids = {term: i for i, term in enumerate(self.vocabulary)}
+        self.doc_freq = doc_freq
+        self.idf = idf
+        self.avg_lengths = dict(avg_lengths)
+        self.postings = postings
+        self.n_recipes = postings.n_recipes if postings is not None else 0
+
+    @classmethod
+    def build(cls, titles, instructions):
+        """Építés a normalizált cím és útmutató szövegekből (közös, ábécé rendezett szótár)"""
+        return cls._build_blocks([(titles, instructions)])
+
+    @classmethod
+    def from_catalog(cls, catalog, block_size=50_000):
+        """Építés egy (oszlopos) katalógusból, blokkonként dekódolva és normalizálva"""
+        return cls._build_blocks(
+            catalog_fields(catalog, start, start + block_size)
+            for start in range(0, len(catalog), block_size)
+        )
+
+    @classmethod
+    def _build_blocks(cls, blocks):
+        vocabulary, (title_counts, instruction_counts) = _count_blocks(blocks)
+        n_recipes = title_counts.shape[0]
+
+        presence = (title_counts + instruction_counts).tocsc()
+        doc_freq = np.diff(presence.indptr).astype(np.int32)
+        idf = np.log(1 + (n_recipes - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        avg_lengths = {
+            name: float(field_counts.sum() / max(n_recipes, 1))
+            for name, field_counts in zip(FIELD_WEIGHTS, (title_counts, instruction_counts))
+        }
+
+        index = cls(vocabulary, doc_freq, idf, avg_lengths)
+        index.postings = TfidfPostings.from_matrix(index._impacts(title_counts, instruction_counts))
+        index.n_recipes = n_recipes
+        return index
+
+    def _impacts(self, title_counts, instruction_counts, idf=None):
+        """Recept × kifejezés BM25F hozzájárulás: idf · tf~ (k1 + 1) / (k1 + tf~)
+
+        tf~ = Σ mező súly · tf / (1 - b + b · mezőhossz / átlagos mezőhossz)
+        idf: kifejezésenkénti idf (None: az indexé)
+        """
+        idf = self.idf if idf is None else idf
+        pseudo_tf = None
+        for name, counts in zip(FIELD_WEIGHTS, (title_counts, instruction_counts)):
+            lengths = np.asarray(counts.sum(axis=1)).ravel()
+            average = self.avg_lengths[name] or 1.0
+            norms = FIELD_WEIGHTS[name] / (1 - BM25_B + BM25_B * lengths / average)
+            weighted = sparse.diags(norms.astype(np.float32)) @ counts
+            pseudo_tf = weighted if pseudo_tf is None else pseudo_tf + weighted
+
+        impacts = pseudo_tf.tocsr()
+        impacts.data = (
+            idf[impacts.indices] * impacts.data * (BM25_K1 + 1) / (BM25_K1 + impacts.data)
+        ).astype(np.float32)
+        return impacts
+
+    def save(self, directory):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        self.postings.save(directory / "postings")
+        np.save(directory / "doc_freq.npy", self.doc_freq)
+        np.save(directory / "idf.npy", self.idf)
+        with open(directory / "vocabulary.json", 'w', encoding='utf-8') as f:
+            json.dump(self.vocabulary, f, ensure_ascii=False)
+        with open(directory / "stats.json", 'w', encoding='utf-8') as f:
+            json.dump({'avg_lengths': self.avg_lengths, 'field_weights': FIELD_WEIGHTS,
+                       'k1': BM25_K1, 'b': BM25_B}, f, indent=2)
+
+    @classmethod
+    def open(cls, directory):
+        directory = Path(directory)
+        with open(directory / "vocabulary.json", encoding='utf-8') as f:
+            vocabulary = json.load(f)
+        with open(directory / "stats.json", encoding='utf-8') as f:
+            stats = json.load(f)
+        return cls(
+            vocabulary,
+            np.load(directory / "doc_freq.npy", mmap_mode='r'),
+            np.load(directory / "idf.npy", mmap_mode='r'),
+            stats['avg_lengths'],
+            TfidfPostings.open(directory / "postings")
+        )
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    def query_vector(self, query):
+        """Lekérdezés -> 1 × szótár súlyvektor (pontos szó 1, prefix folytatás PREFIX_WEIGHT)"""
+        weights = {}
+        for token in _query_tokens(query):
+            _add_term_weights(weights, token, self.vocabulary, self.term_ids, self.doc_freq)
+        return _weight_vector(weights, len(self))
+
+
+class LayeredTextIndex:
+    """Alap index + delta receptek (inkrementális szerkesztések), törölt alap sorok nélkül
+
+    A delta receptek az alap statisztikáival (idf, átlagos mezőhossz) pontozódnak, így
+    összevethetők az alap receptekkel. Az alap szótárban nem szereplő szavaik a szótár
+    végére kerülnek (idf a delta előfordulásokból): egy új recept új szavára is azonnal
+    lehet keresni, tömörítés nélkül.
+    """
+
+    def __init__(self, base, catalog, deleted):
+        self.base = base
+        self.n_base_terms = len(base)
+        tokens = [[_TOKEN_RE.findall(text) for text in texts] for texts in catalog_fields(catalog)]
+
+        self.extra_terms = sorted({
+            token for field in tokens for document in field for token in document
+            if token not in base.term_ids
+        })
+        self.extra_ids = {term: i for i, term in enumerate(self.extra_terms)}
+        n_terms = self.n_base_terms + len(self.extra_terms)
+
+        def term_id(token):
+            base_id = base.term_ids.get(token)
+            return base_id if base_id is not None else self.n_base_terms + self.extra_ids[token]
+
+        # Mezőnkénti gyakoriság mátrixok (a delta kicsi - egyszerű tokenizálás elég)
+        counts = []
+        for field in tokens:
+            matrix = sparse.csr_matrix(
+                (np.ones(sum(map(len, field)), dtype=np.float32),
+                 np.array([term_id(token) for document in field for token in document], dtype=np.int64),
+                 np.concatenate(([0], np.cumsum([len(document) for document in field])))),
+                shape=(len(field), n_terms)
+            )
+            matrix.sum_duplicates()
+            counts.append(matrix)
+
+        # Az új szavak előfordulása és idf-je (a receptek száma az alappal együtt)
+        presence = (counts[0] + counts[1]).tocsc()[:, self.n_base_terms:]
+        self.extra_doc_freq = np.diff(presence.indptr).astype(np.int32)
+        n_recipes = base.n_recipes + len(catalog)
+        extra_idf = np.log(1 + (n_recipes - self.extra_doc_freq + 0.5) / (self.extra_doc_freq + 0.5))
+
+        impacts = base._impacts(*counts, idf=np.concatenate((base.idf, extra_idf.astype(np.float32))))
+        self.postings = LayeredTfidfPostings(base.postings, TfidfPostings.from_matrix(impacts), deleted)
+        self.n_recipes = self.postings.n_recipes
+
+    def __len__(self):
+        return self.n_base_terms + len(self.extra_terms)
+
+    def query_vector(self, query):
+        """Lekérdezés súlyvektora az alap szótár + a delta új szavai felett"""
+        weights = {}
+        extra = {}
+        for token in _query_tokens(query):
+            _add_term_weights(weights, token, self.base.vocabulary, self.base.term_ids, self.base.doc_freq)
+            _add_term_weights(extra, token, self.extra_terms, self.extra_ids, self.extra_doc_freq)
+        for term_id, weight in extra.items():
+            weights[self.n_base_terms + term_id] = weight
+        return _weight_vector(weights, len(self))
+
+
+def _query_tokens(query):
+    return _TOKEN_RE.findall(normalize_text(query))
+
+
+def _prefix_matches(vocabulary, doc_freq, token):
+    """A rendezett szótár tokennel kezdődő (hosszabb) kifejezései, a leggyakoribbak előre"""
+    start = bisect.bisect_right(vocabulary, token)
+    end = bisect.bisect_left(vocabulary, token + '\uffff', lo=start)
+    if end <= start:
+        return []
+    term_ids = np.arange(start, end)
+    order = np.argsort(-np.asarray(doc_freq[start:end]), kind='stable')[:PREFIX_EXPANSIONS]
+    return term_ids[order].tolist()
+
+
+def _add_term_weights(weights, token, vocabulary, term_ids, doc_freq):
+    """Egy lekérdezés szó súlyai: pontos egyezés 1, prefix folytatások PREFIX_WEIGHT"""
+    term_id = term_ids.get(token)
+    if term_id is not None:
+        weights[term_id] = 1.0
+    if len(token) >= PREFIX_MIN_LENGTH:
+        for prefix_id in _prefix_matches(vocabulary, doc_freq, token):
+            weights[prefix_id] = max(weights.get(prefix_id, 0.0), PREFIX_WEIGHT)
+
+
+def _weight_vector(weights, n_terms):
+    """{kifejezés id: súly} -> 1 × n_terms ritka sor"""
+    term_ids = np.array(sorted(weights), dtype=np.int32)
+    return sparse.csr_matrix(
+        (np.array([weights[i] for i in term_ids.tolist()], dtype=np.float32),
+         term_ids, np.array([0, len(term_ids)])),
+        shape=(1, n_terms)
+    )
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Összetevő szövegek normalizálása - egyetlen közös implementáció
+Indexelés, keresés, auto-complete és az előfeldolgozók ugyanazt használják, így a
+katalógusban tárolt és a lekérdezéskor tisztított kifejezések mindig egyeznek.
+"""
+
+import re
+from functools import lru_cache
+
+import pandas as pd
+
+# Magyar ékezetek -> ékezet nélküli betűk (kisbetűsítés után alkalmazva).
+# Nem str.translate: nem-ASCII szövegen a CPython translate karakterenként dict-et
+# keres, a kilenc C szintű str.replace gyorsabb.
+ACCENT_REPLACEMENTS = (
+    ('á', 'a'), ('é', 'e'), ('í', 'i'), ('ó', 'o'), ('ö', 'o'),
+    ('ő', 'o'), ('ú', 'u'), ('ü', 'u'), ('ű', 'u')
+)
+
+# Nem szó karakterek (vessző kivételével) futama -> egy szóköz. Egyenértékű a
+# '[^\w\s,]' -> ' ' majd '\s+' -> ' ' két lépéssel, de a már helyes egyszeres
+# szóközökhöz nem nyúl (a legtöbb találat ilyen lenne).
+_SEPARATOR_RE = re.compile(r'[^\w, ][^\w,]*| [^\w,]+')
+
+
+def _normalize(text):
+    text = text.lower()
+    for accented, plain in ACCENT_REPLACEMENTS:
+        text = text.replace(accented, plain)
+    return _SEPARATOR_RE.sub(' ', text).strip()
+
+
+def normalize_text(text):
+    """Egy szöveg normalizálása: kisbetű, ékezetmentes, csak szó karakterek és vessző"""
+    if text is None or (isinstance(text, float) and pd.isna(text)):
+        return ""
+    return _normalize_cached(str(text))
+
+
+@lru_cache(maxsize=65536)
+def _normalize_cached(text):
+    # Lekérdezéskor (keresés, auto-complete) ugyanazok a kifejezések ismétlődnek
+    return _normalize(text)
+
+
+def normalize_series(series):
+    """Teljes oszlop normalizálása egy menetben, cache nélkül (hiányzó érték -> üres szöveg)"""
+    values = series.tolist()
+    missing = series.isna().tolist()
+    return pd.Series(
+        ["" if is_missing else _normalize(str(value)) for value, is_missing in zip(values, missing)],
+        index=series.index, dtype=object
+    )
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Term-major TF-IDF postings a szöveges (fallback) kereséshez
+A lekérdezés csak a benne szereplő kifejezések posting listáit járja be
+(term-at-a-time), MaxScore vágással - a katalógus méretével nem nő lineárisan.
+"""
+
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+
+from user_study.catalog import open_sparse, save_sparse
+
+
+class TfidfPostings:
+    """Transzponált TF-IDF mátrix (kifejezés -> receptek) + kifejezésenkénti maximális súly"""
+
+    def __init__(self, postings, max_weights=None):
+        # CSC: oszlop = kifejezés, a posting listák recept index szerint rendezettek
+        self.postings = sparse.csc_matrix(postings, copy=False)
+        if not self.postings.has_sorted_indices:
+            self.postings.sort_indices()
+        self.n_recipes, self.n_terms = self.postings.shape
+
+        if max_weights is None:
+            max_weights = self.postings.max(axis=0).toarray().ravel()
+        self.max_weights = np.asarray(max_weights, dtype=np.float32)
+
+    @classmethod
+    def from_matrix(cls, tfidf_matrix):
+        """Építés a recept × kifejezés TF-IDF mátrixból"""
+        return cls(sparse.csc_matrix(tfidf_matrix, dtype=np.float32))
+
+    def save(self, directory):
+        """Mentés nyers .npy tömbökbe (memory-mapped megnyitáshoz)"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        save_sparse(directory, "postings", self.postings)
+        np.save(directory / "max_weights.npy", self.max_weights)
+
+    @classmethod
+    def open(cls, directory):
+        directory = Path(directory)
+        return cls(
+            open_sparse(directory, "postings"),
+            max_weights=np.load(directory / "max_weights.npy", mmap_mode='r')
+        )
+
+    def _postings(self, term_ids):
+        """A kifejezések posting listái összefűzve: (receptek, súlyok, hosszak)"""
+        starts = self.postings.indptr[term_ids]
+        lengths = self.postings.indptr[term_ids + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        positions = offsets + np.arange(lengths.sum())
+        return self.postings.indices[positions], self.postings.data[positions], lengths
+
+    def top_k(self, query_vector, k, threshold=0.0):
+        """Koszinusz top-k egy (L2 normált) lekérdezés vektorra: (recept indexek, pontszámok)
+
+        MaxScore: a kifejezéseket felső korlát (query súly × max súly) szerint rendezi;
+        a legkisebb korlátú kifejezések, amelyek együtt sem érik el a küszöböt, nem
+        hozhatnak új jelöltet - csak a többi lista jelöltjeire keresünk bennük (bináris keresés).
+        """
+        query = sparse.csr_matrix(query_vector)
+        term_ids = query.indices.astype(np.intp)
+        query_weights = query.data.astype(np.float32)
+        empty = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32))
+        if len(term_ids) == 0 or k <= 0:
+            return empty
+
+        upper_bounds = query_weights * self.max_weights[term_ids]
+        if upper_bounds.sum() <= threshold:
+            return empty
+
+        # Növekvő korlát szerint: az első n_optional kifejezés együtt sem éri el a küszöböt
+        order = np.argsort(upper_bounds, kind='stable')
+        n_optional = int(np.searchsorted(np.cumsum(upper_bounds[order]), threshold, side='left'))
+        optional, essential = order[:n_optional], order[n_optional:]
+
+        # Jelöltek csak a lényeges kifejezések posting listáiból
+        recipe_hits, hit_weights, lengths = self._postings(term_ids[essential])
+        hit_scores = hit_weights * np.repeat(query_weights[essential], lengths)
+        candidates, inverse = np.unique(recipe_hits, return_inverse=True)
+        scores = np.bincount(inverse, weights=hit_scores, minlength=len(candidates))
+
+        # Opcionális kifejezések: csak a meglévő jelöltek pontszámát egészítik ki
+        for term in optional:
+            start, end = self.postings.indptr[term_ids[term]], self.postings.indptr[term_ids[term] + 1]
+            term_recipes = self.postings.indices[start:end]
+            if len(term_recipes) == 0:
+                continue
+            positions = np.searchsorted(term_recipes, candidates)
+            positions[positions == len(term_recipes)] = 0
+            found = term_recipes[positions] == candidates
+            scores[found] += query_weights[term] * self.postings.data[start:end][positions[found]]
+
+        keep = scores > threshold
+        candidates, scores = candidates[keep], scores[keep].astype(np.float32)
+
+        # Részleges rendezés: csak a top k kerül sorba (azonos pontszámnál kisebb index előbb)
+        k = min(k, len(scores))
+        if k == 0:
+            return empty
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.lexsort((candidates[top], -scores[top]))]
+        return candidates[top].astype(np.intp), scores[top]
+
+    def top_k_batch(self, query_matrix, k, threshold=0.0):
+        """Sok lekérdezés egyszerre: egyetlen ritka szorzás (lekérdezés × recept), soronként top-k
+
+        Csak a lekérdezésekkel közös kifejezésű receptek kerülnek az eredménymátrixba.
+        """
+        queries = sparse.csr_matrix(query_matrix, dtype=np.float32)
+        similarity = (queries @ self.postings.T).tocsr()
+
+        results = []
+        for row in range(similarity.shape[0]):
+            start, end = similarity.indptr[row], similarity.indptr[row + 1]
+            candidates = similarity.indices[start:end].astype(np.intp)
+            scores = similarity.data[start:end]
+            keep = scores > threshold
+            candidates, scores = candidates[keep], scores[keep]
+
+            top_k = min(k, len(scores))
+            if top_k == 0:
+                results.append((np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)))
+                continue
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+            top = top[np.lexsort((candidates[top], -scores[top]))]
+            results.append((candidates[top], scores[top]))
+        return results
+
+
+class LayeredTfidfPostings:
+    """Alap postings + delta postings (inkrementális szerkesztések), törölt alap sorok nélkül
+
+    A delta sorok a rögzített szótárú vektorizálóval készülnek (stabil oszlop id-k), így
+    a pontszámok összevethetők az alap sorokéval. A delta szótára a végén bővülhet (a
+    szöveges index új szavai); az alap a lekérdezésnek csak a saját oszlopait kapja.
+    """
+
+    def __init__(self, base, delta, deleted):
+        self.base = base
+        self.delta = delta
+        self.deleted = deleted
+        self.n_base = base.n_recipes
+        self.n_deleted = int(deleted.sum())
+        self.n_recipes = self.n_base + delta.n_recipes
+
+    def _merge(self, base_result, delta_result, k):
+        base_recipes, base_scores = base_result
+        alive = ~self.deleted[base_recipes]
+        delta_recipes, delta_scores = delta_result
+        recipes = np.concatenate([base_recipes[alive], delta_recipes + self.n_base])
+        scores = np.concatenate([base_scores[alive], delta_scores]).astype(np.float32)
+
+        top = np.lexsort((recipes, -scores))[:k]
+        return recipes[top].astype(np.intp), scores[top]
+
+    def _base_query(self, query):
+        query = sparse.csr_matrix(query)
+        return query[:, :self.base.n_terms] if query.shape[1] > self.base.n_terms else query
+
+    def top_k(self, query_vector, k, threshold=0.0):
+        # Az alapból annyival több kell, ahány törölt sor kieshet
+        return self._merge(
+            self.base.top_k(self._base_query(query_vector), k + self.n_deleted, threshold),
+            self.delta.top_k(query_vector, k, threshold),
+            k
+        )
+
+    def top_k_batch(self, query_matrix, k, threshold=0.0):
+        return [
+            self._merge(base_result, delta_result, k)
+            for base_result, delta_result in zip(
+                self.base.top_k_batch(self._base_query(query_matrix), k + self.n_deleted, threshold),
+                self.delta.top_k_batch(query_matrix, k, threshold)
+            )
+        ]
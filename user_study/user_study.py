@@ -8,306 +8,37 @@ import os
 import sys
 import sqlite3
 import datetime
-import random
 import time
 import hashlib
+import hmac
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from flask import Blueprint, render_template, request, session, redirect, url_for, make_response, jsonify
-# Add these imports at the top if not already present
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import re
 import io
+import threading
+
+from user_study.catalog import full_catalog_mode
+from user_study.catalog_artifact import file_signature
+from user_study.explanations import compose_explanation, explanation_fragments
+from user_study.hybrid_recommender import RECOMMENDATION_MODES, SEARCH_MODES, HybridRecipeRecommender
+from user_study.recipe_pipeline import STUDY_SAMPLE_SIZE, preprocess
+from user_study.rng import make_rng, new_seed
 
-class HybridRecipeRecommender:
-    """Hibrid ajánlórendszer: keresés + content filtering + egységes scoring"""
-    
-    def __init__(self, csv_path):
-        self.recipes_df = pd.read_csv(csv_path)
-        self.tfidf_vectorizer = None
-        self.tfidf_matrix = None
-        self.ingredient_index = None
-        self._prepare_content_features()
-        
-    def _prepare_content_features(self):
-        """Content filtering előkészítése"""
-        print("🔧 Content features előkészítése...")
-        
-        # Összetevők szöveg tisztítása és normalizálása
-        self.recipes_df['ingredients_clean'] = self.recipes_df['ingredients'].apply(
-            self._clean_ingredients
-        )
-        
-        # TF-IDF vektorizálás az összetevőkre
-        self.tfidf_vectorizer = TfidfVectorizer(
-            max_features=500,
-            stop_words=None,
-            ngram_range=(1, 2),
-            min_df=1  # Csökkentett min_df a kis adatbázishoz
-        )
-        
-        self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(
-            self.recipes_df['ingredients_clean']
-        )
-        
-        # Összetevő index építése gyors kereséshez
-        self._build_ingredient_index()
-        
-        print(f"✅ {len(self.recipes_df)} recept feldolgozva content filtering-hez")
-    
-    def _clean_ingredients(self, ingredients_text):
-        """Összetevők szöveg tisztítása"""
-        if pd.isna(ingredients_text):
-            return ""
-        
-        # Alapvető tisztítás
-        text = str(ingredients_text).lower()
-        
-        # Magyar ékezetek normalizálása (opcionális)
-        replacements = {
-            'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ö': 'o', 
-            'ő': 'o', 'ú': 'u', 'ü': 'u', 'ű': 'u'
-        }
-        for old, new in replacements.items():
-            text = text.replace(old, new)
-        
-        # Felesleges karakterek eltávolítása
-        text = re.sub(r'[^\w\s,]', ' ', text)
-        text = re.sub(r'\s+', ' ', text)
-        
-        return text.strip()
-    
-    def _build_ingredient_index(self):
-        """Összetevő index építése gyors kereséshez"""
-        self.ingredient_index = {}
-        
-        for idx, ingredients in enumerate(self.recipes_df['ingredients_clean']):
-            # Összetevők szétválasztása
-            ingredient_list = [
-                ing.strip() for ing in ingredients.split(',') 
-                if ing.strip()
-            ]
-            
-            for ingredient in ingredient_list:
-                if ingredient not in self.ingredient_index:
-                    self.ingredient_index[ingredient] = []
-                self.ingredient_index[ingredient].append(idx)
-    
-    def search_by_ingredients(self, search_ingredients, max_results=20):
-        """Keresés összetevők alapján"""
-        if not search_ingredients:
-            return list(range(len(self.recipes_df)))
-        
-        # Keresési kifejezések normalizálása
-        search_terms = [
-            self._clean_ingredients(term.strip()) 
-            for term in search_ingredients.split(',')
-            if term.strip()
-        ]
-        
-        # Releváns receptek keresése
-        relevant_recipes = set()
-        ingredient_matches = {}
-        
-        for search_term in search_terms:
-            # Pontos egyezés
-            if search_term in self.ingredient_index:
-                matching_recipes = self.ingredient_index[search_term]
-                relevant_recipes.update(matching_recipes)
-                
-                for recipe_idx in matching_recipes:
-                    if recipe_idx not in ingredient_matches:
-                        ingredient_matches[recipe_idx] = 0
-                    ingredient_matches[recipe_idx] += 1
-            
-            # Részleges egyezés (fuzzy matching)
-            else:
-                for ingredient, recipe_indices in self.ingredient_index.items():
-                    if search_term in ingredient or ingredient in search_term:
-                        relevant_recipes.update(recipe_indices)
-                        
-                        for recipe_idx in recipe_indices:
-                            if recipe_idx not in ingredient_matches:
-                                ingredient_matches[recipe_idx] = 0
-                            ingredient_matches[recipe_idx] += 0.5
-        
-        # Ha nincs találat, használj TF-IDF hasonlóságot
-        if not relevant_recipes:
-            relevant_recipes = self._tfidf_search(search_ingredients, max_results)
-            return list(relevant_recipes)[:max_results]
-        
-        # Rendezés az egyezések száma szerint
-        sorted_recipes = sorted(
-            relevant_recipes, 
-            key=lambda x: ingredient_matches.get(x, 0), 
-            reverse=True
-        )
-        
-        return sorted_recipes[:max_results]
-    
-    def _tfidf_search(self, search_query, max_results=20):
-        """TF-IDF alapú keresés"""
-        # Keresési lekérdezés vektorizálása
-        query_clean = self._clean_ingredients(search_query)
-        query_vector = self.tfidf_vectorizer.transform([query_clean])
-        
-        # Hasonlóság számítása
-        similarity_scores = cosine_similarity(query_vector, self.tfidf_matrix).flatten()
-        
-        # Top receptek kiválasztása
-        top_indices = similarity_scores.argsort()[-max_results:][::-1]
-        
-        return [idx for idx in top_indices if similarity_scores[idx] > 0.05]  # Alacsonyabb threshold
-    
-    def get_recommendations(self, version='v1', search_ingredients="", user_preferences=None, n_recommendations=5):
-        """EGYSÉGES ajánlási algoritmus - csak információ megjelenítés különbözik"""
-        
-        # 1. KERESÉS ALAPÚ SZŰRÉS (minden verzióban ugyanaz)
-        if search_ingredients.strip():
-            candidate_indices = self.search_by_ingredients(search_ingredients, max_results=20)
-            candidate_recipes = self.recipes_df.iloc[candidate_indices].copy()
-            print(f"🔍 Keresés '{search_ingredients}' -> {len(candidate_recipes)} találat")
-        else:
-            candidate_recipes = self.recipes_df.copy()
-            print(f"📊 Teljes adatbázis -> {len(candidate_recipes)} recept")
-        
-        if len(candidate_recipes) == 0:
-            print("❌ Nincs találat a keresésre")
-            return []
-        
-        # 2. EGYSÉGES SCORING (minden verzióban UGYANAZ)
-        search_boost = self._calculate_search_boost(candidate_recipes, search_ingredients)
-        candidate_recipes['recommendation_score'] = (
-            candidate_recipes['ESI'] * 0.4 +        # 40% környezeti
-            candidate_recipes['HSI'] * 0.4 +        # 40% egészség
-            candidate_recipes['PPI'] * 0.2 +        # 20% népszerűség
-            search_boost * 0.1                      # 10% keresési relevancia
-        )
-        
-        # Top 15 közül random kiválasztás (50 receptből)
-        top_pool_size = min(15, len(candidate_recipes))
-        top_pool = candidate_recipes.nlargest(top_pool_size, 'recommendation_score')
-        
-        # Random seed és kiválasztás
-        random.seed(int(time.time() * 1000000))
-        if len(top_pool) <= n_recommendations:
-            final_recommendations = top_pool
-        else:
-            final_recommendations = top_pool.sample(n=n_recommendations)
-        
-        print(f"🎲 RANDOMIZÁLT: {n_recommendations} recept a top {len(top_pool)} közül")
-        recommendations = final_recommendations.to_dict('records')
-        
-        # 4. VERZIÓ-SPECIFIKUS INFORMÁCIÓ DISCLOSURE
-        for rec in recommendations:
-            rec['search_relevance'] = self._calculate_search_relevance(rec, search_ingredients)
-            
-            # A/B/C különbségek CSAK az információ megjelenítésében
-            if version == 'v1':
-                # V1: BASELINE - Rejtett score-ok, nincs magyarázat
-                rec['show_scores'] = False
-                rec['show_explanation'] = False
-                rec['explanation'] = ""
-                
-            elif version == 'v2':
-                # V2: SCORE DISCLOSURE - Látható score-ok, nincs magyarázat
-                rec['show_scores'] = True
-                rec['show_explanation'] = False
-                rec['explanation'] = ""
-                
-            elif version == 'v3':
-                # V3: FULL DISCLOSURE - Látható score-ok + magyarázat
-                rec['show_scores'] = True
-                rec['show_explanation'] = True
-                rec['explanation'] = self._generate_explanation(rec, search_ingredients)
-        
-        print(f"✅ {len(recommendations)} ajánlás generálva ({version}) - Egységes algoritmus, verzió-specifikus megjelenítés")
-        return recommendations
-    
-    def _calculate_search_boost(self, recipes_df, search_ingredients):
-        """Keresési relevancia boost számítása"""
-        if not search_ingredients.strip():
-            return pd.Series([0.0] * len(recipes_df))
-        
-        search_terms = [term.strip().lower() for term in search_ingredients.split(',') if term.strip()]
-        boost_scores = []
-        
-        for _, recipe in recipes_df.iterrows():
-            recipe_ingredients = recipe['ingredients'].lower()
-            matches = sum(1 for term in search_terms if term in recipe_ingredients)
-            boost = (matches / len(search_terms)) * 100 if search_terms else 0
-            boost_scores.append(boost)
-        
-        return pd.Series(boost_scores, index=recipes_df.index)
-    
-    def _calculate_search_relevance(self, recipe, search_ingredients):
-        """Keresési relevancia számítása egy recepthez"""
-        if not search_ingredients.strip():
-            return 0.0
-        
-        search_terms = [term.strip().lower() for term in search_ingredients.split(',') if term.strip()]
-        recipe_ingredients = recipe['ingredients'].lower()
-        matches = sum(1 for term in search_terms if term in recipe_ingredients)
-        
-        return matches / len(search_terms) if search_terms else 0.0
-    
-    def _generate_explanation(self, recipe, search_ingredients=""):
-        """Magyarázat generálás V3 verzióhoz"""
-        explanations = []
-        
-        # Keresési relevancia magyarázat
-        if search_ingredients.strip():
-            relevance = recipe.get('search_relevance', 0)
-            if relevance >= 0.8:
-                explanations.append(f"🔍 Tökéletesen illeszkedik a keresett összetevőkhöz")
-            elif relevance >= 0.5:
-                explanations.append(f"🔍 Jól illeszkedik a kereséshez ({relevance:.0%})")
-            elif relevance > 0:
-                explanations.append(f"🔍 Részben tartalmazza a keresett összetevőket")
-        
-        # Score-alapú magyarázatok
-        env_score = recipe['ESI']
-        health_score = recipe['HSI'] 
-        pop_score = recipe['PPI']
-        
-        if env_score >= 70:
-            explanations.append(f"🌱 Környezetbarát ({env_score:.0f}/100 pont)")
-        if health_score >= 70:
-            explanations.append(f"💚 Egészséges ({health_score:.0f}/100 pont)")
-        if pop_score >= 70:
-            explanations.append(f"⭐ Népszerű ({pop_score:.0f}/100 pont)")
-        
-        if not explanations:
-            explanations.append("🍽️ Kiegyensúlyozott összetétel minden szempontból")
-        
-        # Összesített magyarázat kompozícióval
-        composite_score = env_score * 0.4 + health_score * 0.4 + pop_score * 0.2
-        
-        final_explanation = f"Ezt a receptet {composite_score:.1f}/100 összpontszám alapján ajánljuk "
-        final_explanation += f"(40% környezeti + 40% egészség + 20% népszerűség). "
-        final_explanation += " • ".join(explanations)
-        
-        return final_explanation
-    
-    def get_ingredient_suggestions(self, partial_input, max_suggestions=10):
-        """Összetevő javaslatok auto-complete-hez"""
-        if len(partial_input) < 2:
-            return []
-        
-        partial_clean = self._clean_ingredients(partial_input)
-        suggestions = []
-        
-        for ingredient in self.ingredient_index.keys():
-            if partial_clean in ingredient:
-                suggestions.append(ingredient)
-        
-        return sorted(suggestions)[:max_suggestions]
 # Project path setup
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+# Batch ajánlás API: lekérdezések maximális száma kérésenként
+MAX_BATCH_QUERIES = int(os.environ.get('MAX_BATCH_QUERIES', 5000))
+
+# Katalógus delta mérete, amely felett a háttérben tömörítés (teljes újraillesztés) indul
+COMPACTION_THRESHOLD = int(os.environ.get('COMPACTION_THRESHOLD', 500))
+
+# A feldolgozott CSV változásfigyelése (másodperc, 0: kikapcsolva)
+CATALOG_WATCH_INTERVAL = float(os.environ.get('CATALOG_WATCH_INTERVAL', 5))
+
 # Blueprint - TEMPLATE PATH FIX
 user_study_bp = Blueprint('user_study', __name__, 
                          url_prefix='',
@@ -423,10 +154,17 @@ class UserStudyDatabase:
 class CSVProcessor:
     """CSV feldolgozó és processed_recipes.csv létrehozó"""
     
+    @staticmethod
+    def processed_csv_path():
+        """Feldolgozott CSV útvonala - a teljes katalógus külön fájlba kerül, nem írja felül a mintát"""
+        if full_catalog_mode():
+            return project_root / "data" / "processed_recipes_full.csv"
+        return project_root / "data" / "processed_recipes.csv"
+    
     @staticmethod
     def create_processed_csv():
         """Létrehozza a processed_recipes.csv fájlt ha nem létezik"""
-        processed_path = project_root / "data" / "processed_recipes.csv"
+        processed_path = CSVProcessor.processed_csv_path()
         
         # Ha már létezik, ne írjuk felül
         if processed_path.exists():
@@ -450,101 +188,17 @@ class CSVProcessor:
     
     @staticmethod
     def process_original_csv(original_path, output_path):
-        """Eredeti CSV feldolgozása"""
+        """Eredeti CSV feldolgozása a közös, streamelt pipeline-nal (CSV + katalógus artifact)"""
+        # Teljes katalógus módban minden recept marad, egyébként user study minta (50 recept)
+        sample_size = None if full_catalog_mode() else STUDY_SAMPLE_SIZE
         try:
-            # Többféle encoding próbálása
-            encodings = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']
-            df = None
-            
-            for encoding in encodings:
-                try:
-                    df = pd.read_csv(original_path, encoding=encoding)
-                    print(f"✅ CSV betöltve {encoding} encoding-gal")
-                    break
-                except UnicodeDecodeError:
-                    continue
-            
-            if df is None:
-                print("❌ CSV betöltés sikertelen, sample adatok")
-                return CSVProcessor.create_sample_csv(output_path)
-            
-            print(f"📋 Eredeti CSV: {len(df)} recept, oszlopok: {list(df.columns)}")
-            
-            # Oszlop mapping
-            column_mapping = {
-                'name': 'title',
-                'ingredients': 'ingredients',
-                'instructions': 'instructions',
-                'images': 'images',
-                'env_score': 'env_score_raw',
-                'nutri_score': 'nutri_score_raw',
-                'meal_score': 'meal_score_raw'
-            }
-            
-            # Rename columns
-            df = df.rename(columns=column_mapping)
-            
-            # Recipe ID hozzáadása
-            df['recipeid'] = range(1, len(df) + 1)
-            
-            # Scores normalizálása
-            df = CSVProcessor.normalize_scores(df)
-            
-            # Sample választás (50 recept)
-            sample_size = min(50, len(df))
-            df_sample = df.sample(n=sample_size)
-            
-            # Mentés
-            df_sample.to_csv(output_path, index=False, encoding='utf-8')
-            print(f"✅ Processed CSV mentve: {output_path} ({len(df_sample)} recept)")
-            
+            preprocess(original_path, output_path, sample_size=sample_size)
             return output_path
             
         except Exception as e:
             print(f"❌ CSV feldolgozási hiba: {e}")
             return CSVProcessor.create_sample_csv(output_path)
     
-    @staticmethod
-    def normalize_scores(df):
-        """Score-ok normalizálása 0-100 skálára"""
-        
-        # Environmental Score - inverz (kisebb = jobb környezetileg)
-        if 'env_score_raw' in df.columns:
-            env_min, env_max = df['env_score_raw'].min(), df['env_score_raw'].max()
-            df['ESI'] = 100 - ((df['env_score_raw'] - env_min) / (env_max - env_min) * 100)
-        else:
-            df['ESI'] = 70.0  # default
-        
-        # Health Score - direkt (nagyobb = jobb)
-        if 'nutri_score_raw' in df.columns:
-            nutri_max = df['nutri_score_raw'].max()
-            if nutri_max > 100:
-                df['HSI'] = (df['nutri_score_raw'] / nutri_max) * 100
-            else:
-                df['HSI'] = df['nutri_score_raw']
-        else:
-            df['HSI'] = 75.0  # default
-        
-        # Popularity Score - direkt (nagyobb = népszerűbb)
-        if 'meal_score_raw' in df.columns:
-            meal_max = df['meal_score_raw'].max()
-            if meal_max > 100:
-                df['PPI'] = (df['meal_score_raw'] / meal_max) * 100
-            else:
-                df['PPI'] = df['meal_score_raw']
-        else:
-            df['PPI'] = 80.0  # default
-        
-        # Composite score
-        df['composite_score'] = (df['ESI'] * 0.4 + df['HSI'] * 0.4 + df['PPI'] * 0.2)
-        
-        print(f"📊 Score tartományok:")
-        print(f"   HSI: {df['HSI'].min():.1f} - {df['HSI'].max():.1f}")
-        print(f"   ESI: {df['ESI'].min():.1f} - {df['ESI'].max():.1f}")
-        print(f"   PPI: {df['PPI'].min():.1f} - {df['PPI'].max():.1f}")
-        
-        return df
-    
     @staticmethod
     def create_sample_csv(output_path):
         """Sample CSV létrehozása ha nincs eredeti"""
@@ -647,46 +301,158 @@ class EnhancedRecipeRecommender:
     def __init__(self):
         # CSV létrehozása/ellenőrzése
         self.csv_path = CSVProcessor.create_processed_csv()
-        self.recipes_df = self.load_recipes()
-        
-        # Hibrid rendszer inicializálása
-        if self.recipes_df is not None:
+        self._recipes_df = None
+        # Egyszerre egy háttér csere (újratöltés vagy tömörítés) folyhat
+        self._swap_lock = threading.Lock()
+        self.catalog_generation = 0
+        self._next_watch = 0.0
+        self._pending_signature = None
+        
+        # Hibrid rendszer inicializálása - a katalógust a megosztott artifactból nyitja,
+        # a worker nem tart saját DataFrame példányt
+        self.hybrid_recommender = None
+        if self.validate_csv():
             try:
-                self.hybrid_recommender = HybridRecipeRecommender(str(self.csv_path))
-                print(f"🍽️ Hibrid ajánló rendszer inicializálva: {len(self.recipes_df)} recept")
+                self._swap(HybridRecipeRecommender(str(self.csv_path)))
+                print(f"🍽️ Hibrid ajánló rendszer inicializálva: {len(self.hybrid_recommender.catalog)} recept")
             except Exception as e:
                 print(f"⚠️ Hibrid ajánló inicializálási hiba: {e}")
-                self.hybrid_recommender = None
+    
+    def _swap(self, hybrid):
+        """Atomikus referencia csere: a folyamatban lévő kérések a régi példányt használják"""
+        self.hybrid_recommender = hybrid
+        self._recipes_df = None
+        self.catalog_generation += 1
+    
+    def _in_background(self, name, build):
+        """Új ajánló építése háttérszálon, majd csere - False, ha már fut egy csere"""
+        if not self._swap_lock.acquire(blocking=False):
+            return False
+        
+        def run():
+            try:
+                hybrid = build()
+                if hybrid is not None and hybrid is not self.hybrid_recommender:
+                    self._swap(hybrid)
+                    print(f"✅ Katalógus csere ({name}): {len(hybrid.catalog)} recept, "
+                          f"verzió {hybrid.artifact_dir.name} #{self.catalog_generation}")
+            except Exception as e:
+                print(f"❌ Katalógus csere hiba ({name}): {e}")
+            finally:
+                self._swap_lock.release()
+        
+        threading.Thread(target=run, name=f"catalog-{name}", daemon=True).start()
+        return True
+    
+    def reload_catalog(self):
+        """Hot reload: új HybridRecipeRecommender a háttérben, majd atomikus csere
+        
+        Workerek között az artifact építési zár deduplikál: csak egy folyamat illeszt,
+        a többi a kész artifactot nyitja meg.
+        """
+        def build():
+            if not self.validate_csv():
+                return None
+            return HybridRecipeRecommender(str(self.csv_path))
+        return self._in_background("reload", build)
+    
+    def watch_catalog(self):
+        """A feldolgozott CSV változásának figyelése (legfeljebb CATALOG_WATCH_INTERVAL-onként
+        egy stat) - két egymást követő azonos állapot után indul az újratöltés (befejezett írás)
+        """
+        now = time.monotonic()
+        if CATALOG_WATCH_INTERVAL <= 0 or now < self._next_watch:
+            return
+        self._next_watch = now + CATALOG_WATCH_INTERVAL
+        
+        signature = file_signature(self.csv_path)
+        hybrid = self.hybrid_recommender
+        if signature is None or (hybrid is not None and signature == hybrid.csv_signature):
+            self._pending_signature = None
+            return
+        
+        if signature == self._pending_signature:
+            if self.reload_catalog():
+                print(f"🔄 Katalógus változás észlelve: {self.csv_path}")
+                self._pending_signature = None
         else:
-            self.hybrid_recommender = None
+            self._pending_signature = signature
     
-    def load_recipes(self):
-        """Receptek betöltése CSV-ből"""
+    def catalog_status(self):
+        """Katalógus verzió a /health végponthoz (az artifact tartalom-hash-e azonos minden workerben)"""
+        hybrid = self.hybrid_recommender
+        return {
+            'version': hybrid.artifact_dir.name if hybrid else None,
+            'generation': self.catalog_generation,
+            'recipes': len(hybrid.catalog) if hybrid else 0,
+            'pending_edits': len(hybrid.catalog_delta) if hybrid else 0,
+            'reloading': self._swap_lock.locked()
+        }
+    
+    @property
+    def recipes_df(self):
+        """DataFrame nézet (debug/fallback) - csak első használatkor készül el"""
+        if self._recipes_df is None:
+            if self.hybrid_recommender is not None:
+                hybrid = self.hybrid_recommender
+                self._recipes_df = hybrid.catalog.to_frame()[hybrid.row_columns]
+            else:
+                self._recipes_df = self.load_recipes()
+        return self._recipes_df
+    
+    def catalog_edited(self):
+        """Szerkesztés után: DataFrame nézet eldobása, nagy delta esetén háttér tömörítés"""
+        self._recipes_df = None
+        if len(self.hybrid_recommender.catalog_delta) >= COMPACTION_THRESHOLD:
+            self.compact_catalog()
+    
+    def compact_catalog(self):
+        """Delta beolvasztása háttérszálon - False, ha már fut egy csere"""
+        return self._in_background("compaction", self.hybrid_recommender.compact)
+    
+    def validate_csv(self):
+        """CSV létezésének és kötelező oszlopainak ellenőrzése (csak a fejlécet olvassa)"""
         try:
             if not self.csv_path.exists():
                 print(f"❌ CSV nem található: {self.csv_path}")
-                return None
+                return False
             
-            df = pd.read_csv(self.csv_path)
-            print(f"✅ CSV betöltve: {len(df)} recept")
+            columns = pd.read_csv(self.csv_path, nrows=0).columns
             
             # Kötelező oszlopok ellenőrzése
             required_cols = ['recipeid', 'title', 'ingredients', 'images', 'HSI', 'ESI', 'PPI']
-            missing_cols = [col for col in required_cols if col not in df.columns]
+            missing_cols = [col for col in required_cols if col not in columns]
             
             if missing_cols:
                 print(f"⚠️ Hiányzó oszlopok: {missing_cols}")
-                return None
+                return False
             
+            return True
+            
+        except Exception as e:
+            print(f"❌ CSV ellenőrzési hiba: {e}")
+            return False
+    
+    def load_recipes(self):
+        """Receptek betöltése CSV-ből"""
+        if not self.validate_csv():
+            return None
+        
+        try:
+            df = pd.read_csv(self.csv_path)
+            print(f"✅ CSV betöltve: {len(df)} recept")
             return df
             
         except Exception as e:
             print(f"❌ CSV betöltési hiba: {e}")
             return None
     
-    def get_recommendations(self, version='v1', search_ingredients="", user_preferences=None, n_recommendations=5):
+    def get_recommendations(self, version='v1', search_ingredients="", user_preferences=None, n_recommendations=5,
+                            seed=None, mode='standard', categories=None, search_mode='ingredients'):
         """HIBRID ajánlások lekérése - A/B/C TESTING"""
-        if self.hybrid_recommender is None:
+        # Egy kérés végig ugyanazt a példányt használja (egy közbeni csere nem érinti)
+        hybrid = self.hybrid_recommender
+        if hybrid is None:
             print("❌ Hibrid ajánló nem elérhető! Fallback...")
             return self._fallback_recommendations(version, n_recommendations)
         
@@ -696,11 +462,15 @@ class EnhancedRecipeRecommender:
                 user_preferences = {}
             
             # Hibrid ajánló hívása
-            recommendations = self.hybrid_recommender.get_recommendations(
+            recommendations = hybrid.get_recommendations(
                 version=version,
                 search_ingredients=search_ingredients,
                 user_preferences=user_preferences,
-                n_recommendations=n_recommendations
+                n_recommendations=n_recommendations,
+                seed=seed,
+                mode=mode,
+                categories=categories,
+                search_mode=search_mode
             )
             
             print(f"✅ {len(recommendations)} hibrid ajánlás generálva ({version})")
@@ -721,7 +491,8 @@ def _fallback_recommendations(self, version, n_recommendations):
         if self.recipes_df is not None and len(self.recipes_df) > 0:
             print(f"📊 Using CSV data: {len(self.recipes_df)} recipes available")
             sample_size = min(n_recommendations, len(self.recipes_df))
-            recommendations = self.recipes_df.sample(n=sample_size).to_dict('records')
+            rng, _ = make_rng(context="fallback")
+            recommendations = self.recipes_df.sample(n=sample_size, random_state=rng).to_dict('records')
         else:
             # Ha nincs CSV, generálj sample adatokat
             print("🔧 Generating hardcoded fallback recipes")
@@ -795,7 +566,8 @@ def _fallback_recommendations(self, version, n_recommendations):
             elif version == 'v3':
                 rec['show_scores'] = True
                 rec['show_explanation'] = True
-                rec['explanation'] = f"Ezt a receptet {rec['composite_score']:.1f}/100 összpontszám alapján ajánljuk (40% környezeti + 40% egészség + 20% népszerűség). Fallback módban működik."
+                prefix, labels = explanation_fragments(rec['ESI'], rec['HSI'], rec['PPI'])
+                rec['explanation'] = compose_explanation(prefix, labels) + " • Fallback módban működik."
             
             # Search relevance fallback
             rec['search_relevance'] = 0.0
@@ -828,29 +600,28 @@ def _fallback_recommendations(self, version, n_recommendations):
 db = UserStudyDatabase()
 recommender = EnhancedRecipeRecommender()
 
+@user_study_bp.before_app_request
+def watch_catalog():
+    """Katalógus változásfigyelés (ritkított stat, az újratöltés a háttérben fut)"""
+    recommender.watch_catalog()
+
 def get_user_version():
-    """JAVÍTOTT verzió kiválasztás - minden alkalommal új randomizálás"""
-    
-    # TELJESEN ÚJ RANDOMIZÁLÁS minden alkalommal (teszt célokra)
+    """Verzió kiválasztás - minden hívás saját, naplózható seed-ű generátorral"""
     versions = ['v1', 'v2', 'v3']
     
-    # Kombinált randomizálás több forrásból
-    current_time = int(time.time() * 1000000)  # mikroszekundum
-    process_random = random.randint(0, 2)
-    time_random = current_time % 3
-    
-    # Végső index
-    final_index = (process_random + time_random) % 3
+    rng, seed = make_rng(context="version")
+    final_index = int(rng.integers(len(versions)))
     selected_version = versions[final_index]
     
     # Session frissítés
     session['version'] = selected_version
     session['randomization_debug'] = {
-        'timestamp': current_time,
-        'process_random': process_random,
-        'time_random': time_random,
+        'seed': seed,
         'final_index': final_index
     }
+    
+    return selected_version
+
 # ROUTES
 
 @user_study_bp.route('/')
@@ -872,6 +643,10 @@ def register():
             
             session['user_id'] = user_id
             session['version'] = version
+            # Súlyprofil forrása (PERSONALIZED_SCORING=1 esetén)
+            session['sustainability_awareness'] = sustainability_awareness
+            session['cooking_frequency'] = cooking_frequency
+            session['education'] = education
             
             return redirect(url_for('user_study.instructions'))
             
@@ -900,8 +675,28 @@ def study():
     # Keresési paraméter
     search_ingredients = request.args.get('search', '').strip()
     
+    # Kategória szűrő: ?category=Hús (ismételhető, VAGY kapcsolat)
+    categories = [category for category in request.args.getlist('category') if category.strip()]
+    
+    # Keresési mód: ?search_mode=text (cím + útmutató, BM25) vagy fusion (összetevő + szöveg)
+    search_mode = request.args.get('search_mode', 'ingredients')
+    if search_mode not in SEARCH_MODES:
+        search_mode = 'ingredients'
+    
+    # Ajánlási mód: ?mode=pareto -> legjobb kompromisszum (nem dominált receptek)
+    mode = request.args.get('mode', 'standard')
+    if mode not in RECOMMENDATION_MODES:
+        mode = 'standard'
+    
+    # Mintavételi seed: ?seed=... reprodukálja egy korábbi oldal receptjeit
+    seed = request.args.get('seed', type=int)
+    if seed is None:
+        seed = new_seed()
+    session['last_seed'] = seed
+    
     # Felhasználói preferenciák session-ből
     user_preferences = {
+        'user_id': session.get('user_id'),
         'sustainability_awareness': session.get('sustainability_awareness', 3),
         'cooking_frequency': session.get('cooking_frequency', ''),
         'education': session.get('education', '')
@@ -912,18 +707,33 @@ def study():
         version=version, 
         search_ingredients=search_ingredients,
         user_preferences=user_preferences,
-        n_recommendations=5
+        n_recommendations=5,
+        seed=seed,
+        mode=mode,
+        categories=categories,
+        search_mode=search_mode
     )
     
+    # A sablon linkjeiben az alapértelmezett keresési mód nem jelenik meg
+    search_mode_arg = search_mode if search_mode != 'ingredients' else None
+    if not recommendations and categories:
+        return redirect(url_for('user_study.study', search=search_ingredients or None, search_mode=search_mode_arg))
     if not recommendations:
         return "❌ Hiba: Nem sikerült betölteni a recepteket. Próbálja újra később.", 500
     
-    print(f"🔍 Template-nek átadott {len(recommendations)} ajánlás ({version}) - Keresés: '{search_ingredients}'")
+    print(f"🔍 Template-nek átadott {len(recommendations)} ajánlás ({version}) - Keresés: '{search_ingredients}' - seed: {seed}")
+    
+    # Facet számok az aktuális keresésre (kategória szűrő nélkül, hogy a többi kategória is látsszon)
+    hybrid = recommender.hybrid_recommender
+    facets = hybrid.category_facets(search_ingredients, search_mode) if hybrid is not None else []
     
     return render_template('study.html', 
                          recommendations=recommendations, 
                          version=version,
-                         search_term=search_ingredients)
+                         search_term=search_ingredients,
+                         facets=facets,
+                         selected_categories=categories,
+                         search_mode=search_mode_arg)
 
 # Add ingredient suggestions API
 @user_study_bp.route('/api/ingredient_suggestions')
@@ -945,6 +755,197 @@ def ingredient_suggestions():
         print(f"Suggestion API error: {e}")
         return jsonify([])
 
+@user_study_bp.route('/api/recommendations/batch', methods=['POST'])
+def recommendations_batch():
+    """Batch ajánlás API - email digest és offline kiértékelés
+
+    Body: {"queries": [{"search_ingredients": "...", "version": "v1", "n": 5, "categories": ["Hús"],
+                        "search_mode": "fusion"}, ...]}
+    Válasz: lekérdezésenként rangsorolt lista (a top 15 pool első n eleme)
+    """
+    if recommender.hybrid_recommender is None:
+        return jsonify({'error': 'Hybrid recommender not available'}), 503
+
+    data = request.get_json(silent=True) or {}
+    queries = data.get('queries')
+    if not isinstance(queries, list) or not queries:
+        return jsonify({'error': 'queries: nem üres lista szükséges'}), 400
+    if len(queries) > MAX_BATCH_QUERIES:
+        return jsonify({'error': f'Legfeljebb {MAX_BATCH_QUERIES} lekérdezés küldhető egyszerre'}), 400
+
+    normalized = []
+    for query in queries:
+        if not isinstance(query, dict):
+            return jsonify({'error': 'Minden lekérdezés objektum kell legyen'}), 400
+        version = query.get('version', 'v1')
+        if version not in ('v1', 'v2', 'v3'):
+            return jsonify({'error': f'Ismeretlen verzió: {version}'}), 400
+        try:
+            n = min(max(int(query.get('n', 5)), 0), 15)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'n: egész szám szükséges'}), 400
+        categories = query.get('categories') or []
+        if isinstance(categories, str):
+            categories = [categories]
+        if not isinstance(categories, list):
+            return jsonify({'error': 'categories: szöveg lista szükséges'}), 400
+        search_mode = query.get('search_mode', 'ingredients')
+        if search_mode not in SEARCH_MODES:
+            return jsonify({'error': f'Ismeretlen keresési mód: {search_mode}'}), 400
+        normalized.append({
+            'search_ingredients': str(query.get('search_ingredients') or '').strip(),
+            'version': version,
+            'n': n,
+            'categories': [str(category) for category in categories],
+            'search_mode': search_mode
+        })
+
+    try:
+        results = recommender.hybrid_recommender.get_recommendations_batch(normalized)
+    except Exception as e:
+        print(f"❌ Batch ajánlási hiba: {e}")
+        return jsonify({'error': f'Batch ajánlási hiba: {e}'}), 500
+
+    return jsonify({'results': [
+        {**query, 'recommendations': recommendations}
+        for query, recommendations in zip(normalized, results)
+    ]})
+
+@user_study_bp.route('/api/facets')
+def category_facets():
+    """Kategória facet számok az aktuális keresésre - ?search=csirke, paprika[&search_mode=text]"""
+    hybrid = recommender.hybrid_recommender
+    if hybrid is None:
+        return jsonify({'error': 'Hybrid recommender not available'}), 503
+    
+    search_ingredients = request.args.get('search', '').strip()
+    search_mode = request.args.get('search_mode', 'ingredients')
+    if search_mode not in SEARCH_MODES:
+        return jsonify({'error': f'Ismeretlen keresési mód: {search_mode}'}), 400
+    return jsonify({
+        'search': search_ingredients,
+        'search_mode': search_mode,
+        'facets': hybrid.category_facets(search_ingredients, search_mode)
+    })
+
+def _admin_token_error(require_catalog=True):
+    """Katalógus admin végpontok védelme: ADMIN_TOKEN env + X-Admin-Token fejléc (None, ha rendben)"""
+    expected = os.environ.get('ADMIN_TOKEN')
+    if not expected:
+        return jsonify({'error': 'Katalógus admin végpontok letiltva (nincs ADMIN_TOKEN beállítva)'}), 503
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), expected):
+        return jsonify({'error': 'Forbidden'}), 403
+    if require_catalog and recommender.hybrid_recommender is None:
+        return jsonify({'error': 'Hybrid recommender not available'}), 503
+    return None
+
+@user_study_bp.route('/admin/recipes', methods=['POST'])
+def admin_add_recipe():
+    """Új recept felvétele a katalógusba (teljes újraépítés nélkül)"""
+    error = _admin_token_error()
+    if error:
+        return error
+    try:
+        recipeid = recommender.hybrid_recommender.add_recipe(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    recommender.catalog_edited()
+    return jsonify({'status': 'created', 'recipeid': recipeid}), 201
+
+@user_study_bp.route('/admin/recipes/<int:recipeid>', methods=['PUT'])
+def admin_update_recipe(recipeid):
+    """Recept mezőinek módosítása"""
+    error = _admin_token_error()
+    if error:
+        return error
+    try:
+        recommender.hybrid_recommender.update_recipe(recipeid, request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except KeyError:
+        return jsonify({'error': f'Nincs ilyen recept: {recipeid}'}), 404
+    recommender.catalog_edited()
+    return jsonify({'status': 'updated', 'recipeid': recipeid})
+
+@user_study_bp.route('/admin/recipes/<int:recipeid>', methods=['DELETE'])
+def admin_delete_recipe(recipeid):
+    """Recept törlése a katalógusból"""
+    error = _admin_token_error()
+    if error:
+        return error
+    try:
+        recommender.hybrid_recommender.delete_recipe(recipeid)
+    except KeyError:
+        return jsonify({'error': f'Nincs ilyen recept: {recipeid}'}), 404
+    recommender.catalog_edited()
+    return jsonify({'status': 'deleted', 'recipeid': recipeid})
+
+@user_study_bp.route('/admin/catalog/reload', methods=['POST'])
+def admin_reload_catalog():
+    """Hot reload: a feldolgozott CSV-ből új katalógus a háttérben, majd atomikus csere"""
+    error = _admin_token_error(require_catalog=False)
+    if error:
+        return error
+    started = recommender.reload_catalog()
+    return jsonify({
+        'status': 'started' if started else 'already_running',
+        'catalog': recommender.catalog_status()
+    }), 202
+
+@user_study_bp.route('/admin/catalog/compact', methods=['POST'])
+def admin_compact_catalog():
+    """Delta beolvasztása az alap katalógusba (háttérben, teljes újraillesztés)"""
+    error = _admin_token_error()
+    if error:
+        return error
+    started = recommender.compact_catalog()
+    return jsonify({
+        'status': 'started' if started else 'already_running',
+        'delta_size': len(recommender.hybrid_recommender.catalog_delta)
+    }), 202
+
+@user_study_bp.route('/api/recipes/<int:recipeid>/similar')
+def similar_recipes(recipeid):
+    """Hasonló receptek API (előre számolt hasonlósági gráfból) - ?n=10, legfeljebb 20"""
+    hybrid = recommender.hybrid_recommender
+    if hybrid is None:
+        return jsonify({'error': 'Hybrid recommender not available'}), 503
+    
+    n = min(max(request.args.get('n', 10, type=int), 1), hybrid.similarity_graph.n_neighbors)
+    recipes = hybrid.similar_recipes(recipeid, n)
+    if recipes is None:
+        return jsonify({'error': f'Nincs ilyen recept: {recipeid}'}), 404
+    return jsonify({'recipeid': recipeid, 'similar': recipes})
+
+
+@user_study_bp.route('/api/recipes/<int:recipeid>/substitutions')
+def recipe_substitutions(recipeid):
+    """Fenntartható összetevő cserék egy recepthez (előre számolt jelölt listákból)"""
+    hybrid = recommender.hybrid_recommender
+    if hybrid is None:
+        return jsonify({'error': 'Hybrid recommender not available'}), 503
+    
+    substitutions = hybrid.recipe_substitutions(recipeid)
+    if substitutions is None:
+        return jsonify({'error': f'Nincs ilyen recept: {recipeid}'}), 404
+    return jsonify({'recipeid': recipeid, **substitutions})
+
+
+@user_study_bp.route('/api/substitutions')
+def ingredient_substitutions():
+    """Egy összetevő fenntarthatóbb csere jelöltjei - ?ingredient=vaj"""
+    hybrid = recommender.hybrid_recommender
+    if hybrid is None:
+        return jsonify({'error': 'Hybrid recommender not available'}), 503
+    
+    ingredient = request.args.get('ingredient', '').strip()
+    if not ingredient:
+        return jsonify({'error': 'Hiányzó paraméter: ingredient'}), 400
+    substitutes = hybrid.ingredient_substitutes(ingredient)
+    if substitutes is None:
+        return jsonify({'error': f'Ismeretlen összetevő: {ingredient}'}), 404
+    return jsonify({'ingredient': ingredient, 'substitutes': substitutes})
+
 @user_study_bp.route('/rate_recipe', methods=['POST'])
 def rate_recipe():
     if 'user_id' not in session:
@@ -1347,7 +1348,7 @@ def debug_csv():
         result = "<h2>🔍 CSV Debug Information</h2>"
         
         # Processed CSV ellenőrzés
-        csv_path = project_root / "data" / "processed_recipes.csv"
+        csv_path = CSVProcessor.processed_csv_path()
         result += f"<h3>📊 Processed CSV Status:</h3>"
         result += f"Path: {csv_path}<br>"
         result += f"Exists: {'✅ YES' if csv_path.exists() else '❌ NO'}<br>"
@@ -1400,6 +1401,13 @@ def debug_csv():
     except Exception as e:
         return f"Debug error: {e}"
 
+@user_study_bp.route('/debug/query_cache')
+def debug_query_cache():
+    """Query cache számlálók (hit/miss/eviction)"""
+    if not recommender.hybrid_recommender:
+        return jsonify({'error': 'Hybrid recommender not available'}), 503
+    return jsonify(recommender.hybrid_recommender.query_cache.stats())
+
 @user_study_bp.route('/debug/esi_zero')
 def debug_esi_zero():
     """Debug ESI=0 values"""
@@ -1407,7 +1415,7 @@ def debug_esi_zero():
         result = "<h2>🔍 ESI=0 Debug Analysis</h2>"
         
         # Load processed CSV
-        csv_path = project_root / "data" / "processed_recipes.csv"
+        csv_path = CSVProcessor.processed_csv_path()
         if not csv_path.exists():
             return "❌ processed_recipes.csv not found"
         
@@ -1523,7 +1531,7 @@ def emergency_debug():
         
         # 3. Check CSV
         result += f"<h3>📊 CSV Status:</h3>"
-        csv_path = project_root / "data" / "processed_recipes.csv"
+        csv_path = CSVProcessor.processed_csv_path()
         result += f"<p><strong>CSV path:</strong> {csv_path}</p>"
         result += f"<p><strong>CSV exists:</strong> {csv_path.exists()}</p>"
         
@@ -1628,15 +1636,13 @@ def debug_randomization():
         test_details = []
         
         for i in range(10):
-            # Friss randomizálás szimuláció
-            current_time = int(time.time() * 1000000) + i  # Kis eltolás
-            process_random = random.randint(0, 2)
-            time_random = current_time % 3
-            final_index = (process_random + time_random) % 3
+            # Friss randomizálás szimuláció (mint get_user_version: új seed hívásonként)
+            rng, seed = make_rng()
+            final_index = int(rng.integers(3))
             version = ['v1', 'v2', 'v3'][final_index]
             
             test_versions.append(version)
-            test_details.append(f"#{i+1}: {version} (p:{process_random}, t:{time_random}, i:{final_index})")
+            test_details.append(f"#{i+1}: {version} (seed:{seed}, i:{final_index})")
         
         result += f"<p><strong>Generált verziók:</strong> {', '.join(test_versions)}</p>"
         result += f"<h4>Részletek:</h4><ul>"
@@ -1660,8 +1666,8 @@ def debug_randomization():
         result += f"<h3>🔀 Random Seed Teszt:</h3>"
         seed_tests = []
         for seed in [1, 42, 123, int(time.time())]:
-            random.seed(seed)
-            version = random.choice(['v1', 'v2', 'v3'])
+            rng, _ = make_rng(seed)
+            version = ['v1', 'v2', 'v3'][int(rng.integers(3))]
             seed_tests.append(f"Seed {seed}: {version}")
         
         result += f"<ul>"